@@ -4,47 +4,77 @@ Authentication API Routes
 Handles user authentication, registration, and session management.
 """
 
-from fastapi import APIRouter, HTTPException, Depends, status, Request
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+import uuid
 from typing import Optional
 
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import get_redis
+from app.core.config import settings
+from app.core.database import bind_session_user, get_db
 from app.core.security import (
     create_access_token,
-    verify_token,
-    get_google_oauth_url,
+    decode_id_token,
     exchange_code_for_token,
+    get_google_oauth_url,
     get_google_user_info,
-    decode_id_token,
+    verify_token,
 )
 from app.models.user import User
 from app.schemas.auth import (
-    TokenResponse,
-    UserResponse,
     GoogleOAuthRequest,
     GoogleOAuthResponse,
+    TokenResponse,
+    UserResponse,
 )
+from app.services.users import PrincipalCache, upsert_google_user
 
 router = APIRouter()
 security = HTTPBearer()
 
+# Spares each authenticated request its users lookup
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.principal_cache_ttl_seconds,
+    max_entries=settings.principal_cache_size,
+    shared=get_redis() if settings.principal_cache_shared else None,
+)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
 ) -> User:
     """Get current authenticated user from JWT token."""
-    token = credentials.credentials
+    return await authenticate_token(db, credentials.credentials)
+
+
+async def authenticate_token(db: AsyncSession, token: str) -> User:
+    """
+    Resolve an access token to its user, through the principal cache.
+
+    Raises:
+        HTTPException: If the token is invalid or its user does not exist
+            or has been deleted
+    """
     payload = verify_token(token)
     
-    user_id = payload.get("sub")
-    if user_id is None:
+    try:
+        user_id = uuid.UUID(payload["sub"])
+    except (KeyError, TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
         )
+
+    # Lets the session keep this user on the primary right after a write
+    await bind_session_user(db, user_id)
+
+    user = await principal_cache.load(db, user_id, payload)
+    if user is not None:
+        return user
     
     stmt = select(User).where(User.id == user_id)
     result = await db.execute(stmt)
@@ -56,6 +86,7 @@ async def get_current_user(
             detail="User not found",
         )
     
+    await principal_cache.store(user, payload)
     return user
 
 
@@ -123,28 +154,19 @@ async def google_oauth_callback(
                 detail="Missing required user information from Google"
             )
         
-        # Check if user exists
-        stmt = select(User).where(User.google_id == google_id)
-        result = await db.execute(stmt)
-        user = result.scalar_one_or_none()
-        
-        if user is None:
-            # Create new user
-            user = User(
-                google_id=google_id,
-                email=email,
-                name=name,
-                avatar_url=avatar_url,
+        # Create the user or sync their profile in one statement
+        user, written = await upsert_google_user(db, google_id, email, name, avatar_url)
+
+        if user.is_deleted:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail="Account has been deleted"
             )
-            db.add(user)
-            await db.commit()
-            await db.refresh(user)
-        else:
-            # Update existing user info
-            user.email = email
-            user.name = name
-            user.avatar_url = avatar_url
-            await db.commit()
+
+        if written:
+            db.info["user_id"] = user.id
+        await db.commit()
+        if written:
+            await principal_cache.invalidate(user.id)
         
         # Create JWT token
         access_token = create_access_token(
@@ -162,6 +184,8 @@ async def google_oauth_callback(
             )
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -195,4 +219,4 @@ async def refresh_token(
             name=current_user.name,
             avatar_url=current_user.avatar_url,
         )
-    )
\ No newline at end of file
+    )
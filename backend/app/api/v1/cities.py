@@ -4,16 +4,98 @@ City Discovery API Routes
 Handles city search, management, and Google Places integration.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.auth import get_current_user
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.user import User
+from app.schemas.cities import (
+    CityResponse,
+    CitySearchResponse,
+    NearbyCitiesResponse,
+    NearbyCity,
+)
+from app.services.cities import nearby_cities, search_known_cities
+from app.services.gazetteer import open_gazetteer
+from app.services.places import PlacesCache, PlacesClient, get_place_city
 
 router = APIRouter()
 
+# Spares repeated and concurrent lookups their Places API calls
+places = PlacesCache(
+    PlacesClient(
+        settings.google_places_base_url,
+        settings.google_places_api_key,
+        timeout_seconds=settings.google_places_timeout_seconds,
+    ),
+    search_ttl_seconds=settings.places_search_ttl_seconds,
+    details_ttl_seconds=settings.places_details_ttl_seconds,
+    negative_ttl_seconds=settings.places_negative_ttl_seconds,
+    max_entries=settings.places_cache_size,
+)
+
+# Answers autocomplete prefixes locally when it has been built
+gazetteer = open_gazetteer(settings.gazetteer_path)
+
+
+@router.get("/search", response_model=CitySearchResponse)
+async def search_cities(
+    q: str = Query(min_length=2, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Search for cities by name.
+
+    Name prefixes are answered from the gazetteer, then misspelled names
+    from a fuzzy search of stored cities; queries neither matches go to the
+    Google Places API.
+    """
+    results = gazetteer.search(q, limit) if gazetteer is not None else []
+    if not results and settings.city_search_database:
+        results = await search_known_cities(
+            db, q, limit, settings.city_search_similarity_threshold
+        )
+    if not results:
+        results = (await places.search(q))[:limit]
+    return CitySearchResponse(query=q, results=results)
+
+
+@router.get("/nearby", response_model=NearbyCitiesResponse)
+async def get_nearby_cities(
+    lat: float = Query(ge=-90, le=90),
+    lng: float = Query(ge=-180, le=180),
+    radius_km: float = Query(50, gt=0, le=500),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get stored cities within a radius of a point, nearest first."""
+    nearby = await nearby_cities(db, lat, lng, radius_km, limit)
+    return NearbyCitiesResponse(
+        results=[
+            NearbyCity(
+                **CityResponse.model_validate(city).model_dump(),
+                distance_km=round(distance, 3),
+            )
+            for city, distance in nearby
+        ]
+    )
+
 
-@router.get("/search")
-async def search_cities(q: str):
-    """Search for cities using Google Places API."""
-    # TODO: Implement city search
-    return {"message": f"City search endpoint - TODO: {q}"}
+@router.get("/places/{place_id}", response_model=CityResponse)
+async def get_place(
+    place_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get the city for a Google place id, storing it on first lookup."""
+    city = await get_place_city(db, places, place_id)
+    await db.commit()
+    return city
 
 
 @router.post("/")
@@ -27,4 +109,4 @@ async def add_city_to_trip():
 async def remove_city_from_trip(city_id: str):
     """Remove a city from trip consideration."""
     # TODO: Implement city removal
-    return {"message": f"Remove city endpoint - TODO: {city_id}"}
\ No newline at end of file
+    return {"message": f"Remove city endpoint - TODO: {city_id}"}
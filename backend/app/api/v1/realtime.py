@@ -0,0 +1,102 @@
+"""
+Real-Time API Routes
+
+WebSocket channel and Server-Sent Events stream carrying trip events to
+the trip's members.
+"""
+
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, WebSocket, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.auth import authenticate_token
+from app.core.config import settings
+from app.core.database import get_db
+from app.services.realtime import current_event_version, trip_rooms
+from app.services.trips import require_trip_member
+
+router = APIRouter()
+
+
+@router.websocket("/ws/trips/{trip_id}")
+async def trip_events(
+    websocket: WebSocket,
+    trip_id: uuid.UUID,
+    token: str = "",
+    db: AsyncSession = Depends(get_db),
+):
+    """Stream a trip's events to one of its members."""
+    try:
+        user = await authenticate_token(db, token)
+        user_id = user.id
+        await require_trip_member(db, trip_id, user_id)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    version = await current_event_version(db, trip_id)
+    # Hand the database connection back; the socket may stay open for hours
+    await db.close()
+
+    await websocket.accept()
+    connection = trip_rooms.join(trip_id, websocket, user_id, version)
+    try:
+        await connection.serve()
+    finally:
+        trip_rooms.leave(trip_id, connection)
+
+
+def _event_id(last_event_id: Optional[str]) -> Optional[int]:
+    """Event version a reconnecting client saw last; -1 when unreadable."""
+    if last_event_id is None:
+        return None
+    try:
+        return int(last_event_id)
+    except ValueError:
+        return -1
+
+
+@router.get("/sse/trips/{trip_id}")
+async def trip_event_stream(
+    trip_id: uuid.UUID,
+    token: str = "",
+    authorization: str = Header(default=""),
+    last_event_id: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Stream a trip's events to one of its members as Server-Sent Events.
+
+    EventSource cannot set headers, so the token may come in the query
+    string instead of an Authorization header.
+    """
+    scheme, _, credentials = authorization.partition(" ")
+    user = await authenticate_token(
+        db, credentials if scheme.lower() == "bearer" else token
+    )
+    user_id = user.id
+    await require_trip_member(db, trip_id, user_id)
+    version = await current_event_version(db, trip_id)
+    # Hand the database connection back; the stream may stay open for hours
+    await db.close()
+
+    async def frames():
+        # Joined once the response starts, so a request dropped before
+        # then never leaves a connection behind
+        connection = trip_rooms.join_stream(
+            trip_id, user_id, version, _event_id(last_event_id)
+        )
+        try:
+            async for frame in connection.frames(settings.sse_heartbeat_seconds):
+                yield frame
+        finally:
+            trip_rooms.leave(trip_id, connection)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        # Proxies must pass frames through as they come
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
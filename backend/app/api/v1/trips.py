@@ -4,16 +4,51 @@ Trip Management API Routes
 Handles trip creation, management, and collaboration features.
 """
 
-from fastapi import APIRouter
+import uuid
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.auth import get_current_user
+from app.core.database import get_db, reads_own_writes
+from app.core.etags import is_not_modified, not_modified, weak_etag
+from app.models.trip import TripStatus
+from app.models.user import User
+from app.schemas.trips import (
+    TripChangesResponse,
+    TripCityResponse,
+    TripDetailResponse,
+    TripListResponse,
+)
+from app.services.trips import (
+    list_member_trips,
+    render_trip_cities,
+    render_trip_detail,
+    require_trip_member,
+    response_cache,
+    trip_changes,
+    trip_cities_version,
+    trip_detail_version,
+    trip_tag,
+)
 
 router = APIRouter()
 
 
-@router.get("/")
-async def list_trips():
-    """List user's trips."""
-    # TODO: Implement trip listing
-    return {"message": "Trip listing endpoint - TODO"}
+@router.get("/", response_model=TripListResponse)
+async def list_trips(
+    status: Optional[TripStatus] = None,
+    cursor: Optional[str] = None,
+    per_page: int = Query(default=20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """List user's trips, newest first, one cursor page at a time."""
+    items, next_cursor = await list_member_trips(
+        db, current_user.id, status, cursor, per_page
+    )
+    return TripListResponse(items=items, per_page=per_page, next_cursor=next_cursor)
 
 
 @router.post("/")
@@ -23,11 +58,79 @@ async def create_trip():
     return {"message": "Trip creation endpoint - TODO"}
 
 
-@router.get("/{trip_id}")
-async def get_trip(trip_id: str):
-    """Get trip details."""
-    # TODO: Implement trip retrieval
-    return {"message": f"Trip details endpoint - TODO: {trip_id}"}
+@router.get("/{trip_id}", response_model=TripDetailResponse)
+async def get_trip(
+    trip_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get trip details; answers 304 when If-None-Match is current."""
+    await require_trip_member(db, trip_id, current_user.id)
+    version = await trip_detail_version(db, trip_id)
+    etag = weak_etag(version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    async def load():
+        return await render_trip_detail(db, trip_id), version
+
+    entry = await response_cache.get_or_load(
+        f"trip:{trip_id}:detail",
+        [trip_tag(trip_id)],
+        load,
+        version=version,
+        refresh=reads_own_writes(db),
+    )
+    response.headers["ETag"] = etag
+    return entry.value
+
+
+@router.get("/{trip_id}/cities", response_model=List[TripCityResponse])
+async def list_trip_cities(
+    trip_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """List the cities under consideration for a trip, with vote tallies."""
+    await require_trip_member(db, trip_id, current_user.id)
+    version = await trip_cities_version(db, trip_id)
+    etag = weak_etag(version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    async def load():
+        return await render_trip_cities(db, trip_id), version
+
+    entry = await response_cache.get_or_load(
+        f"trip:{trip_id}:cities",
+        [trip_tag(trip_id)],
+        load,
+        version=version,
+        refresh=reads_own_writes(db),
+    )
+    response.headers["ETag"] = etag
+    return entry.value
+
+
+@router.get("/{trip_id}/changes", response_model=TripChangesResponse)
+async def get_trip_changes(
+    trip_id: uuid.UUID,
+    since: Optional[int] = Query(default=None, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get what changed in a trip since the cursor of the previous sync.
+
+    Without ``since``, or when it is too old, returns a snapshot of the
+    whole trip. Pass the returned ``cursor`` to the next call.
+    """
+    await require_trip_member(db, trip_id, current_user.id)
+    return await trip_changes(db, trip_id, since)
 
 
 @router.put("/{trip_id}")
@@ -55,4 +158,4 @@ async def create_invite_link(trip_id: str):
 async def list_trip_members(trip_id: str):
     """List trip members."""
     # TODO: Implement member listing
-    return {"message": f"Member listing endpoint - TODO: {trip_id}"}
\ No newline at end of file
+    return {"message": f"Member listing endpoint - TODO: {trip_id}"}
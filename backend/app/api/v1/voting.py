@@ -4,27 +4,230 @@ Voting System API Routes
 Handles collaborative voting on travel destinations.
 """
 
-from fastapi import APIRouter
+import uuid
+from typing import List
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.api.v1.auth import get_current_user
+from app.core.database import get_db, reads_own_writes
+from app.core.etags import is_not_modified, not_modified, weak_etag
+from app.models.user import User
+from app.models.voting import CityVote
+from app.schemas.voting import (
+    BulkCastVoteRequest,
+    BulkCastVoteResponse,
+    CastVoteRequest,
+    CastVoteResponse,
+    CityVotesResponse,
+    CityVoteSummaryResponse,
+    TripVoteResponse,
+    VoteResponse,
+)
+from app.services.realtime import publish_trip_event, publish_trip_events
+from app.services.trips import require_trip_member, response_cache, trip_tag
+from app.services.voting import cast_vote as cast_city_vote
+from app.services.voting import (
+    cast_votes,
+    city_votes_version,
+    get_trip_city,
+    remove_vote,
+    trip_votes_version,
+)
 
 router = APIRouter()
 
 
-@router.get("/trips/{trip_id}/votes")
-async def get_trip_votes(trip_id: str):
-    """Get all votes for a trip."""
-    # TODO: Implement vote retrieval
-    return {"message": f"Get votes endpoint - TODO: {trip_id}"}
+@router.get("/trips/{trip_id}/votes", response_model=List[TripVoteResponse])
+async def get_trip_votes(
+    trip_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get all votes for a trip; answers 304 when If-None-Match is current."""
+    await require_trip_member(db, trip_id, current_user.id)
+    version = await trip_votes_version(db, trip_id)
+    etag = weak_etag(version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    async def load():
+        stmt = (
+            select(CityVote)
+            .where(CityVote.trip_id == trip_id)
+            .options(joinedload(CityVote.city), joinedload(CityVote.user))
+            .order_by(CityVote.created_at)
+        )
+        votes = (await db.execute(stmt)).scalars()
+        return [
+            TripVoteResponse.model_validate(vote).model_dump(mode="json")
+            for vote in votes
+        ], version
 
+    entry = await response_cache.get_or_load(
+        f"trip:{trip_id}:votes",
+        [trip_tag(trip_id)],
+        load,
+        version=version,
+        refresh=reads_own_writes(db),
+    )
+    response.headers["ETag"] = etag
+    return entry.value
 
-@router.post("/trips/{trip_id}/votes")
-async def cast_vote(trip_id: str):
+
+@router.post("/trips/{trip_id}/votes", response_model=CastVoteResponse)
+async def cast_vote(
+    trip_id: uuid.UUID,
+    vote_request: CastVoteRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
     """Cast or update a vote."""
-    # TODO: Implement voting
-    return {"message": f"Cast vote endpoint - TODO: {trip_id}"}
+    await require_trip_member(db, trip_id, current_user.id, lock=True)
+    trip_city = await get_trip_city(db, trip_id, vote_request.city_id)
+
+    vote, summary = await cast_city_vote(
+        db,
+        trip_city,
+        current_user.id,
+        vote_request.vote_type,
+        vote_request.comment,
+    )
+    await publish_trip_event(
+        db,
+        trip_id,
+        "vote_cast",
+        {
+            "city_id": vote.city_id,
+            "user_id": current_user.id,
+            "vote_type": vote.vote_type,
+            "vote_summary": summary,
+        },
+    )
+    await db.commit()
+    await response_cache.invalidate(trip_tag(trip_id))
+
+    return CastVoteResponse(
+        vote=VoteResponse.model_validate(vote),
+        vote_summary=summary,
+    )
+
+
+@router.post("/trips/{trip_id}/votes/bulk", response_model=BulkCastVoteResponse)
+async def cast_votes_bulk(
+    trip_id: uuid.UUID,
+    bulk_request: BulkCastVoteRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Cast or update votes on several cities in one request."""
+    await require_trip_member(db, trip_id, current_user.id, lock=True)
+
+    votes, summaries = await cast_votes(
+        db, trip_id, current_user.id, bulk_request.votes
+    )
+    await publish_trip_events(
+        db,
+        trip_id,
+        [
+            (
+                "vote_cast",
+                {
+                    "city_id": vote.city_id,
+                    "user_id": current_user.id,
+                    "vote_type": vote.vote_type,
+                    "vote_summary": summaries[vote.city_id],
+                },
+            )
+            for vote in votes
+        ],
+    )
+    await db.commit()
+    await response_cache.invalidate(trip_tag(trip_id))
+
+    return BulkCastVoteResponse(
+        votes=[VoteResponse.model_validate(vote) for vote in votes],
+        summaries=[
+            CityVoteSummaryResponse(city_id=city_id, vote_summary=summary)
+            for city_id, summary in summaries.items()
+        ],
+    )
+
+
+@router.get("/trips/{trip_id}/cities/{city_id}/votes", response_model=CityVotesResponse)
+async def get_city_votes(
+    trip_id: uuid.UUID,
+    city_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get votes for a specific city; answers 304 when If-None-Match is current."""
+    await require_trip_member(db, trip_id, current_user.id)
+    version = await city_votes_version(db, trip_id, city_id)
+    etag = weak_etag(version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    async def load():
+        trip_city = await get_trip_city(db, trip_id, city_id)
+        stmt = (
+            select(CityVote)
+            .where(
+                CityVote.trip_id == trip_id,
+                CityVote.city_id == city_id,
+            )
+            .order_by(CityVote.created_at)
+        )
+        result = await db.execute(stmt)
+
+        city_votes = CityVotesResponse(
+            city_id=city_id,
+            vote_summary=trip_city.vote_summary,
+            votes=[VoteResponse.model_validate(vote) for vote in result.scalars()],
+        )
+        return city_votes.model_dump(mode="json"), version
+
+    entry = await response_cache.get_or_load(
+        f"trip:{trip_id}:city:{city_id}:votes",
+        [trip_tag(trip_id)],
+        load,
+        version=version,
+        refresh=reads_own_writes(db),
+    )
+    response.headers["ETag"] = etag
+    return entry.value
+
+
+@router.delete(
+    "/trips/{trip_id}/cities/{city_id}/votes",
+    response_model=CityVoteSummaryResponse,
+)
+async def delete_vote(
+    trip_id: uuid.UUID,
+    city_id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Withdraw the current user's vote on a city."""
+    # Serializes with the user's bulk votes, which read the old vote unlocked
+    await require_trip_member(db, trip_id, current_user.id, lock=True)
+    trip_city = await get_trip_city(db, trip_id, city_id)
 
+    summary = await remove_vote(db, trip_city, current_user.id)
+    await publish_trip_event(
+        db,
+        trip_id,
+        "vote_removed",
+        {"city_id": city_id, "user_id": current_user.id, "vote_summary": summary},
+    )
+    await db.commit()
+    await response_cache.invalidate(trip_tag(trip_id))
 
-@router.get("/trips/{trip_id}/cities/{city_id}/votes")
-async def get_city_votes(trip_id: str, city_id: str):
-    """Get votes for a specific city."""
-    # TODO: Implement city vote retrieval
-    return {"message": f"Get city votes endpoint - TODO: {trip_id}/{city_id}"}
\ No newline at end of file
+    return CityVoteSummaryResponse(city_id=city_id, vote_summary=summary)
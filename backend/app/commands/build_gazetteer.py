@@ -0,0 +1,81 @@
+"""
+Build Gazetteer
+
+Compiles the city autocomplete gazetteer from the cities table, or from an
+offline CSV/TSV dataset (see read_city_dataset for the columns).
+
+Usage:
+    python -m app.commands.build_gazetteer [--output PATH] [--input FILE]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, close_db
+from app.models import City, TripCity
+from app.services.cities import read_city_dataset
+from app.services.gazetteer import build_gazetteer
+
+logger = structlog.get_logger()
+
+Row = Tuple[str, str, Optional[str]]
+
+
+def read_dataset(path: str) -> Iterator[Row]:
+    """Gazetteer rows of a dataset in the format read_city_dataset reads."""
+    for _, place_id, name, _, address, *_ in read_city_dataset(path):
+        yield place_id, name, address
+
+
+async def read_cities() -> List[Row]:
+    """Live cities, most often added to trips first."""
+    popularity = func.count(TripCity.id)
+    query = (
+        select(City.google_place_id, City.name, City.formatted_address)
+        .outerjoin(City.trip_cities)
+        .group_by(City.id)
+        .order_by(popularity.desc(), City.name)
+    )
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(query)
+        return [tuple(row) for row in result]
+
+
+async def run(output: str, dataset: Optional[str] = None) -> int:
+    """Build the gazetteer from a dataset file or the database."""
+    started = time.perf_counter()
+    rows = read_dataset(dataset) if dataset else await read_cities()
+    written = build_gazetteer(rows, output)
+
+    logger.info(
+        "Gazetteer built",
+        path=output,
+        cities=written,
+        seconds=round(time.perf_counter() - started, 2),
+    )
+    return written
+
+
+async def main(output: str, dataset: Optional[str] = None) -> None:
+    try:
+        await run(output, dataset)
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--output",
+        default=settings.gazetteer_path or "gazetteer.bin",
+        help="File to write (default: GAZETTEER_PATH)",
+    )
+    parser.add_argument("--input", help="CSV/TSV dataset to build from instead")
+    args = parser.parse_args()
+    asyncio.run(main(args.output, args.input))
@@ -0,0 +1,140 @@
+"""
+Import Cities
+
+Streams a CSV/TSV gazetteer dataset (see read_city_dataset for the
+columns) into the cities table in chunks, merging on google_place_id.
+PostgreSQL loads each chunk with binary COPY; other databases fall back to
+batched upserts.
+
+Each chunk commits on its own and is recorded in a progress file next to
+the dataset, so an interrupted import picks up after the last committed
+chunk when run again.
+
+Usage:
+    python -m app.commands.import_cities FILE [--chunk-size 50000] [--restart]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+from typing import Any, Iterable, Iterator, List
+
+import structlog
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.database import AsyncSessionLocal, close_db
+from app.services.cities import copy_cities, read_city_dataset, upsert_cities
+
+logger = structlog.get_logger()
+
+
+def chunked(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(rows)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class ImportProgress:
+    """
+    Rows of a dataset already imported, kept in ``<dataset>.progress``.
+
+    The count only applies to the same file: if its size or modification
+    time changed, the import starts over.
+    """
+
+    def __init__(self, dataset: str):
+        self.path = f"{dataset}.progress"
+        stat = os.stat(dataset)
+        self._fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def load(self) -> int:
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return 0
+        if saved.get("dataset") != self._fingerprint:
+            logger.warning("Dataset changed since the last import, starting over")
+            return 0
+        return saved["rows"]
+
+    def save(self, rows: int) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dataset": self._fingerprint, "rows": rows}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def run(
+    dataset: str,
+    chunk_size: int = 50_000,
+    restart: bool = False,
+    sessions: async_sessionmaker = AsyncSessionLocal,
+) -> int:
+    """
+    Import a dataset, resuming after the chunks already imported.
+
+    Returns:
+        The number of rows imported by this run
+    """
+    progress = ImportProgress(dataset)
+    done = 0 if restart else progress.load()
+    if done:
+        logger.info("Resuming city import", skipped_rows=done)
+
+    imported = 0
+    started = time.perf_counter()
+    rows = itertools.islice(read_city_dataset(dataset), done, None)
+    for chunk in chunked(rows, chunk_size):
+        async with sessions() as session:
+            if session.get_bind().dialect.name == "postgresql":
+                changed = await copy_cities(session, chunk)
+            else:
+                changed = await upsert_cities(session, chunk)
+            await session.commit()
+
+        done += len(chunk)
+        imported += len(chunk)
+        progress.save(done)
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "Cities chunk imported",
+            rows=done,
+            changed=changed,
+            rows_per_second=round(imported / elapsed),
+        )
+
+    progress.clear()
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "City import finished",
+        rows=imported,
+        seconds=round(elapsed, 1),
+        rows_per_second=round(imported / elapsed) if imported else 0,
+    )
+    return imported
+
+
+async def main(dataset: str, chunk_size: int, restart: bool) -> None:
+    try:
+        await run(dataset, chunk_size, restart)
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("dataset", help="CSV/TSV file to import")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore the progress of an earlier run"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.dataset, args.chunk_size, args.restart))
@@ -0,0 +1,44 @@
+"""
+Reconcile Vote Tallies
+
+Rebuilds the like/dont_mind/dislike tallies on trip_cities from city_votes.
+
+Usage:
+    python -m app.commands.reconcile_vote_tallies [--trip-id UUID]
+"""
+
+import argparse
+import asyncio
+import uuid
+from typing import Optional
+
+import structlog
+
+from app.core.database import AsyncSessionLocal, close_db
+from app.services.voting import reconcile_vote_tallies
+
+logger = structlog.get_logger()
+
+
+async def run(trip_id: Optional[uuid.UUID] = None) -> int:
+    """Rebuild vote tallies and commit the corrections."""
+    async with AsyncSessionLocal() as session:
+        corrected = await reconcile_vote_tallies(session, trip_id)
+        await session.commit()
+
+    logger.info("Vote tallies reconciled", corrected=corrected)
+    return corrected
+
+
+async def main(trip_id: Optional[uuid.UUID] = None) -> None:
+    try:
+        await run(trip_id)
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trip-id", type=uuid.UUID, help="Only reconcile this trip")
+    args = parser.parse_args()
+    asyncio.run(main(args.trip_id))
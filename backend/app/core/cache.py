@@ -0,0 +1,410 @@
+"""
+Caching Utilities
+
+In-process LRU cache with per-entry expiry, single-flight loading, the
+two-tier tagged cache for rendered responses, and the lazily created Redis
+client used for caches shared between workers.
+"""
+
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+import structlog
+
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire after their own TTL.
+
+    Not thread-safe; meant for use from one event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a live entry and mark it as recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """Store an entry for ``ttl`` seconds, evicting the least recently used."""
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value if it was still live."""
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[0] <= self.clock():
+            return default
+        return entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time.
+
+    Callers arriving while a call for their key is in flight wait for it
+    and share its result or exception instead of repeating the work. If
+    the leading caller is cancelled, a waiting caller takes over.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Future[Any]] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Run ``call``, or join the call already running for ``key``."""
+        future = self._calls.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                return await self.do(key, call)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved; nobody may be waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """A cached value with the version stamp of the rows it was built from."""
+
+    value: Any
+    version: Optional[int]
+    generations: Tuple[int, ...]
+    # Wall-clock expiry, and how long the value took to load
+    expires_at: float = 0.0
+    load_seconds: float = 0.0
+
+
+class TaggedCache:
+    """
+    Two-tier cache with tag-based invalidation.
+
+    Entries live in a per-worker LRU and, when a Redis client is given as
+    ``shared``, in Redis as well, both for ``ttl_seconds``. Each entry is
+    stored under the generations its tags had before the value was loaded;
+    ``invalidate`` bumps the generation of a tag, which retires every entry
+    carrying it, including ones whose load raced with the invalidation.
+
+    Workers re-read tag generations from Redis at most every
+    ``sync_seconds``, so invalidations made by another worker can take that
+    long to show up. Without a shared tier invalidation is immediate.
+
+    Concurrent misses for the same key share one load. Hot entries are
+    refreshed early with probability rising towards expiry (XFetch:
+    Vattani et al., "Optimal Probabilistic Cache Stampede Prevention"),
+    scaled by how long they took to load and by ``early_refresh_beta``;
+    0 turns early refresh off.
+
+    Values must be JSON-serializable when a shared tier is used.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        shared: Any = None,
+        sync_seconds: float = 1.0,
+        early_refresh_beta: float = 1.0,
+        prefix: str = "cache",
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.local = TTLCache(max_entries)
+        self.shared = shared
+        self.sync_seconds = sync_seconds
+        self.early_refresh_beta = early_refresh_beta
+        self.prefix = prefix
+        self.clock = clock
+        self.random = random.random
+        self._flights = SingleFlight()
+        self._generations = TTLCache(max_entries)
+        # Generations handed out for tags this worker has no record of, so a
+        # forgotten tag never matches the generation of an older entry
+        self._fresh = itertools.count(-1, -1)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    async def get_or_load(
+        self,
+        key: str,
+        tags: Sequence[str],
+        load: Callable[[], Awaitable[Tuple[Any, Optional[int]]]],
+        version: Optional[int] = None,
+        refresh: bool = False,
+    ) -> CacheEntry:
+        """
+        Get a cached entry, or load and cache it.
+
+        Args:
+            key: Cache key
+            tags: Tags whose invalidation retires the entry
+            load: Coroutine function returning the value and its version
+                stamp, e.g. the ``version`` of the row it renders
+            version: Current version stamp, when the caller already knows
+                it; an entry stamped with another version is reloaded
+            refresh: Skip the lookup and replace the entry with a fresh load
+
+        Returns:
+            The cached or freshly loaded entry
+        """
+        if not self.enabled:
+            value, version = await load()
+            return CacheEntry(value, version, ())
+
+        generations = await self._tag_generations(tags)
+        if refresh:
+            # Needs its own load, e.g. from the primary; never joins others
+            return await self._load(key, generations, load)
+
+        entry: Optional[CacheEntry] = self.local.get(key)
+        if entry is None or entry.generations != generations:
+            entry = await self._load_shared(key, generations)
+            if entry is not None:
+                self.local.set(key, entry, entry.expires_at - self.clock())
+        if (
+            entry is not None
+            and (version is None or entry.version == version)
+            and not self._refresh_early(entry)
+        ):
+            return entry
+
+        return await self._flights.do(
+            (key, generations, version),
+            lambda: self._load(key, generations, load),
+        )
+
+    def _refresh_early(self, entry: CacheEntry) -> bool:
+        if self.early_refresh_beta <= 0 or entry.load_seconds <= 0:
+            return False
+        # -log(u) for u in (0, 1] is exponentially distributed with mean 1
+        head_start = (
+            -entry.load_seconds
+            * self.early_refresh_beta
+            * math.log(1.0 - self.random())
+        )
+        return self.clock() + head_start >= entry.expires_at
+
+    async def _load(
+        self,
+        key: str,
+        generations: Tuple[int, ...],
+        load: Callable[[], Awaitable[Tuple[Any, Optional[int]]]],
+    ) -> CacheEntry:
+        started = time.perf_counter()
+        value, version = await load()
+        entry = CacheEntry(
+            value,
+            version,
+            generations,
+            expires_at=self.clock() + self.ttl_seconds,
+            load_seconds=time.perf_counter() - started,
+        )
+        await self._store(key, entry)
+        return entry
+
+    async def invalidate(self, *tags: str) -> None:
+        """Retire every entry carrying any of the tags."""
+        if not self.enabled:
+            return
+
+        for tag in tags:
+            generation = None
+            if self.shared is not None:
+                try:
+                    generation = await self.shared.incr(self._tag_key(tag))
+                    await self.shared.expire(
+                        self._tag_key(tag), int(self.ttl_seconds) + 1
+                    )
+                except Exception as e:
+                    logger.warning("Shared cache unavailable", error=str(e))
+            if generation is None:
+                generation = next(self._fresh)
+            self._generations.set(tag, generation, self._generation_ttl)
+
+    @property
+    def _generation_ttl(self) -> float:
+        if self.shared is None:
+            # Outlives every entry stored under the generation
+            return self.ttl_seconds
+        return min(self.sync_seconds, self.ttl_seconds)
+
+    async def _tag_generations(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        generations: Dict[str, int] = {}
+        unknown: List[str] = []
+        for tag in tags:
+            generation = self._generations.get(tag)
+            if generation is None:
+                unknown.append(tag)
+            else:
+                generations[tag] = generation
+
+        if unknown:
+            fetched = await self._fetch_generations(unknown)
+            for tag, generation in zip(unknown, fetched):
+                self._generations.set(tag, generation, self._generation_ttl)
+                generations[tag] = generation
+
+        return tuple(generations[tag] for tag in tags)
+
+    async def _fetch_generations(self, tags: List[str]) -> List[int]:
+        if self.shared is not None:
+            try:
+                raw = await self.shared.mget(*(self._tag_key(tag) for tag in tags))
+                return [int(value or 0) for value in raw]
+            except Exception as e:
+                logger.warning("Shared cache unavailable", error=str(e))
+        return [next(self._fresh) for _ in tags]
+
+    async def _load_shared(
+        self,
+        key: str,
+        generations: Tuple[int, ...],
+    ) -> Optional[CacheEntry]:
+        if self.shared is None:
+            return None
+        try:
+            raw = await self.shared.get(self._entry_key(key))
+        except Exception as e:
+            logger.warning("Shared cache unavailable", error=str(e))
+            return None
+        if raw is None:
+            return None
+        stored_generations, version, value, expires_at, load_seconds = json.loads(raw)
+        if tuple(stored_generations) != generations:
+            return None
+        return CacheEntry(value, version, generations, expires_at, load_seconds)
+
+    async def _store(self, key: str, entry: CacheEntry) -> None:
+        self.local.set(key, entry, self.ttl_seconds)
+        if self.shared is not None:
+            raw = json.dumps(
+                [
+                    entry.generations,
+                    entry.version,
+                    entry.value,
+                    entry.expires_at,
+                    entry.load_seconds,
+                ]
+            )
+            try:
+                await self.shared.set(
+                    self._entry_key(key), raw, ex=max(1, int(self.ttl_seconds))
+                )
+            except Exception as e:
+                logger.warning("Shared cache unavailable", error=str(e))
+
+
+_redis = None
+_redis_unavailable = False
+
+
+def get_redis() -> Any:
+    """
+    Get the shared Redis client for ``settings.redis_url``.
+
+    The client is created on first use, so processes that never enable a
+    shared cache tier do not need Redis at all. The client connects
+    lazily; its users log and skip commands that fail to reach Redis.
+
+    Returns:
+        The client, or None if the redis package is missing or the URL is
+        invalid, in which case shared tiers stay process-local
+    """
+    global _redis, _redis_unavailable
+    if _redis is None and not _redis_unavailable:
+        try:
+            import redis.asyncio as redis
+
+            _redis = redis.Redis.from_url(get_settings().redis_url)
+        except (ImportError, ValueError) as e:
+            _redis_unavailable = True
+            logger.warning(
+                "Redis unavailable, shared caches stay per worker", error=str(e)
+            )
+    return _redis
+
+
+async def close_redis() -> None:
+    """Close the shared Redis client if one was created."""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
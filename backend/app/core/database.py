@@ -3,47 +3,292 @@ Database Configuration
 
 SQLAlchemy async engine and session management.
 Database initialization and connection handling.
+
+When ``database_replica_url`` is set, sessions opened for read-only
+requests (GET/HEAD) send their SELECTs to the replica. Everything else,
+and every read by a user who wrote within the last
+``replica_stickiness_seconds`` on any worker, goes to the primary.
+
+Every ORM SELECT, relationship loads included, skips soft-deleted rows.
+Admin and restore paths opt out per statement with the
+``include_deleted`` execution option.
 """
 
-from typing import AsyncGenerator
+import math
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, Optional
 
 import structlog
-from sqlalchemy import MetaData
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import MetaData, Select, event, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session, with_loader_criteria
 from sqlalchemy.pool import NullPool
+from starlette.requests import HTTPConnection
 
+from app.core.cache import get_redis
 from app.core.config import get_settings
 
 logger = structlog.get_logger()
 settings = get_settings()
 
-# Database URL with async driver
-if settings.database_url.startswith("postgresql://"):
-    database_url = settings.database_url.replace("postgresql://", "postgresql+asyncpg://")
-else:
-    database_url = settings.database_url
-
-# Create async engine
-engine = create_async_engine(
-    database_url,
-    pool_size=settings.database_pool_size,
-    max_overflow=settings.database_max_overflow,
-    pool_pre_ping=True,
-    pool_recycle=3600,  # Recycle connections every hour
-    # Use NullPool for testing to avoid connection issues
-    poolclass=NullPool if settings.environment == "test" else None,
-    echo=settings.debug,  # Log SQL queries in debug mode
+# HTTP methods whose requests may read from the replica
+READ_ONLY_METHODS = frozenset({"GET", "HEAD"})
+
+# Execution option that turns off soft-delete filtering for a statement
+INCLUDE_DELETED = "include_deleted"
+
+
+def async_database_url(url: str) -> str:
+    """Database URL with async driver."""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://")
+    return url
+
+
+def create_engine_for_url(url: str) -> AsyncEngine:
+    """Create an async engine with the pool settings for this environment."""
+    url = async_database_url(url)
+    if url.startswith("sqlite"):
+        return create_async_engine(url, echo=settings.debug)
+
+    pool_options = {}
+    if settings.environment == "test":
+        # Use NullPool for testing to avoid connection issues
+        pool_options["poolclass"] = NullPool
+    else:
+        pool_options["pool_size"] = settings.database_pool_size
+        pool_options["max_overflow"] = settings.database_max_overflow
+
+    return create_async_engine(
+        url,
+        pool_pre_ping=True,
+        pool_recycle=3600,  # Recycle connections every hour
+        echo=settings.debug,  # Log SQL queries in debug mode
+        **pool_options,
+    )
+
+
+class ReplicaStickiness:
+    """
+    Users who wrote recently and must read from the primary.
+
+    Each worker remembers the users whose writes it committed. With a
+    ``shared`` Redis client the window is also kept in Redis, expiring
+    with it, so a read that lands on any worker sees it. While Redis is
+    unreachable only the worker's own view is used.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+        max_entries: int = 100_000,
+        shared: Any = None,
+    ):
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self.max_entries = max_entries
+        self.shared = shared
+        self._until: Dict[str, float] = {}
+
+    def _shared_key(self, user_id) -> str:
+        return f"replica_sticky:{user_id}"
+
+    def mark(self, user_id) -> None:
+        """Start (or extend) the stickiness window for a user."""
+        now = self.clock()
+        if len(self._until) >= self.max_entries:
+            self._until = {k: v for k, v in self._until.items() if v > now}
+        self._until[str(user_id)] = now + self.window_seconds
+
+    def is_sticky(self, user_id) -> bool:
+        """Check whether a user's reads must go to the primary."""
+        until = self._until.get(str(user_id))
+        if until is None:
+            return False
+        if until <= self.clock():
+            self._until.pop(str(user_id), None)
+            return False
+        return True
+
+    async def share(self, user_id) -> None:
+        """Start (or extend) a user's window on every worker."""
+        if self.shared is None:
+            return
+        try:
+            await self.shared.set(
+                self._shared_key(user_id),
+                1,
+                ex=max(1, math.ceil(self.window_seconds)),
+            )
+        except Exception as e:
+            logger.warning("Shared replica stickiness unavailable", error=str(e))
+
+    async def check(self, user_id) -> bool:
+        """Check whether a user wrote recently on this or any other worker."""
+        if self.is_sticky(user_id):
+            return True
+        if self.shared is None:
+            return False
+        try:
+            return await self.shared.get(self._shared_key(user_id)) is not None
+        except Exception as e:
+            logger.warning("Shared replica stickiness unavailable", error=str(e))
+            return False
+
+
+class RoutingSession(Session):
+    """
+    Session that routes reads of read-only sessions to a replica.
+
+    A session is read-only when opened with ``info={"read_only": True}``.
+    Such a session still uses the primary for writes, reads after it has
+    written, and reads for a user inside their stickiness window (see
+    ``bind_session_user``). Callers about to take row locks set
+    ``info["read_only"]`` to False first.
+    """
+
+    def __init__(
+        self,
+        *args,
+        primary: Engine,
+        replica: Optional[Engine] = None,
+        stickiness: Optional[ReplicaStickiness] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.replica = replica
+        self.stickiness = stickiness
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._use_replica(clause):
+            return self.replica
+        return self.primary
+
+    def _use_replica(self, clause) -> bool:
+        if self.replica is None or self._flushing:
+            return False
+        if not self.info.get("read_only") or self.info.get("wrote"):
+            return False
+        if not isinstance(clause, Select):
+            return False
+        return not self.info.get("sticky", False)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _track_dml(orm_execute_state) -> None:
+    """Remember that a session issued an INSERT/UPDATE/DELETE."""
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _track_flush(session, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_sticky(session) -> None:
+    """
+    Keep a user on the primary for a while after their writes commit.
+
+    Other workers learn of it when ``get_db`` calls ``share_stickiness``,
+    before the response goes out.
+    """
+    if not session.info.pop("wrote", False):
+        return
+    user_id = session.info.get("user_id")
+    if (
+        user_id is not None
+        and session.stickiness is not None
+        and session.replica is not None
+    ):
+        session.stickiness.mark(user_id)
+        session.info["sticky"] = True
+        session.info["share_sticky"] = True
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_writes(session) -> None:
+    session.info.pop("wrote", None)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _exclude_soft_deleted(orm_execute_state) -> None:
+    """
+    Add ``deleted_at IS NULL`` for every soft-deletable entity in a SELECT.
+
+    The criteria travels with the loaded objects, so their joined,
+    select-in and lazy relationship loads skip deleted rows too. Refreshes
+    of already loaded objects are left alone.
+
+    Usage:
+        # Includes soft-deleted rows, e.g. to restore one
+        select(Trip).execution_options(include_deleted=True)
+    """
+    if (
+        not orm_execute_state.is_select
+        or orm_execute_state.is_column_load
+        or orm_execute_state.is_relationship_load
+        or orm_execute_state.execution_options.get(INCLUDE_DELETED, False)
+    ):
+        return
+
+    from app.models.base import SoftDeleteMixin
+
+    orm_execute_state.statement = orm_execute_state.statement.options(
+        with_loader_criteria(
+            SoftDeleteMixin,
+            lambda cls: cls.deleted_at.is_(None),
+            include_aliases=True,
+        )
+    )
+
+
+def create_session_factory(
+    primary: AsyncEngine,
+    replica: Optional[AsyncEngine] = None,
+    stickiness: Optional[ReplicaStickiness] = None,
+) -> async_sessionmaker:
+    """Create a session factory routing between a primary and a replica."""
+    return async_sessionmaker(
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        primary=primary.sync_engine,
+        replica=replica.sync_engine if replica is not None else None,
+        stickiness=stickiness,
+        expire_on_commit=False,
+        autoflush=False,
+    )
+
+
+# Create async engines
+engine = create_engine_for_url(settings.database_url)
+replica_engine = (
+    create_engine_for_url(settings.database_replica_url)
+    if settings.database_replica_url
+    else None
+)
+replica_stickiness = ReplicaStickiness(
+    settings.replica_stickiness_seconds,
+    shared=(
+        get_redis()
+        if replica_engine is not None and settings.replica_stickiness_shared
+        else None
+    ),
 )
 
 # Create async session factory
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+AsyncSessionLocal = create_session_factory(engine, replica_engine, replica_stickiness)
 
 # Create base model class
 metadata = MetaData(
@@ -59,16 +304,92 @@ metadata = MetaData(
 Base = declarative_base(metadata=metadata)
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+def dialect_insert(session: AsyncSession):
+    """
+    Get the dialect-specific insert() construct for a session's database.
+
+    Both the PostgreSQL and SQLite variants support ``on_conflict_do_update``
+    and ``on_conflict_do_nothing``.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        return sqlite.insert
+    return postgresql.insert
+
+
+async def insert_returning(session: AsyncSession, model, **values):
+    """
+    Create a row with one INSERT ... RETURNING and get it back as an object.
+
+    Column defaults are filled in by the same statement, so the new object
+    is complete without a follow-up SELECT or refresh. The object joins the
+    session's identity map like any loaded row.
+
+    Args:
+        session: Database session
+        model: Mapped class to insert into
+        **values: Column values for the new row
+
+    Returns:
+        The created object
+    """
+    stmt = insert(model).values(**values).returning(model)
+    result = await session.execute(stmt)
+    return result.scalar_one()
+
+
+def session_info(connection: HTTPConnection) -> Dict[str, bool]:
+    """Session info for a request: read-only requests may use the replica."""
+    return {"read_only": connection.scope.get("method") in READ_ONLY_METHODS}
+
+
+async def bind_session_user(session: AsyncSession, user_id) -> None:
+    """
+    Tie a session to the user it acts for.
+
+    Looks up whether the user is inside their replica stickiness window,
+    so the session's reads go to the primary, and lets the user's writes
+    through this session start a new window.
+    """
+    session.info["user_id"] = user_id
+    sync_session = session.sync_session
+    if (
+        isinstance(sync_session, RoutingSession)
+        and sync_session.replica is not None
+        and sync_session.stickiness is not None
+    ):
+        session.info["sticky"] = await sync_session.stickiness.check(user_id)
+
+
+async def share_stickiness(session: AsyncSession) -> None:
+    """Tell the other workers about a window the session's writes started."""
+    if session.info.pop("share_sticky", False):
+        await session.sync_session.stickiness.share(session.info["user_id"])
+
+
+def reads_own_writes(session: AsyncSession) -> bool:
+    """
+    Whether a session's user is inside their replica stickiness window.
+
+    Such a user must see their own recent writes, so their reads should
+    skip caches that other users may have filled from a lagging replica.
+    """
+    sync_session = session.sync_session
+    if not isinstance(sync_session, RoutingSession) or sync_session.replica is None:
+        return False
+    return sync_session.info.get("sticky", False)
+
+
+async def get_db(connection: HTTPConnection) -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency to get database session.
     
     Yields:
         AsyncSession: Database session
     """
-    async with AsyncSessionLocal() as session:
+    async with AsyncSessionLocal(info=session_info(connection)) as session:
         try:
             yield session
+            await share_stickiness(session)
         except Exception as e:
             logger.error("Database session error", error=str(e))
             await session.rollback()
@@ -81,7 +402,7 @@ async def init_db() -> None:
     """Initialize database tables."""
     try:
         # Import all models to ensure they're registered
-        from app.models import user, trip, voting  # noqa: F401
+        from app.models import trip, user, voting  # noqa: F401
         
         async with engine.begin() as conn:
             # Create all tables
@@ -97,4 +418,6 @@ async def init_db() -> None:
 async def close_db() -> None:
     """Close database connections."""
     await engine.dispose()
-    logger.info("Database connections closed")
\ No newline at end of file
+    if replica_engine is not None:
+        await replica_engine.dispose()
+    logger.info("Database connections closed")
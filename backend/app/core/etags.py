@@ -0,0 +1,85 @@
+"""
+Conditional GETs
+
+Weak ETags built from the ``version`` and ``updated_at`` columns of the
+rows a response renders, so unchanged polls can be answered with a 304
+from one aggregate query instead of loading and serializing the payload.
+
+A response's version is a digest over, per table, the live row count, the
+sum of row versions and the latest update time. Any insert, update or
+(soft) delete of a rendered row changes at least one of them.
+"""
+
+import hashlib
+from typing import Any, Optional, Sequence
+
+from fastapi import Request, Response, status
+from sqlalchemy import func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Subquery
+
+
+def row_stamps(model, *criteria: Any, via: Optional[Sequence[Any]] = None) -> Subquery:
+    """
+    One-row subquery of the row count, version sum and latest update of a table.
+
+    Args:
+        model: Mapped class with ``version`` and ``updated_at``
+        *criteria: WHERE criteria selecting the rendered rows
+        via: Joins to apply first, for rows reached through another table,
+            as ``(target, onclause)`` pairs
+
+    Usage:
+        row_stamps(TripCity, TripCity.trip_id == trip_id)
+        row_stamps(City, TripCity.trip_id == trip_id, via=[(TripCity, ...)])
+    """
+    stmt = select(
+        func.count(model.id).label("rows"),
+        func.coalesce(func.sum(model.version), 0).label("versions"),
+        func.max(model.updated_at).label("updated_at"),
+    )
+    for target, onclause in via or ():
+        stmt = stmt.join(target, onclause)
+    return stmt.where(*criteria).subquery()
+
+
+async def content_version(db: AsyncSession, *stamps: Subquery) -> int:
+    """
+    Digest the stamps of every table a response renders in one query.
+
+    Returns:
+        A 64-bit version of the response content
+    """
+    first, *rest = stamps
+    stmt = select(*(column for stamp in stamps for column in stamp.c)).select_from(
+        first
+    )
+    for stamp in rest:
+        stmt = stmt.join(stamp, true())
+    row = (await db.execute(stmt)).one()
+
+    digest = hashlib.blake2b(repr(tuple(row)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def weak_etag(version: int) -> str:
+    """Weak ETag header value for a content version."""
+    return f'W/"{version:016x}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match matches the ETag (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the ETag."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
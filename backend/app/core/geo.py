@@ -0,0 +1,180 @@
+"""
+Geospatial Helpers
+
+Geohash cell ids and great-circle distances for nearby-city lookups.
+
+A geohash interleaves longitude and latitude bits into a base-32 string,
+so every prefix names a rectangular cell containing all longer hashes that
+start with it. Cities store a full-precision hash; a radius search reads
+the cells around the point with string range scans on that column and
+ranks what it finds by haversine distance.
+"""
+
+import math
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Stored precision: cells of about 4.8m x 4.8m
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode_geohash(
+    latitude: float,
+    longitude: float,
+    precision: int = GEOHASH_PRECISION,
+) -> str:
+    """Geohash of a point."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def city_geohash(latitude, longitude) -> Optional[str]:
+    """Stored geohash for a city's coordinates, None if it has none."""
+    if latitude is None or longitude is None:
+        return None
+    return encode_geohash(float(latitude), float(longitude))
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of the cells of a precision."""
+    bits = 5 * precision
+    lat_bits = bits // 2
+    lng_bits = bits - lat_bits
+    return 180.0 / 2**lat_bits, 360.0 / 2**lng_bits
+
+
+def search_precision(latitude: float, radius_km: float) -> int:
+    """
+    Longest geohash precision whose cells are at least ``radius_km`` across
+    around ``latitude``, so a circle of that radius fits within the 3 x 3
+    block of cells around its center. 0 means the radius is too large for
+    cells to help.
+    """
+    # Cells narrow towards the poles; size them at the circle's far edge
+    edge = min(90.0, abs(latitude) + radius_km / KM_PER_DEGREE)
+    shrink = math.cos(math.radians(edge))
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        if min(height, width * shrink) * KM_PER_DEGREE >= radius_km:
+            return precision
+    return 0
+
+
+def covering_cells(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    """
+    Geohash cells that together contain every point within ``radius_km``.
+
+    Returns:
+        The cell around the point and its neighbours, or an empty list when
+        the radius is too large for cells to narrow the search
+    """
+    precision = search_precision(latitude, radius_km)
+    if precision == 0:
+        return []
+    height, width = cell_size(precision)
+    cells = []
+    for lat_step in (-1, 0, 1):
+        lat = latitude + lat_step * height
+        if not -90.0 <= lat <= 90.0:
+            continue
+        for lng_step in (-1, 0, 1):
+            lng = (longitude + lng_step * width + 180.0) % 360.0 - 180.0
+            cell = encode_geohash(lat, lng, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def latitude_band(latitude: float, radius_km: float) -> Tuple[float, float]:
+    """Southmost and northmost latitudes within ``radius_km`` of a latitude."""
+    reach = radius_km / KM_PER_DEGREE
+    return max(-90.0, latitude - reach), min(90.0, latitude + reach)
+
+
+def cell_range(cell: str) -> Tuple[str, Optional[str]]:
+    """
+    Bounds of the stored geohashes inside a cell: ``low <= geohash < high``.
+
+    ``high`` is the next cell of the same precision, so the range holds
+    under any collation that orders digits before lowercase letters; None
+    when the cell is the last one.
+    """
+    prefix = cell
+    while prefix:
+        position = BASE32.index(prefix[-1])
+        if position < len(BASE32) - 1:
+            return cell, prefix[:-1] + BASE32[position + 1]
+        prefix = prefix[:-1]
+    return cell, None
+
+
+def haversine_km(
+    latitude: float,
+    longitude: float,
+    points: Iterable[Tuple[float, float]],
+) -> List[float]:
+    """Great-circle distances in km from one point to many."""
+    lat1 = math.radians(latitude)
+    lng1 = math.radians(longitude)
+    cos_lat1 = math.cos(lat1)
+    sin, cos, asin, sqrt, radians = (
+        math.sin,
+        math.cos,
+        math.asin,
+        math.sqrt,
+        math.radians,
+    )
+    diameter = 2 * EARTH_RADIUS_KM
+    distances = []
+    for lat, lng in points:
+        lat2 = radians(lat)
+        half_dlat = sin((lat2 - lat1) / 2)
+        half_dlng = sin((radians(lng) - lng1) / 2)
+        a = half_dlat * half_dlat + cos_lat1 * cos(lat2) * half_dlng * half_dlng
+        distances.append(diameter * asin(sqrt(min(1.0, a))))
+    return distances
+
+
+def nearest(
+    latitude: float,
+    longitude: float,
+    candidates: Sequence[Tuple[float, float]],
+    radius_km: float,
+    limit: int,
+) -> List[Tuple[int, float]]:
+    """
+    The candidates within ``radius_km`` of a point, nearest first.
+
+    Returns:
+        Up to ``limit`` (index into candidates, distance in km) pairs
+    """
+    distances = haversine_km(latitude, longitude, candidates)
+    within = [
+        (index, distance)
+        for index, distance in enumerate(distances)
+        if distance <= radius_km
+    ]
+    within.sort(key=lambda item: item[1])
+    return within[:limit]
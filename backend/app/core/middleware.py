@@ -11,11 +11,33 @@ from typing import Callable
 import structlog
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import Receive, Scope, Send
 
 logger = structlog.get_logger()
 
+# Server-Sent Events streams (app.api.v1.realtime), held open for hours
+EVENT_STREAM_PATH_PREFIX = "/sse/"
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+
+class PerRequestMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware for ordinary request/response exchanges.
+
+    Event streams bypass it: BaseHTTPMiddleware relays every body chunk
+    through its own task and memory stream, which made each held stream
+    several times larger and each frame slower to reach its client.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(
+            EVENT_STREAM_PATH_PREFIX
+        ):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+class LoggingMiddleware(PerRequestMiddleware):
     """Log all HTTP requests and responses with correlation IDs."""
     
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
@@ -78,7 +100,7 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             raise
 
 
-class MetricsMiddleware(BaseHTTPMiddleware):
+class MetricsMiddleware(PerRequestMiddleware):
     """Collect application metrics."""
     
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
@@ -116,4 +138,4 @@ class MetricsMiddleware(BaseHTTPMiddleware):
             path=path,
             status_code=status_code,
             duration_ms=round(duration * 1000, 2),
-        )
\ No newline at end of file
+        )
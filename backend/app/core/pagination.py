@@ -0,0 +1,68 @@
+"""
+Keyset Pagination
+
+Opaque cursors for paging through rows ordered by (created_at, id).
+
+A cursor encodes the sort key of the last row on a page; the next page is
+everything strictly after it, which an index on (created_at, id) answers
+without scanning the rows of earlier pages the way OFFSET does.
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, literal, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    """Encode the sort key of a row into an opaque cursor string."""
+    raw = json.dumps([created_at.isoformat(), row_id.hex], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
+
+
+def paginate_desc(
+    stmt: Select[Any],
+    created_at: InstrumentedAttribute[Any],
+    row_id: InstrumentedAttribute[Any],
+    cursor: Optional[str],
+    limit: int,
+) -> Select[Any]:
+    """
+    Apply newest-first keyset pagination to a select.
+
+    Fetches one row more than ``limit`` so callers can tell whether a next
+    page exists without a COUNT query.
+    """
+    if cursor is not None:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(created_at, row_id)
+            < tuple_(
+                literal(cursor_created_at, created_at.type),
+                literal(cursor_id, row_id.type),
+            )
+        )
+    return stmt.order_by(created_at.desc(), row_id.desc()).limit(limit + 1)
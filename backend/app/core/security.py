@@ -4,9 +4,11 @@ Security utilities for authentication and authorization.
 Handles JWT token creation, validation, password hashing, and OAuth utilities.
 """
 
+import hashlib
 import json
+import time
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Any
+from typing import Any, Dict, Optional
 from urllib.parse import urlencode
 
 import httpx
@@ -14,11 +16,16 @@ from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Payloads of verified tokens, and recently rejected tokens, by digest
+verified_tokens = TTLCache(settings.token_cache_size)
+rejected_tokens = TTLCache(settings.token_cache_size)
+
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -45,25 +52,44 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
 def verify_token(token: str) -> Dict[str, Any]:
     """
     Verify and decode a JWT token.
-    
+
+    Verified tokens are remembered until their ``exp``, and rejected ones
+    for ``token_reject_cache_seconds``, so repeat presentations skip the
+    signature check. Tokens are cached by SHA-256 digest, never verbatim.
+
     Args:
         token: JWT token string to verify
-        
+
     Returns:
         Decoded token payload
-        
+
     Raises:
         HTTPException: If token is invalid or expired
     """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = verified_tokens.get(digest)
+    if payload is not None:
+        return dict(payload)
+    if rejected_tokens.get(digest):
+        raise _invalid_credentials()
+
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        return payload
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        rejected_tokens.set(digest, True, settings.token_reject_cache_seconds)
+        raise _invalid_credentials()
+
+    if isinstance(payload.get("exp"), (int, float)):
+        verified_tokens.set(digest, payload, payload["exp"] - time.time())
+    return dict(payload)
+
+
+def _invalid_credentials() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -215,4 +241,4 @@ def decode_id_token(id_token: str) -> Dict[str, Any]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to decode ID token: {str(e)}"
-        )
\ No newline at end of file
+        )
@@ -16,11 +16,13 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
-from app.api.v1 import auth, trips, cities, voting
+from app.api.v1 import auth, cities, realtime, trips, voting
+from app.core.cache import close_redis
 from app.core.config import get_settings
-from app.core.database import engine, init_db
+from app.core.database import close_db, init_db
 from app.core.exceptions import TravelPlannerError
 from app.core.middleware import LoggingMiddleware, MetricsMiddleware
+from app.services.realtime import trip_broker
 
 # Configure structured logging
 logger = structlog.get_logger()
@@ -54,16 +56,28 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     except Exception as e:
         logger.warning("Database initialization failed, continuing without DB", error=str(e))
     
+    if getattr(settings, "enable_websockets", False):
+        await trip_broker.start()
+
     logger.info("TravelPlanner API started successfully")
     
     yield
     
     # Shutdown
     logger.info("Shutting down TravelPlanner API")
+    await trip_broker.stop()
     try:
-        await engine.dispose()
+        await close_db()
     except Exception as e:
         logger.warning("Database shutdown failed", error=str(e))
+    try:
+        await close_redis()
+    except Exception as e:
+        logger.warning("Redis shutdown failed", error=str(e))
+    try:
+        await cities.places.client.aclose()
+    except Exception as e:
+        logger.warning("Places client shutdown failed", error=str(e))
     logger.info("TravelPlanner API shutdown complete")
 
 
@@ -179,6 +193,8 @@ app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(trips.router, prefix="/api/v1/trips", tags=["Trips"])
 app.include_router(cities.router, prefix="/api/v1/cities", tags=["Cities"])
 app.include_router(voting.router, prefix="/api/v1/voting", tags=["Voting"])
+if getattr(settings, "enable_websockets", False):
+    app.include_router(realtime.router, tags=["Real-time"])
 
 
 # Root endpoint
@@ -190,4 +206,4 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs" if settings.debug else "Documentation disabled in production",
         "health": "/health",
-    }
\ No newline at end of file
+    }
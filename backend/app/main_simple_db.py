@@ -9,14 +9,14 @@ import asyncio
 from contextlib import asynccontextmanager
 from typing import List
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Database imports
-from app.core.database import get_db, init_db, close_db
+from app.core.database import close_db, get_db, init_db, insert_returning
 from app.models.base import BaseModel as DBBaseModel
 from app.models.city import City
 from app.models.trip import Trip
@@ -226,16 +226,15 @@ async def create_trip(trip_data: CreateTripRequest, db: AsyncSession = Depends(g
     """Create a new trip in database."""
     
     try:
-        # Create new trip in database
-        new_trip = Trip(
+        # Create new trip in database; RETURNING hands back the defaults
+        new_trip = await insert_returning(
+            db,
+            Trip,
             name=trip_data.title,
             description=trip_data.description,
             # owner_id will be None for now (no auth yet)
         )
-        
-        db.add(new_trip)
         await db.commit()
-        await db.refresh(new_trip)
         
         return TripResponse(
             id=str(new_trip.id),
@@ -310,4 +309,4 @@ async def seed_database(db: AsyncSession = Depends(get_db)):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
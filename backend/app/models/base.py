@@ -9,12 +9,13 @@ import uuid
 from datetime import datetime
 from typing import Any, Dict
 
-from sqlalchemy import Column, DateTime, String, Integer
+from sqlalchemy import Column, DateTime, Index, Integer, String, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.database import Base
+from app.core.ids import uuid7
 
 
 class TimestampMixin:
@@ -58,6 +59,17 @@ class SoftDeleteMixin:
         return self.deleted_at is not None
 
 
+def live_index(name: str, *columns: str) -> Index:
+    """
+    Partial index over the rows that are not soft deleted.
+
+    Queries only use it when they filter on ``deleted_at IS NULL``, which
+    every live-row lookup does.
+    """
+    where = text("deleted_at IS NULL")
+    return Index(name, *columns, postgresql_where=where, sqlite_where=where)
+
+
 class OptimisticLockMixin:
     """Mixin for optimistic locking with version control."""
     
@@ -71,9 +83,9 @@ class OptimisticLockMixin:
 class BaseModel(Base, TimestampMixin, SoftDeleteMixin, OptimisticLockMixin):
     """
     Base model class with common functionality.
-    
+
     Includes:
-    - UUID primary key
+    - UUID primary key (time-ordered UUIDv7)
     - Automatic timestamps
     - Soft delete capability
     - Optimistic locking
@@ -85,8 +97,8 @@ class BaseModel(Base, TimestampMixin, SoftDeleteMixin, OptimisticLockMixin):
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         primary_key=True,
-        default=uuid.uuid4,
-        unique=True,
+        # Time-ordered, so inserts append to the primary key index
+        default=uuid7,
         nullable=False,
     )
     
@@ -106,4 +118,4 @@ class BaseModel(Base, TimestampMixin, SoftDeleteMixin, OptimisticLockMixin):
     
     def __repr__(self) -> str:
         """String representation of model."""
-        return f"<{self.__class__.__name__}(id={self.id})>"
\ No newline at end of file
+        return f"<{self.__class__.__name__}(id={self.id})>"
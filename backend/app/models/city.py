@@ -5,12 +5,25 @@ City management and Google Places integration.
 """
 
 from enum import Enum
+from typing import Dict
 
-from sqlalchemy import String, Text, Numeric, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import (
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from .base import BaseModel
+from app.core.geo import city_geohash
+
+from .base import BaseModel, live_index
 
 
 class CityStatus(str, Enum):
@@ -59,6 +72,13 @@ class City(BaseModel):
         nullable=True,
     )
     
+    # Geohash of latitude/longitude, for nearby-city lookups; every write
+    # path sets it with city_geohash()
+    geohash: Mapped[str] = mapped_column(
+        String(12),
+        nullable=True,
+    )
+
     photo_url: Mapped[str] = mapped_column(
         Text,
         nullable=True,
@@ -76,10 +96,35 @@ class City(BaseModel):
         cascade="all, delete-orphan",
     )
     
+    __table_args__ = (
+        # Trigram indexes for typo-tolerant search (PostgreSQL pg_trgm)
+        *(
+            Index(
+                f"ix_cities_{column}_trgm",
+                column,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_where=text("deleted_at IS NULL"),
+            ).ddl_if(dialect="postgresql")
+            for column in ("name", "country")
+        ),
+        # Range scans over geohash cells
+        live_index("ix_cities_geohash_live", "geohash"),
+        # Latitude bands of nearby lookups too close to a pole for cells
+        live_index("ix_cities_latitude_live", "latitude"),
+    )
+
     def __repr__(self) -> str:
         return f"<City(id={self.id}, name={self.name}, country={self.country})>"
 
 
+@event.listens_for(City, "before_insert")
+@event.listens_for(City, "before_update")
+def _set_geohash(mapper, connection, city: City) -> None:
+    """Keep the geohash of cities written through the ORM in step."""
+    city.geohash = city_geohash(city.latitude, city.longitude)
+
+
 class TripCity(BaseModel):
     """Cities being considered for a trip."""
     
@@ -124,6 +169,28 @@ class TripCity(BaseModel):
         nullable=True,  # Timestamp when status changed to decided/rejected
     )
     
+    # Vote tallies, maintained alongside city_votes by the voting service
+    like_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+
+    dont_mind_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+
+    dislike_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+
     # Relationships
     trip = relationship("Trip", back_populates="cities")
     city = relationship("City", back_populates="trip_cities")
@@ -131,13 +198,31 @@ class TripCity(BaseModel):
     votes = relationship(
         "CityVote",
         back_populates="trip_city",
-        cascade="all, delete-orphan",
+        primaryjoin=(
+            "and_(TripCity.trip_id == CityVote.trip_id, "
+            "TripCity.city_id == CityVote.city_id)"
+        ),
+        foreign_keys="[CityVote.trip_id, CityVote.city_id]",
+        viewonly=True,
     )
     
     # Constraints
     __table_args__ = (
         UniqueConstraint("trip_id", "city_id", name="uq_trip_city"),
+        live_index("ix_trip_cities_trip_id_live", "trip_id"),
+        live_index("ix_trip_cities_city_id_live", "city_id"),
+        # Delta sync reads changed rows, deleted ones included
+        Index("ix_trip_cities_trip_id_updated_at", "trip_id", "updated_at"),
     )
+
+    @property
+    def vote_summary(self) -> Dict[str, int]:
+        """Vote counts per vote type, read from the maintained tallies."""
+        return {
+            "like": self.like_count or 0,
+            "dont_mind": self.dont_mind_count or 0,
+            "dislike": self.dislike_count or 0,
+        }
     
     def __repr__(self) -> str:
-        return f"<TripCity(trip_id={self.trip_id}, city_id={self.city_id}, status={self.status})>"
\ No newline at end of file
+        return f"<TripCity(trip_id={self.trip_id}, city_id={self.city_id}, status={self.status})>"
@@ -7,11 +7,11 @@ Trip management, membership, and collaboration features.
 from datetime import date, datetime
 from enum import Enum
 
-from sqlalchemy import String, Text, Date, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Date, ForeignKey, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from .base import BaseModel
+from .base import BaseModel, live_index
 
 
 class TripStatus(str, Enum):
@@ -65,6 +65,14 @@ class Trip(BaseModel):
         nullable=False,
         index=True,
     )
+
+    # Bumped for every real-time event about the trip (app.services.realtime)
+    event_version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
     
     # Relationships
     owner = relationship(
@@ -135,6 +143,10 @@ class TripMember(BaseModel):
         default=datetime.utcnow,
     )
     
+    # Copy of the trip's created_at, the sort key of a user's trip list;
+    # whoever creates the membership sets it from the trip in hand
+    trip_created_at: Mapped[datetime] = mapped_column(nullable=False)
+
     # Relationships
     trip = relationship("Trip", back_populates="members")
     user = relationship("User", back_populates="trip_memberships")
@@ -142,6 +154,15 @@ class TripMember(BaseModel):
     # Constraints
     __table_args__ = (
         UniqueConstraint("trip_id", "user_id", name="uq_trip_member"),
+        # The trips a user belongs to, newest first, one page at a time
+        live_index(
+            "ix_trip_members_user_id_trip_created_at_live",
+            "user_id",
+            "trip_created_at",
+            "trip_id",
+        ),
+        # Delta sync reads changed rows, deleted ones included
+        Index("ix_trip_members_trip_id_updated_at", "trip_id", "updated_at"),
     )
     
     def __repr__(self) -> str:
@@ -239,7 +260,10 @@ class UserPreference(BaseModel):
     # Constraints
     __table_args__ = (
         UniqueConstraint("trip_id", "user_id", name="uq_user_preference"),
+        live_index("ix_user_preferences_trip_id_live", "trip_id"),
+        # Delta sync reads changed rows, deleted ones included
+        Index("ix_user_preferences_trip_id_updated_at", "trip_id", "updated_at"),
     )
     
     def __repr__(self) -> str:
-        return f"<UserPreference(trip_id={self.trip_id}, user_id={self.user_id})>"
\ No newline at end of file
+        return f"<UserPreference(trip_id={self.trip_id}, user_id={self.user_id})>"
@@ -5,12 +5,13 @@ Collaborative voting on travel destinations.
 """
 
 from enum import Enum
+from typing import Optional
 
-from sqlalchemy import String, Text, ForeignKey, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, String, Text, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from .base import BaseModel
+from .base import BaseModel, live_index
 
 
 class VoteType(str, Enum):
@@ -48,7 +49,7 @@ class CityVote(BaseModel):
         nullable=False,
     )
     
-    comment: Mapped[str] = mapped_column(
+    comment: Mapped[Optional[str]] = mapped_column(
         Text,
         nullable=True,
     )
@@ -68,7 +69,13 @@ class CityVote(BaseModel):
     # Constraints - one vote per user per city per trip
     __table_args__ = (
         UniqueConstraint("trip_id", "city_id", "user_id", name="uq_city_vote"),
+        # A trip's votes in casting order
+        live_index("ix_city_votes_trip_id_created_at_live", "trip_id", "created_at"),
+        # Votes on a city across all trips
+        live_index("ix_city_votes_city_id_live", "city_id"),
+        # Delta sync reads changed rows, deleted ones included
+        Index("ix_city_votes_trip_id_updated_at", "trip_id", "updated_at"),
     )
     
     def __repr__(self) -> str:
-        return f"<CityVote(trip_id={self.trip_id}, city_id={self.city_id}, user_id={self.user_id}, vote={self.vote_type})>"
\ No newline at end of file
+        return f"<CityVote(trip_id={self.trip_id}, city_id={self.city_id}, user_id={self.user_id}, vote={self.vote_type})>"
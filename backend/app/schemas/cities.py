@@ -0,0 +1,54 @@
+"""
+City Schemas
+
+Pydantic models for city search and city responses.
+"""
+
+import uuid
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class PlaceSearchResult(BaseModel):
+    """A Google Places match for a city search."""
+
+    place_id: str
+    name: str
+    formatted_address: Optional[str] = None
+
+
+class CitySearchResponse(BaseModel):
+    """Matches for a city search query."""
+
+    query: str
+    results: List[PlaceSearchResult]
+
+
+class CityResponse(BaseModel):
+    """City stored from Google Places."""
+
+    id: uuid.UUID
+    google_place_id: str
+    name: str
+    country: str
+    formatted_address: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    photo_url: Optional[str] = None
+    description: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class NearbyCity(CityResponse):
+    """A city near a point, with its distance."""
+
+    distance_km: float
+
+
+class NearbyCitiesResponse(BaseModel):
+    """Cities within a radius of a point, nearest first."""
+
+    results: List[NearbyCity]
@@ -0,0 +1,166 @@
+"""
+Trip Schemas
+
+Pydantic models for trip requests and responses.
+"""
+
+import uuid
+from datetime import date, datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.models.city import CityStatus
+from app.models.trip import TripRole, TripStatus
+from app.schemas.voting import VoteResponse, VoteSummary
+
+
+class TripSummaryResponse(BaseModel):
+    """Trip as shown in trip listings."""
+
+    id: uuid.UUID
+    name: str
+    description: Optional[str] = None
+    owner_id: uuid.UUID
+    estimated_start_date: Optional[date] = None
+    estimated_end_date: Optional[date] = None
+    status: TripStatus
+    member_count: int
+    city_count: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class TripListResponse(BaseModel):
+    """One page of a cursor-paginated trip listing."""
+
+    items: List[TripSummaryResponse]
+    per_page: int
+    next_cursor: Optional[str] = None
+
+
+class MemberUserResponse(BaseModel):
+    """User information embedded in a trip membership."""
+
+    id: uuid.UUID
+    name: str
+    email: str
+    avatar_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TripMemberResponse(BaseModel):
+    """Trip membership with the member's user details."""
+
+    id: uuid.UUID
+    user_id: uuid.UUID
+    role: TripRole
+    joined_at: datetime
+    user: MemberUserResponse
+
+    class Config:
+        from_attributes = True
+
+
+class TripCityInfoResponse(BaseModel):
+    """City information embedded in a trip city."""
+
+    id: uuid.UUID
+    name: str
+    country: str
+    photo_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TripCityResponse(BaseModel):
+    """City under consideration for a trip, with its vote tally."""
+
+    id: uuid.UUID
+    city: TripCityInfoResponse
+    status: CityStatus
+    added_by: uuid.UUID
+    vote_summary: VoteSummary
+
+    class Config:
+        from_attributes = True
+
+
+class TripDetailResponse(BaseModel):
+    """Full trip with members and candidate cities."""
+
+    id: uuid.UUID
+    name: str
+    description: Optional[str] = None
+    owner_id: uuid.UUID
+    estimated_start_date: Optional[date] = None
+    estimated_end_date: Optional[date] = None
+    status: TripStatus
+    members: List[TripMemberResponse]
+    cities: List[TripCityResponse]
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class TripInfoResponse(BaseModel):
+    """Trip fields, without its members and cities."""
+
+    id: uuid.UUID
+    name: str
+    description: Optional[str] = None
+    owner_id: uuid.UUID
+    estimated_start_date: Optional[date] = None
+    estimated_end_date: Optional[date] = None
+    status: TripStatus
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class TripPreferenceResponse(BaseModel):
+    """A member's preferences for a trip."""
+
+    id: uuid.UUID
+    user_id: uuid.UUID
+    budget_range: Optional[str] = None
+    climate_preference: Optional[str] = None
+    activity_preferences: Optional[str] = None
+    accommodation_type: Optional[str] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class TripDeletedIds(BaseModel):
+    """Ids of the rows deleted since the sync cursor."""
+
+    members: List[uuid.UUID] = []
+    cities: List[uuid.UUID] = []
+    votes: List[uuid.UUID] = []
+    preferences: List[uuid.UUID] = []
+
+
+class TripChangesResponse(BaseModel):
+    """Trip rows changed since a sync cursor, or a snapshot of all of them."""
+
+    cursor: int
+    snapshot: bool
+    event_version: int
+    trip: Optional[TripInfoResponse] = None
+    members: List[TripMemberResponse]
+    cities: List[TripCityResponse]
+    votes: List[VoteResponse]
+    preferences: List[TripPreferenceResponse]
+    deleted: TripDeletedIds
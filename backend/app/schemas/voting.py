@@ -0,0 +1,113 @@
+"""
+Voting Schemas
+
+Pydantic models for vote requests, responses, and tallies.
+"""
+
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+from app.models.voting import VoteType
+
+
+class CastVoteRequest(BaseModel):
+    """Request model for casting or changing a vote."""
+
+    city_id: uuid.UUID
+    vote_type: VoteType
+    comment: Optional[str] = Field(default=None, max_length=500)
+
+
+class BulkCastVoteRequest(BaseModel):
+    """Request model for casting votes on several cities at once."""
+
+    votes: List[CastVoteRequest] = Field(min_length=1, max_length=100)
+
+    @field_validator("votes")
+    @classmethod
+    def validate_unique_cities(cls, v):
+        """Allow at most one vote per city in a batch."""
+        city_ids = [vote.city_id for vote in v]
+        if len(set(city_ids)) != len(city_ids):
+            raise ValueError("Each city may only be voted on once per batch")
+        return v
+
+
+class VoteSummary(BaseModel):
+    """Vote counts per vote type for a trip city."""
+
+    like: int = 0
+    dont_mind: int = 0
+    dislike: int = 0
+
+
+class VoteCityResponse(BaseModel):
+    """City information embedded in a vote."""
+
+    id: uuid.UUID
+    name: str
+    country: str
+
+    class Config:
+        from_attributes = True
+
+
+class VoteUserResponse(BaseModel):
+    """Voter information embedded in a vote."""
+
+    id: uuid.UUID
+    name: str
+
+    class Config:
+        from_attributes = True
+
+
+class VoteResponse(BaseModel):
+    """Single vote response model."""
+
+    id: uuid.UUID
+    city_id: uuid.UUID
+    user_id: uuid.UUID
+    vote_type: VoteType
+    comment: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class TripVoteResponse(VoteResponse):
+    """Vote response with city and voter details."""
+
+    city: VoteCityResponse
+    user: VoteUserResponse
+
+
+class CastVoteResponse(BaseModel):
+    """Response model for a cast vote with the updated tally."""
+
+    vote: VoteResponse
+    vote_summary: VoteSummary
+
+
+class CityVoteSummaryResponse(BaseModel):
+    """Vote tally for a single trip city."""
+
+    city_id: uuid.UUID
+    vote_summary: VoteSummary
+
+
+class CityVotesResponse(CityVoteSummaryResponse):
+    """Votes and tally for a single trip city."""
+
+    votes: List[VoteResponse]
+
+
+class BulkCastVoteResponse(BaseModel):
+    """Response model for a batch of votes with the updated tallies."""
+
+    votes: List[VoteResponse]
+    summaries: List[CityVoteSummaryResponse]
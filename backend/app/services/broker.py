@@ -0,0 +1,207 @@
+"""
+Trip Event Brokers
+
+Carry trip events from the worker that commits a change to every worker
+holding real-time clients for the trip.
+
+Events are published inside the transaction that made the change and
+only go out if it commits. Each carries the trip's event version, bumped
+in that same transaction, so receivers can spot events they missed.
+
+``PostgresBroker`` sends events with NOTIFY, which PostgreSQL delivers
+in commit order, and receives them on one dedicated LISTEN connection
+per worker. While that connection is down notifications are lost; after
+reconnecting, the broker reads the current event version of every trip
+with local clients so the rooms can tell those clients to resync.
+
+``InMemoryBroker`` hands events to the local rooms after commit, for a
+single process (development and tests).
+"""
+
+import asyncio
+import json
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Protocol
+
+import structlog
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = structlog.get_logger()
+
+CHANNEL = "trip_events"
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7999
+# Events waiting in a session for its transaction to commit
+PENDING_EVENTS = "pending_trip_events"
+
+
+@dataclass(frozen=True)
+class TripEventMessage:
+    """
+    A trip event on the wire.
+
+    ``data`` holds ids and small values only; it is None when it did not
+    fit in a notification, and receivers tell clients to resync instead.
+    """
+
+    trip_id: uuid.UUID
+    version: int
+    type: str
+    data: Optional[Dict[str, Any]] = None
+
+    def encode(self) -> str:
+        message = {"t": str(self.trip_id), "v": self.version, "e": self.type}
+        if self.data is not None:
+            payload = json.dumps({**message, "d": self.data}, separators=(",", ":"))
+            if len(payload.encode()) <= MAX_PAYLOAD_BYTES:
+                return payload
+            logger.warning(
+                "Trip event too large to notify", type=self.type, bytes=len(payload)
+            )
+        return json.dumps(message, separators=(",", ":"))
+
+    @classmethod
+    def decode(cls, payload: str) -> "TripEventMessage":
+        message = json.loads(payload)
+        return cls(
+            uuid.UUID(message["t"]), message["v"], message["e"], message.get("d")
+        )
+
+
+class EventRooms(Protocol):
+    """What a broker delivers to: the worker's real-time rooms."""
+
+    def trip_ids(self) -> Iterable[uuid.UUID]:
+        ...
+
+    def deliver(self, message: TripEventMessage) -> None:
+        ...
+
+    def catch_up(self, trip_id: uuid.UUID, version: int) -> None:
+        ...
+
+
+class TripEventBroker(ABC):
+    """Publishes trip events and delivers them to the local rooms."""
+
+    def __init__(self, rooms: EventRooms):
+        self.rooms = rooms
+
+    @abstractmethod
+    async def publish(self, db: AsyncSession, message: TripEventMessage) -> None:
+        """Publish an event when the session's transaction commits."""
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class InMemoryBroker(TripEventBroker):
+    """Delivers events to the rooms of this process after commit."""
+
+    async def publish(self, db: AsyncSession, message: TripEventMessage) -> None:
+        db.info.setdefault(PENDING_EVENTS, []).append((self.rooms, message))
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_pending_events(session) -> None:
+    for rooms, message in session.info.pop(PENDING_EVENTS, ()):
+        rooms.deliver(message)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session) -> None:
+    session.info.pop(PENDING_EVENTS, None)
+
+
+class PostgresBroker(TripEventBroker):
+    """Fans events out between workers with NOTIFY/LISTEN."""
+
+    def __init__(
+        self,
+        rooms: EventRooms,
+        dsn: str,
+        keepalive_seconds: float = 15.0,
+        max_backoff_seconds: float = 30.0,
+    ):
+        super().__init__(rooms)
+        # asyncpg takes plain postgresql:// URLs
+        self.dsn = dsn.replace("postgresql+asyncpg://", "postgresql://")
+        self.keepalive_seconds = keepalive_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.connected = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def publish(self, db: AsyncSession, message: TripEventMessage) -> None:
+        await db.execute(select(func.pg_notify(CHANNEL, message.encode())))
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            message = TripEventMessage.decode(payload)
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed trip event", payload=payload[:200])
+            return
+        self.rooms.deliver(message)
+
+    async def _listen_forever(self) -> None:
+        import asyncpg
+
+        backoff = 0.5
+        reconnecting = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                await connection.add_listener(CHANNEL, self._on_notify)
+                if reconnecting:
+                    await self._catch_up(connection)
+                logger.info("Listening for trip events", reconnect=reconnecting)
+                self.connected.set()
+                backoff = 0.5
+                # A dead connection only shows up when it is used
+                while True:
+                    await asyncio.sleep(self.keepalive_seconds)
+                    await asyncio.wait_for(
+                        connection.fetchval("SELECT 1"), self.keepalive_seconds
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    "Trip event listener disconnected", error=str(e), retry_in=backoff
+                )
+            finally:
+                self.connected.clear()
+                if connection is not None:
+                    connection.terminate()
+            reconnecting = True
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff_seconds)
+
+    async def _catch_up(self, connection) -> None:
+        """Let rooms spot events published while the listener was down."""
+        trip_ids: List[uuid.UUID] = list(self.rooms.trip_ids())
+        if not trip_ids:
+            return
+        rows = await connection.fetch(
+            "SELECT id, event_version FROM trips WHERE id = ANY($1::uuid[])",
+            trip_ids,
+        )
+        for row in rows:
+            self.rooms.catch_up(row["id"], row["event_version"])
@@ -0,0 +1,309 @@
+"""
+City Services
+
+Search over the cities already stored in the database, and bulk loading
+of cities from gazetteer datasets.
+"""
+
+import csv
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import (
+    CompoundSelect,
+    Float,
+    Select,
+    cast,
+    func,
+    or_,
+    select,
+    text,
+    union_all,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import dialect_insert
+from app.core.geo import (
+    cell_range,
+    city_geohash,
+    covering_cells,
+    latitude_band,
+    nearest,
+)
+from app.core.ids import uuid7
+from app.models.city import City, TripCity
+
+# Largest boost popularity adds to a similarity score (0-1)
+POPULARITY_WEIGHT = 0.2
+# Trips a city must be on to get half of that boost
+POPULARITY_HALF_TRIPS = 10
+
+
+async def search_known_cities(
+    db: AsyncSession,
+    query: str,
+    limit: int = 10,
+    threshold: float = 0.3,
+) -> List[Dict[str, Any]]:
+    """
+    Fuzzy search of stored cities by name or country.
+
+    Matches on trigram similarity, so typos still find the city, and ranks
+    by similarity plus a boost for cities that are on many trips. The match
+    uses pg_trgm's ``%`` operator with the threshold set for the
+    transaction, which the GIN trigram indexes serve; a
+    ``similarity() > x`` filter could not use them.
+
+    Args:
+        db: Database session
+        query: Text the user typed
+        limit: Maximum results
+        threshold: Minimum similarity (0-1) of name or country to match
+
+    Returns:
+        Matches shaped like PlacesClient.search results
+    """
+    name_score = func.similarity(City.name, query)
+    country_score = func.similarity(City.country, query)
+    await db.execute(
+        select(func.set_config("pg_trgm.similarity_threshold", str(threshold), True))
+    )
+    score = func.greatest(name_score, country_score)
+    match = or_(City.name.op("%")(query), City.country.op("%")(query))
+
+    popularity = (
+        select(func.count(TripCity.id))
+        .where(TripCity.city_id == City.id)
+        .scalar_subquery()
+    )
+    candidates = (
+        select(
+            City.google_place_id,
+            City.name,
+            City.formatted_address,
+            score.label("score"),
+            popularity.label("trips"),
+        )
+        .where(match)
+        .subquery()
+    )
+    trips = cast(candidates.c.trips, Float)
+    rank = candidates.c.score + POPULARITY_WEIGHT * trips / (
+        trips + POPULARITY_HALF_TRIPS
+    )
+    result = await db.execute(
+        select(
+            candidates.c.google_place_id,
+            candidates.c.name,
+            candidates.c.formatted_address,
+        )
+        .order_by(rank.desc(), candidates.c.name)
+        .limit(limit)
+    )
+    return [
+        {"place_id": place_id, "name": name, "formatted_address": address}
+        for place_id, name, address in result
+    ]
+
+
+async def nearby_cities(
+    db: AsyncSession,
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    limit: int = 20,
+) -> List[Tuple[City, float]]:
+    """
+    Stored cities within a radius of a point, nearest first.
+
+    Reads the coordinates in the geohash cells covering the circle, with
+    range scans on the geohash index, or near the poles in the latitude
+    band it spans, ranks those candidates by haversine distance in
+    process, and loads only the cities that make the cut.
+
+    Returns:
+        Up to ``limit`` (city, distance in km) pairs
+    """
+    columns = select(City.id, City.latitude, City.longitude)
+    cells = covering_cells(latitude, longitude, radius_km)
+    query: Union[Select[Any], CompoundSelect]
+    if cells:
+        # One range scan per cell; the cells do not overlap
+        scans = []
+        for low, high in map(cell_range, cells):
+            scan = columns.where(City.geohash >= low)
+            scans.append(scan.where(City.geohash < high) if high is not None else scan)
+        query = union_all(*scans)
+    else:
+        # Only near the poles, where cells are too narrow: every longitude
+        # of the latitude band the circle spans
+        south, north = latitude_band(latitude, radius_km)
+        query = columns.where(City.latitude.between(south, north))
+    candidates = (await db.execute(query)).all()
+    ranked = nearest(
+        latitude,
+        longitude,
+        [(float(lat), float(lng)) for _, lat, lng in candidates],
+        radius_km,
+        limit,
+    )
+    if not ranked:
+        return []
+
+    ids = [candidates[index].id for index, _ in ranked]
+    result = await db.execute(select(City).where(City.id.in_(ids)))
+    cities = {city.id: city for city in result.scalars()}
+    return [
+        (cities[candidates[index].id], distance)
+        for index, distance in ranked
+        if candidates[index].id in cities
+    ]
+
+
+# Columns a dataset provides, in the order bulk loads send them
+IMPORT_COLUMNS = (
+    "id",
+    "google_place_id",
+    "name",
+    "country",
+    "formatted_address",
+    "latitude",
+    "longitude",
+    "geohash",
+)
+
+STAGING_TABLE = """
+CREATE TEMPORARY TABLE IF NOT EXISTS city_import (
+    id UUID NOT NULL,
+    google_place_id VARCHAR(255) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    country VARCHAR(255) NOT NULL,
+    formatted_address TEXT,
+    latitude NUMERIC(10, 8),
+    longitude NUMERIC(11, 8),
+    geohash VARCHAR(12)
+) ON COMMIT DELETE ROWS
+"""
+
+# Rows whose data did not change are left alone, so a re-import of the
+# same dataset rewrites nothing; DISTINCT ON because one INSERT may not
+# update a row twice
+MERGE_STAGED = text(
+    """
+WITH merged AS (
+    INSERT INTO cities (
+        id, google_place_id, name, country, formatted_address,
+        latitude, longitude, geohash, created_at, updated_at, version
+    )
+    SELECT DISTINCT ON (google_place_id)
+        id, google_place_id, name, country, formatted_address,
+        latitude, longitude, geohash, :now, :now, 1
+    FROM city_import
+    ORDER BY google_place_id
+    ON CONFLICT (google_place_id) DO UPDATE SET
+        name = EXCLUDED.name,
+        country = EXCLUDED.country,
+        formatted_address = EXCLUDED.formatted_address,
+        latitude = EXCLUDED.latitude,
+        longitude = EXCLUDED.longitude,
+        geohash = EXCLUDED.geohash,
+        updated_at = EXCLUDED.updated_at,
+        deleted_at = NULL,
+        version = cities.version + 1
+    WHERE (
+        cities.name, cities.country, cities.formatted_address,
+        cities.latitude, cities.longitude, cities.deleted_at
+    ) IS DISTINCT FROM (
+        EXCLUDED.name, EXCLUDED.country, EXCLUDED.formatted_address,
+        EXCLUDED.latitude, EXCLUDED.longitude, NULL
+    )
+    RETURNING 1
+)
+SELECT count(*) FROM merged
+"""
+)
+
+
+def _decimal(value: Optional[str]) -> Optional[Decimal]:
+    return Decimal(value) if value else None
+
+
+def read_city_dataset(path: str) -> Iterator[Tuple[Any, ...]]:
+    """
+    Stream cities from a CSV/TSV gazetteer dataset.
+
+    The file has a header row naming its columns: ``google_place_id`` (or
+    ``place_id``), ``name``, ``country``, and optionally
+    ``formatted_address``, ``latitude`` and ``longitude``. Files ending in
+    .tsv are tab-separated.
+
+    Yields:
+        Rows of IMPORT_COLUMNS values, each with a new id
+    """
+    delimiter = "\t" if path.endswith(".tsv") else ","
+    with open(path, newline="", encoding="utf-8") as f:
+        for line in csv.DictReader(f, delimiter=delimiter):
+            name, country = line["name"], line["country"]
+            latitude = _decimal(line.get("latitude"))
+            longitude = _decimal(line.get("longitude"))
+            yield (
+                uuid7(),
+                line.get("google_place_id") or line["place_id"],
+                name,
+                country,
+                line.get("formatted_address") or f"{name}, {country}",
+                latitude,
+                longitude,
+                city_geohash(latitude, longitude),
+            )
+
+
+async def copy_cities(db: AsyncSession, rows: Sequence[Tuple[Any, ...]]) -> int:
+    """
+    Load dataset rows into cities on PostgreSQL.
+
+    The rows are sent with asyncpg's binary COPY into a temporary staging
+    table, then merged into cities by google_place_id in one statement,
+    which also revives soft-deleted cities. The caller commits.
+
+    Returns:
+        The number of cities inserted or changed
+    """
+    connection = await db.connection()
+    await connection.exec_driver_sql(STAGING_TABLE)
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "city_import", records=rows, columns=IMPORT_COLUMNS
+    )
+    result = await connection.execute(MERGE_STAGED, {"now": datetime.utcnow()})
+    return result.scalar_one()
+
+
+async def upsert_cities(db: AsyncSession, rows: Sequence[Tuple[Any, ...]]) -> int:
+    """
+    Load dataset rows into cities with batched INSERT ... ON CONFLICT.
+
+    The fallback for databases without COPY (SQLite in development). The
+    caller commits.
+
+    Returns:
+        The number of rows sent
+    """
+    now = datetime.utcnow()
+    insert = dialect_insert(db)
+    stmt = insert(City.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[City.google_place_id],
+        set_={
+            **{column: stmt.excluded[column] for column in IMPORT_COLUMNS[2:]},
+            "updated_at": now,
+            "deleted_at": None,
+            "version": City.version + 1,
+        },
+    )
+    timestamps = {"created_at": now, "updated_at": now, "version": 1}
+    await db.execute(
+        stmt, [{**dict(zip(IMPORT_COLUMNS, row)), **timestamps} for row in rows]
+    )
+    return len(rows)
@@ -0,0 +1,116 @@
+"""
+Fake Google Places Server
+
+Local stand-in for the Places web service endpoints the Places client
+uses (``/textsearch/json`` and ``/details/json``), for tests, benchmarks
+and offline development. Responses follow the shape of the real API.
+
+Usage:
+    uvicorn app.services.fake_places:app --port 8090
+    GOOGLE_PLACES_BASE_URL=http://localhost:8090
+"""
+
+import asyncio
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import FastAPI, Query
+
+# (name, country, latitude, longitude)
+DEFAULT_CITIES: Sequence[tuple] = (
+    ("Paris", "France", 48.856614, 2.3522219),
+    ("Lyon", "France", 45.764043, 4.835659),
+    ("Rome", "Italy", 41.9027835, 12.4963655),
+    ("Milan", "Italy", 45.4642035, 9.189982),
+    ("Lisbon", "Portugal", 38.7222524, -9.1393366),
+    ("Porto", "Portugal", 41.1579438, -8.6291053),
+    ("Vienna", "Austria", 48.2081743, 16.3738189),
+    ("Berlin", "Germany", 52.5200066, 13.404954),
+    ("Barcelona", "Spain", 41.3873974, 2.168568),
+    ("Madrid", "Spain", 40.4167754, -3.7037902),
+)
+
+
+def place_id_for(name: str, country: str) -> str:
+    return f"fake-{country.lower()}-{name.lower()}".replace(" ", "-")
+
+
+def create_fake_places(
+    cities: Optional[Sequence[tuple]] = None,
+    latency_seconds: float = 0.0,
+) -> FastAPI:
+    """
+    Build a fake Places server.
+
+    The app counts the requests it served per endpoint in
+    ``app.state.requests``. ``app.state.latency_seconds`` can be changed
+    while it runs, and setting ``app.state.error_status`` (e.g.
+    "OVER_QUERY_LIMIT") makes every request fail with that status.
+
+    Args:
+        cities: (name, country, latitude, longitude) rows it knows about
+        latency_seconds: Delay added to every response
+    """
+    places: Dict[str, Dict[str, Any]] = {}
+    for name, country, lat, lng in cities or DEFAULT_CITIES:
+        place_id = place_id_for(name, country)
+        places[place_id] = {
+            "place_id": place_id,
+            "name": name,
+            "formatted_address": f"{name}, {country}",
+            "geometry": {"location": {"lat": lat, "lng": lng}},
+            "address_components": [
+                {"long_name": name, "types": ["locality", "political"]},
+                {"long_name": country, "types": ["country", "political"]},
+            ],
+            "types": ["locality", "political"],
+        }
+
+    fake = FastAPI(title="Fake Google Places")
+    fake.state.requests = Counter()
+    fake.state.latency_seconds = latency_seconds
+    fake.state.error_status = None
+
+    async def respond(endpoint: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        fake.state.requests[endpoint] += 1
+        if fake.state.latency_seconds:
+            await asyncio.sleep(fake.state.latency_seconds)
+        if fake.state.error_status:
+            return {"status": fake.state.error_status}
+        return body
+
+    @fake.get("/textsearch/json")
+    async def text_search(query: str, key: str = "", type: str = ""):
+        needle = query.casefold()
+        results: List[Dict[str, Any]] = [
+            {
+                field: place[field]
+                for field in (
+                    "place_id",
+                    "name",
+                    "formatted_address",
+                    "geometry",
+                    "types",
+                )
+            }
+            for place in places.values()
+            if needle in place["formatted_address"].casefold()
+        ]
+        status = "OK" if results else "ZERO_RESULTS"
+        return await respond("textsearch", {"status": status, "results": results})
+
+    @fake.get("/details/json")
+    async def details(
+        place_id: str,
+        key: str = "",
+        fields: str = Query(default=""),
+    ):
+        place = places.get(place_id)
+        if place is None:
+            return await respond("details", {"status": "NOT_FOUND"})
+        return await respond("details", {"status": "OK", "result": place})
+
+    return fake
+
+
+app = create_fake_places()
@@ -0,0 +1,334 @@
+"""
+City Gazetteer
+
+Compact, read-only city name index for autocomplete, compiled from the
+``cities`` table or an offline dataset by
+``python -m app.commands.build_gazetteer``.
+
+Workers ``mmap`` the file instead of loading it, so every process on a
+host shares one copy through the page cache and a prefix query is a
+binary search over it, with no database or Places API call. A worker
+maps the file again once a rebuild has replaced it.
+
+Matches come back most popular first. Popularity is the order of the
+rows the file was built from; for prefixes matching more than
+``BUSY_RANGE`` cities the most popular ``TOP_MATCHES`` are stored at
+build time, so short prefixes cost no more than long ones.
+
+File layout (little-endian):
+
+    header   magic "TPGZ", format version, entry, busy prefix and top
+             match counts
+    entries  per city, sorted by normalized name: key offset and length,
+             record offset and length, relative to the data section, and
+             popularity rank
+    prefixes per busy prefix, sorted: index of its first entry, length,
+             offset and count of its top matches
+    tops     entry indices of each busy prefix's top matches, by rank
+    data     normalized names, then records of place_id, name and
+             formatted address separated by 0x1f
+"""
+
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+import unicodedata
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+MAGIC = b"TPGZ"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<4sIIII")
+ENTRY = struct.Struct("<IHIHI")
+PREFIX = struct.Struct("<IHII")
+TOP = struct.Struct("<I")
+FIELD_SEPARATOR = "\x1f"
+# Prefixes matching more cities than this get their top matches stored
+BUSY_RANGE = 256
+# Top matches stored per busy prefix; the search endpoint's largest limit
+TOP_MATCHES = 50
+# Sorts after every key with a given prefix; never part of UTF-8
+_PREFIX_END = b"\xff"
+
+
+def normalize_name(name: str) -> str:
+    """Index form of a city name: case, accents and spacing do not matter."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def build_gazetteer(
+    cities: Iterable[Tuple[str, str, Optional[str]]],
+    path: str,
+) -> int:
+    """
+    Write a gazetteer file.
+
+    The file is written next to ``path`` and renamed over it, so workers
+    with the old file mapped keep a consistent view until they reopen it.
+
+    Args:
+        cities: (place_id, name, formatted_address) rows, most popular
+            first; searches return earlier rows first
+        path: Where to write the file
+
+    Returns:
+        The number of cities written
+    """
+    rows: List[Tuple[bytes, bytes, int]] = []
+    for place_id, name, formatted_address in cities:
+        normalized = normalize_name(name)
+        if not normalized:
+            continue
+        fields = FIELD_SEPARATOR.join((place_id, name, formatted_address or ""))
+        rows.append((normalized.encode(), fields.encode(), len(rows)))
+    rows.sort(key=lambda row: row[0])
+
+    keys = bytearray()
+    records = bytearray()
+    spans = []
+    for key, record, rank in rows:
+        spans.append((len(keys), len(key), len(records), len(record), rank))
+        keys += key
+        records += record
+
+    busy = _busy_prefixes(rows)
+    tops = [index for _, _, top in busy for index in top]
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".gazetteer-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(rows), len(busy), len(tops)))
+            for key_offset, key_length, record_offset, record_length, rank in spans:
+                f.write(
+                    ENTRY.pack(
+                        key_offset,
+                        key_length,
+                        len(keys) + record_offset,
+                        record_length,
+                        rank,
+                    )
+                )
+            top_offset = 0
+            for start, length, top in busy:
+                f.write(PREFIX.pack(start, length, top_offset, len(top)))
+                top_offset += len(top)
+            for index in tops:
+                f.write(TOP.pack(index))
+            f.write(keys)
+            f.write(records)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(rows)
+
+
+def _busy_prefixes(
+    rows: List[Tuple[bytes, bytes, int]],
+) -> List[Tuple[int, int, List[int]]]:
+    """
+    Prefixes of the sorted rows' keys that match more than BUSY_RANGE rows.
+
+    Returns:
+        (index of the first matching row, prefix length, indices of the
+        TOP_MATCHES best ranked matching rows) per prefix, by prefix
+    """
+    busy = []
+    ranges = [(0, len(rows))]
+    length = 1
+    while ranges:
+        longer = []
+        for start, end in ranges:
+            index = start
+            while index < end:
+                prefix = rows[index][0][:length]
+                stop = index + 1
+                while stop < end and rows[stop][0][:length] == prefix:
+                    stop += 1
+                # Keys no longer than the prefix only match themselves
+                if len(prefix) == length and stop - index > BUSY_RANGE:
+                    top = heapq.nsmallest(
+                        TOP_MATCHES, range(index, stop), key=lambda i: rows[i][2]
+                    )
+                    busy.append((rows[index][0][:length], index, length, top))
+                    longer.append((index, stop))
+                index = stop
+        ranges = longer
+        length += 1
+    busy.sort()
+    return [(start, length, top) for _, start, length, top in busy]
+
+
+class _Keys:
+    """Sequence view of the sorted keys, for bisect."""
+
+    def __init__(self, gazetteer: "Gazetteer"):
+        self._gazetteer = gazetteer
+
+    def __len__(self) -> int:
+        return len(self._gazetteer)
+
+    def __getitem__(self, index: int) -> bytes:
+        return self._gazetteer._key(index)
+
+
+class _Prefixes:
+    """Sequence view of the sorted busy prefixes, for bisect."""
+
+    def __init__(self, gazetteer: "Gazetteer"):
+        self._gazetteer = gazetteer
+
+    def __len__(self) -> int:
+        return self._gazetteer._prefix_count
+
+    def __getitem__(self, index: int) -> bytes:
+        start, length, _, _ = self._gazetteer._prefix(index)
+        return self._gazetteer._key(start)[:length]
+
+
+class Gazetteer:
+    """
+    A memory-mapped gazetteer file.
+
+    Searches map the file at ``path`` again once its inode or mtime
+    changes, as when build_gazetteer replaces it; until then, and if the
+    new file cannot be read, the mapped file keeps answering.
+
+    Args:
+        path: File written by build_gazetteer
+
+    Raises:
+        ValueError: If the file is not a gazetteer of this format version
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._map = self._open()
+        self._keys = _Keys(self)
+        self._prefixes = _Prefixes(self)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _open(self) -> mmap.mmap:
+        """Map the file and read its header; the caller swaps the map in."""
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            new_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, prefix_count, top_count = HEADER.unpack_from(new_map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            new_map.close()
+            raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} gazetteer")
+
+        self._identity = (stat.st_ino, stat.st_mtime_ns)
+        self._count: int = count
+        self._prefix_count: int = prefix_count
+        self._prefix_table: int = HEADER.size + count * ENTRY.size
+        self._tops: int = self._prefix_table + prefix_count * PREFIX.size
+        self._data: int = self._tops + top_count * TOP.size
+        return new_map
+
+    def _reopen_if_replaced(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        if (stat.st_ino, stat.st_mtime_ns) == self._identity:
+            return
+        try:
+            new_map = self._open()
+        except (OSError, ValueError) as e:
+            # Not retried until the file changes again
+            self._identity = (stat.st_ino, stat.st_mtime_ns)
+            logger.warning("Gazetteer reload failed", path=self.path, error=str(e))
+            return
+        old_map, self._map = self._map, new_map
+        old_map.close()
+        logger.info("Gazetteer reloaded", path=self.path, cities=self._count)
+
+    def _entry(self, index: int) -> Tuple[int, int, int, int, int]:
+        return ENTRY.unpack_from(self._map, HEADER.size + index * ENTRY.size)
+
+    def _key(self, index: int) -> bytes:
+        key_offset, key_length, _, _, _ = self._entry(index)
+        start = self._data + key_offset
+        return self._map[start : start + key_length]
+
+    def _rank(self, index: int) -> int:
+        return self._entry(index)[4]
+
+    def _prefix(self, index: int) -> Tuple[int, int, int, int]:
+        return PREFIX.unpack_from(self._map, self._prefix_table + index * PREFIX.size)
+
+    def _top_matches(self, needle: bytes) -> Optional[List[int]]:
+        """Stored top matches of a busy prefix, or None if it is not one."""
+        index = bisect_left(self._prefixes, needle)
+        if index == self._prefix_count or self._prefixes[index] != needle:
+            return None
+        _, _, top_offset, top_count = self._prefix(index)
+        start = self._tops + top_offset * TOP.size
+        return [
+            TOP.unpack_from(self._map, start + i * TOP.size)[0]
+            for i in range(top_count)
+        ]
+
+    def _record(self, index: int) -> Dict[str, Any]:
+        _, _, record_offset, record_length, _ = self._entry(index)
+        start = self._data + record_offset
+        place_id, name, address = (
+            self._map[start : start + record_length].decode().split(FIELD_SEPARATOR)
+        )
+        return {
+            "place_id": place_id,
+            "name": name,
+            "formatted_address": address or None,
+        }
+
+    def search(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Cities whose normalized name starts with the normalized prefix.
+
+        Returns:
+            Up to ``limit`` matches, most popular first, shaped like
+            PlacesClient.search results
+        """
+        needle = normalize_name(prefix).encode()
+        if not needle:
+            return []
+        self._reopen_if_replaced()
+        top = self._top_matches(needle)
+        if top is not None and limit <= len(top):
+            matches = top[:limit]
+        else:
+            start = bisect_left(self._keys, needle)
+            end = bisect_left(self._keys, needle + _PREFIX_END, start)
+            matches = heapq.nsmallest(limit, range(start, end), key=self._rank)
+        return [self._record(index) for index in matches]
+
+
+def open_gazetteer(path: str) -> Optional[Gazetteer]:
+    """
+    Map the gazetteer at ``path``.
+
+    Returns:
+        The gazetteer, or None if no path is configured or the file has not
+        been built yet
+    """
+    if not path:
+        return None
+    if not os.path.exists(path):
+        logger.warning("Gazetteer not built, city search uses Places", path=path)
+        return None
+    return Gazetteer(path)
@@ -0,0 +1,271 @@
+"""
+Places Services
+
+Google Places client, the read-through cache in front of it, and the
+``cities`` rows that place details are persisted to.
+
+Search results and place details are cached per worker with their own
+TTLs. Empty searches and unknown place ids are cached too, for a shorter
+time, so repeated typos do not each cost an API call. Concurrent identical
+lookups share one request. Details also persist in ``cities``, keyed by
+``google_place_id``, which serves them to every worker until they are
+older than the details TTL.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import SingleFlight, TTLCache
+from app.core.database import dialect_insert
+from app.core.exceptions import ExternalServiceError
+from app.core.geo import city_geohash
+from app.core.ids import uuid7
+from app.models.city import City
+
+DETAILS_FIELDS = "place_id,name,formatted_address,geometry,address_components"
+
+
+class PlacesClient:
+    """
+    Minimal client for the Google Places web service.
+
+    Args:
+        base_url: Places API root, e.g. the fake server's URL in tests
+        api_key: Places API key
+        timeout_seconds: Per-request timeout
+        http: HTTP client to use instead of creating one
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        timeout_seconds: float = 5.0,
+        http: Optional[httpx.AsyncClient] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout_seconds = timeout_seconds
+        self._http = http
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.timeout_seconds)
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _get(self, endpoint: str, **params: str) -> Dict[str, Any]:
+        try:
+            response = await self.http.get(
+                f"{self.base_url}/{endpoint}/json",
+                params={**params, "key": self.api_key},
+            )
+        except httpx.HTTPError as e:
+            raise ExternalServiceError("Google Places", str(e))
+        if response.status_code != 200:
+            raise ExternalServiceError("Google Places", f"HTTP {response.status_code}")
+        body = response.json()
+        if body.get("status") not in ("OK", "ZERO_RESULTS", "NOT_FOUND"):
+            raise ExternalServiceError("Google Places", body.get("status"))
+        return body
+
+    async def search(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Search for cities matching free text.
+
+        Returns:
+            Matches with ``place_id``, ``name`` and ``formatted_address``
+
+        Raises:
+            ExternalServiceError: If the Places API fails
+        """
+        body = await self._get("textsearch", query=query, type="locality")
+        return [
+            {
+                "place_id": result["place_id"],
+                "name": result["name"],
+                "formatted_address": result.get("formatted_address"),
+            }
+            for result in body.get("results", [])
+        ]
+
+    async def details(self, place_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the details of a place, as ``cities`` column values.
+
+        Returns:
+            The details, or None if Google does not know the place
+
+        Raises:
+            ExternalServiceError: If the Places API fails
+        """
+        body = await self._get("details", place_id=place_id, fields=DETAILS_FIELDS)
+        if body["status"] != "OK":
+            return None
+        return _city_values(body["result"])
+
+
+def _city_values(place: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a Places details result to ``cities`` column values."""
+    country = next(
+        (
+            component["long_name"]
+            for component in place.get("address_components", [])
+            if "country" in component.get("types", [])
+        ),
+        None,
+    )
+    address = place.get("formatted_address")
+    if country is None:
+        country = address.rsplit(",", 1)[-1].strip() if address else ""
+    location = place.get("geometry", {}).get("location", {})
+    return {
+        "google_place_id": place["place_id"],
+        "name": place["name"],
+        "country": country,
+        "formatted_address": address,
+        "latitude": location.get("lat"),
+        "longitude": location.get("lng"),
+    }
+
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a search query: case and spacing do not matter."""
+    return " ".join(query.casefold().split())
+
+
+class PlacesCache:
+    """
+    Read-through cache in front of a PlacesClient.
+
+    Cached values are shared between callers and must not be mutated.
+    Errors from the Places API are never cached.
+    """
+
+    def __init__(
+        self,
+        client: PlacesClient,
+        search_ttl_seconds: float,
+        details_ttl_seconds: float,
+        negative_ttl_seconds: float,
+        max_entries: int,
+    ):
+        self.client = client
+        self.search_ttl_seconds = search_ttl_seconds
+        self.details_ttl_seconds = details_ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.searches = TTLCache(max_entries)
+        self.places = TTLCache(max_entries)
+        self._flights = SingleFlight()
+
+    async def search(self, query: str) -> List[Dict[str, Any]]:
+        """Search results for a query, from the cache when possible."""
+        key = normalize_query(query)
+        results = self.searches.get(key)
+        if results is not None:
+            return results
+        return await self._flights.do(("search", key), lambda: self._search(key))
+
+    async def _search(self, key: str) -> List[Dict[str, Any]]:
+        results = await self.client.search(key)
+        ttl = self.search_ttl_seconds if results else self.negative_ttl_seconds
+        self.searches.set(key, results, ttl)
+        return results
+
+    async def details(self, place_id: str) -> Optional[Dict[str, Any]]:
+        """Details of a place, or None if it does not exist."""
+        entry = self.places.get(place_id)
+        if entry is not None:
+            return entry[0]
+        return await self._flights.do(
+            ("details", place_id), lambda: self._details(place_id)
+        )
+
+    async def _details(self, place_id: str) -> Optional[Dict[str, Any]]:
+        details = await self.client.details(place_id)
+        ttl = self.details_ttl_seconds if details else self.negative_ttl_seconds
+        # Wrapped so a cached "not found" is told apart from a miss
+        self.places.set(place_id, (details,), ttl)
+        return details
+
+
+async def save_city(db: AsyncSession, values: Dict[str, Any]) -> City:
+    """
+    Create or refresh the city row of a place.
+
+    One INSERT ... ON CONFLICT (google_place_id) DO UPDATE covers both,
+    and revives a soft-deleted row, since Google still knows the place.
+
+    Args:
+        db: Database session; the caller commits
+        values: ``cities`` column values from PlacesClient.details
+
+    Returns:
+        The city
+    """
+    values = {
+        **values,
+        "geohash": city_geohash(values.get("latitude"), values.get("longitude")),
+    }
+    now = datetime.utcnow()
+    insert = dialect_insert(db)
+    stmt = insert(City).values(
+        id=uuid7(), created_at=now, updated_at=now, version=1, **values
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[City.google_place_id],
+        set_={
+            **{column: stmt.excluded[column] for column in values},
+            "updated_at": now,
+            "deleted_at": None,
+            "version": City.version + 1,
+        },
+    ).returning(City)
+    result = await db.execute(stmt, execution_options={"populate_existing": True})
+    return result.scalar_one()
+
+
+async def get_place_city(
+    db: AsyncSession,
+    places: PlacesCache,
+    place_id: str,
+) -> City:
+    """
+    Get the city for a Google place id, looking it up if needed.
+
+    A stored row younger than the details TTL is used as is; otherwise
+    the details are fetched through the cache and saved; the caller
+    commits.
+
+    Raises:
+        HTTPException: If Google does not know the place
+        ExternalServiceError: If the Places API fails
+    """
+    fresh_after = datetime.utcnow() - timedelta(seconds=places.details_ttl_seconds)
+    result = await db.execute(
+        select(City).where(
+            City.google_place_id == place_id,
+            City.updated_at > fresh_after,
+        )
+    )
+    city = result.scalar_one_or_none()
+    if city is not None:
+        return city
+
+    values = await places.details(place_id)
+    if values is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Place not found",
+        )
+    return await save_city(db, values)
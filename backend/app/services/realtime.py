@@ -0,0 +1,549 @@
+"""
+Real-Time Trip Rooms
+
+Fans trip events out to the clients watching each trip, over WebSocket
+or Server-Sent Events.
+
+Every connection owns a bounded send queue drained by its own task, so a
+broadcast never waits on any client's network. When a queue is full the
+slow-client policy decides what gives: "disconnect" closes the socket
+(the client reconnects and refetches), "drop_oldest" discards the oldest
+queued frame to make room for the new one.
+
+Events are published inside the transaction that makes the change and
+travel through the configured broker (see app.services.broker), so
+clients connected to any worker receive them once it commits. Every
+event carries the trip's event version; a room that sees a version skip
+sends its clients a "resync" frame telling them to refetch the trip.
+
+Vote events are coalesced per trip: the first one goes out at once and
+opens a window of ``realtime_coalesce_window_ms``; votes arriving inside
+it are merged into one "vote_summary_changed" frame, sent when the window
+closes, carrying the latest vote summary of each city they touched.
+Other events flush the merged votes first, so frames keep their order.
+
+Each room keeps its last ``realtime_replay_buffer_size`` frames, and
+outlives its last client by ``realtime_room_retention_seconds``. An SSE
+client reconnecting with ``Last-Event-ID`` is sent the frames it missed
+from there, or a "resync" frame when they are no longer all held.
+"""
+
+import asyncio
+import json
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterable,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import structlog
+from fastapi import WebSocket, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.trip import Trip
+from app.services.broker import (
+    InMemoryBroker,
+    PostgresBroker,
+    TripEventBroker,
+    TripEventMessage,
+)
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+SLOW_CLIENT_POLICIES = ("disconnect", "drop_oldest")
+# Events merged by the coalescing window; their data has city_id and vote_summary
+COALESCED_EVENTS = frozenset({"vote_cast", "vote_removed"})
+# Seconds to wait for a close frame to reach a client that stopped reading
+CLOSE_TIMEOUT_SECONDS = 1.0
+# Reconnection delay suggested to SSE clients, and the comment that keeps
+# idle streams from being cut by proxies
+SSE_RETRY_MS = 2000
+SSE_HEARTBEAT = ": heartbeat\n\n"
+
+
+def trip_event(
+    event_type: str,
+    data: Dict[str, Any],
+    version: Optional[int] = None,
+) -> str:
+    """Serialized event frame in the format documented in docs/API.md."""
+    frame = {
+        "type": event_type,
+        "data": jsonable_encoder(data),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+    }
+    if version is not None:
+        frame["version"] = version
+    return json.dumps(frame)
+
+
+def event_stream_frame(frame: str, version: Optional[int] = None) -> str:
+    """An event frame in text/event-stream format; its id is the event version."""
+    if version is None:
+        return f"data: {frame}\n\n"
+    return f"id: {version}\ndata: {frame}\n\n"
+
+
+class RoomConnection:
+    """A client in a trip room and its bounded send queue, whatever the transport."""
+
+    # Whether the connection takes frames in text/event-stream format
+    event_stream = False
+
+    def __init__(self, user_id: uuid.UUID, queue_size: int, policy: str):
+        if policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(
+                f"Slow client policy must be one of: {SLOW_CLIENT_POLICIES}"
+            )
+        self.user_id = user_id
+        self.policy = policy
+        self.dropped = 0
+        self.overflowed = asyncio.Event()
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(queue_size)
+
+    def offer(self, frame: str) -> bool:
+        """
+        Queue a frame without waiting.
+
+        Returns:
+            False when a frame was lost to the slow-client policy
+        """
+        if self.overflowed.is_set():
+            return False
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.policy == "drop_oldest":
+            self._queue.get_nowait()
+            self._queue.put_nowait(frame)
+            self.dropped += 1
+        else:
+            self.overflowed.set()
+        return False
+
+
+class WebSocketConnection(RoomConnection):
+    """A WebSocket client in a trip room."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: uuid.UUID,
+        queue_size: int,
+        policy: str,
+    ):
+        super().__init__(user_id, queue_size, policy)
+        self.websocket = websocket
+
+    async def serve(self) -> None:
+        """Deliver queued frames until the client leaves or falls behind."""
+        tasks = [
+            asyncio.create_task(self._send_frames()),
+            asyncio.create_task(self._read_until_closed()),
+            asyncio.create_task(self.overflowed.wait()),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # A failed send just means the client is gone
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.overflowed.is_set():
+            logger.info(
+                "Disconnecting slow WebSocket client", user_id=str(self.user_id)
+            )
+            try:
+                await asyncio.wait_for(
+                    self.websocket.close(code=status.WS_1013_TRY_AGAIN_LATER),
+                    CLOSE_TIMEOUT_SECONDS,
+                )
+            except Exception:
+                pass
+
+    async def _send_frames(self) -> None:
+        while True:
+            frame = await self._queue.get()
+            await self.websocket.send_text(frame)
+
+    async def _read_until_closed(self) -> None:
+        # Clients have nothing to say; reading is how a disconnect shows up
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+
+class EventStreamConnection(RoomConnection):
+    """A Server-Sent Events client in a trip room."""
+
+    event_stream = True
+
+    async def frames(self, heartbeat_seconds: float) -> AsyncIterator[str]:
+        """
+        Queued frames for the response body, and a heartbeat after every
+        ``heartbeat_seconds`` without one, until the client falls behind.
+        The client then reconnects and resumes from its last event id.
+        """
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while not self.overflowed.is_set():
+            try:
+                async with asyncio.timeout(heartbeat_seconds):
+                    frame = await self._queue.get()
+            except TimeoutError:
+                frame = SSE_HEARTBEAT
+            yield frame
+        logger.info("Disconnecting slow SSE client", user_id=str(self.user_id))
+
+
+class TripRooms:
+    """Connections grouped by the trip they watch."""
+
+    def __init__(
+        self,
+        queue_size: int,
+        policy: str,
+        coalesce_window_seconds: float = 0.0,
+        replay_size: int = 0,
+        retention_seconds: float = 0.0,
+    ):
+        self.queue_size = queue_size
+        self.policy = policy
+        self.coalesce_window_seconds = coalesce_window_seconds
+        self.replay_size = replay_size
+        self.retention_seconds = retention_seconds
+        # Events delivered to rooms, frames broadcast to rooms, and frames
+        # queued on connections (one per member of the room)
+        self.events_received = 0
+        self.frames_sent = 0
+        self.frames_queued = 0
+        self.frames_lost = 0
+        self.resyncs = 0
+        self.resumes = 0
+        self._rooms: Dict[uuid.UUID, Set[RoomConnection]] = {}
+        # Event version each room has seen up to
+        self._versions: Dict[uuid.UUID, int] = {}
+        # Each room's latest (version, event stream frame) pairs; every
+        # event after its floor version is in one of them (or still merging)
+        self._replay: Dict[uuid.UUID, Deque[Tuple[int, str]]] = {}
+        self._replay_floors: Dict[uuid.UUID, int] = {}
+        # Rooms without clients, due to close
+        self._expiries: Dict[uuid.UUID, asyncio.TimerHandle] = {}
+        # Open coalescing windows, and the vote summaries (by city) and
+        # latest version merged in them
+        self._windows: Dict[uuid.UUID, asyncio.TimerHandle] = {}
+        self._merged: Dict[uuid.UUID, Dict[str, Any]] = {}
+        self._merged_versions: Dict[uuid.UUID, int] = {}
+
+    def join(
+        self,
+        trip_id: uuid.UUID,
+        websocket: WebSocket,
+        user_id: uuid.UUID,
+        version: int = 0,
+    ) -> WebSocketConnection:
+        """Add a connection; ``version`` is the trip's event version when it joined."""
+        connection = WebSocketConnection(
+            websocket, user_id, self.queue_size, self.policy
+        )
+        self._add(trip_id, connection, version)
+        return connection
+
+    def join_stream(
+        self,
+        trip_id: uuid.UUID,
+        user_id: uuid.UUID,
+        version: int = 0,
+        last_event_id: Optional[int] = None,
+    ) -> EventStreamConnection:
+        """
+        Add an SSE connection. One resuming from ``last_event_id`` first
+        gets the frames it missed, or a resync frame.
+        """
+        connection = EventStreamConnection(user_id, self.queue_size, self.policy)
+        self._add(trip_id, connection, version)
+        if last_event_id is not None:
+            self._resume(trip_id, connection, last_event_id)
+        return connection
+
+    def _add(
+        self, trip_id: uuid.UUID, connection: RoomConnection, version: int
+    ) -> None:
+        if trip_id not in self._rooms:
+            self._rooms[trip_id] = set()
+            self._versions[trip_id] = version
+            if self.replay_size > 0:
+                self._replay[trip_id] = deque(maxlen=self.replay_size)
+                self._replay_floors[trip_id] = version
+        expiry = self._expiries.pop(trip_id, None)
+        if expiry is not None:
+            expiry.cancel()
+        self._rooms[trip_id].add(connection)
+
+    def _resume(
+        self,
+        trip_id: uuid.UUID,
+        connection: EventStreamConnection,
+        last_event_id: int,
+    ) -> None:
+        latest = self._versions[trip_id]
+        floor = self._replay_floors.get(trip_id)
+        if floor is not None and floor <= last_event_id <= latest:
+            self.resumes += 1
+            for version, frame in self._replay[trip_id]:
+                if version > last_event_id:
+                    connection.offer(frame)
+            return
+        self.resyncs += 1
+        frame = trip_event("resync", {"version": latest}, latest)
+        connection.offer(event_stream_frame(frame, latest))
+
+    def leave(self, trip_id: uuid.UUID, connection: RoomConnection) -> None:
+        room = self._rooms.get(trip_id)
+        if room is None:
+            return
+        room.discard(connection)
+        if room:
+            return
+        if self.retention_seconds > 0:
+            # Keep the room's replay buffer for clients about to reconnect
+            self._expiries[trip_id] = asyncio.get_running_loop().call_later(
+                self.retention_seconds, self._close_room, trip_id
+            )
+        else:
+            self._close_room(trip_id)
+
+    def _close_room(self, trip_id: uuid.UUID) -> None:
+        self._expiries.pop(trip_id, None)
+        if self._rooms.get(trip_id):
+            return
+        del self._rooms[trip_id]
+        del self._versions[trip_id]
+        self._replay.pop(trip_id, None)
+        self._replay_floors.pop(trip_id, None)
+        self._drop_merged(trip_id)
+        window = self._windows.pop(trip_id, None)
+        if window is not None:
+            window.cancel()
+
+    def trip_ids(self) -> Iterable[uuid.UUID]:
+        return self._rooms.keys()
+
+    def deliver(self, message: TripEventMessage) -> None:
+        """Broadcast an event from the broker, or a resync if events went missing."""
+        last = self._versions.get(message.trip_id)
+        if last is None or message.version <= last:
+            return
+        self._versions[message.trip_id] = message.version
+        self.events_received += 1
+        if message.version > last + 1 or message.data is None:
+            self._resync(message.trip_id, message.version)
+        elif message.type in COALESCED_EVENTS and self.coalesce_window_seconds > 0:
+            self._coalesce(message)
+        else:
+            self._flush(message.trip_id)
+            self.broadcast(message.trip_id, message.type, message.data, message.version)
+
+    def catch_up(self, trip_id: uuid.UUID, version: int) -> None:
+        """Resync a room whose trip moved on to ``version`` unseen."""
+        last = self._versions.get(trip_id)
+        if last is not None and version > last:
+            self._versions[trip_id] = version
+            self._resync(trip_id, version)
+
+    def _coalesce(self, message: TripEventMessage) -> None:
+        trip_id = message.trip_id
+        data = message.data
+        # deliver() resyncs on events that come without their data
+        assert data is not None
+        if trip_id not in self._windows:
+            self.broadcast(trip_id, message.type, data, message.version)
+            self._open_window(trip_id)
+            return
+        merged = self._merged.setdefault(trip_id, {})
+        # Re-insert so cities are listed in the order of their last change
+        merged.pop(data["city_id"], None)
+        merged[data["city_id"]] = data["vote_summary"]
+        self._merged_versions[trip_id] = message.version
+
+    def _open_window(self, trip_id: uuid.UUID) -> None:
+        self._windows[trip_id] = asyncio.get_running_loop().call_later(
+            self.coalesce_window_seconds, self._close_window, trip_id
+        )
+
+    def _close_window(self, trip_id: uuid.UUID) -> None:
+        del self._windows[trip_id]
+        # Keep merging while votes keep coming
+        if self._flush(trip_id):
+            self._open_window(trip_id)
+
+    def _flush(self, trip_id: uuid.UUID) -> bool:
+        """Send the votes merged so far, if any."""
+        merged = self._merged.pop(trip_id, None)
+        if not merged:
+            return False
+        summaries = [
+            {"city_id": city_id, "vote_summary": summary}
+            for city_id, summary in merged.items()
+        ]
+        version = self._merged_versions.pop(trip_id)
+        self.broadcast(
+            trip_id, "vote_summary_changed", {"summaries": summaries}, version
+        )
+        return True
+
+    def _drop_merged(self, trip_id: uuid.UUID) -> None:
+        self._merged.pop(trip_id, None)
+        self._merged_versions.pop(trip_id, None)
+
+    def _resync(self, trip_id: uuid.UUID, version: int) -> None:
+        # Clients refetch everything, merged votes included
+        self._drop_merged(trip_id)
+        self.resyncs += 1
+        logger.info("Trip events missed, resyncing clients", trip_id=str(trip_id))
+        self.broadcast(trip_id, "resync", {"version": version}, version)
+
+    def broadcast(
+        self,
+        trip_id: uuid.UUID,
+        event_type: str,
+        data: Dict[str, Any],
+        version: Optional[int] = None,
+    ) -> int:
+        """
+        Queue an event for everyone in a trip's room, and keep it for
+        replay when it has a version.
+
+        Returns:
+            The number of connections the event was offered to
+        """
+        room = self._rooms.get(trip_id)
+        if room is None:
+            return 0
+        frame = trip_event(event_type, data, version)
+        stream_frame = event_stream_frame(frame, version)
+        replay = self._replay.get(trip_id)
+        if replay is not None and version is not None:
+            if len(replay) == replay.maxlen:
+                self._replay_floors[trip_id] = replay[0][0]
+            replay.append((version, stream_frame))
+        if not room:
+            return 0
+        for connection in room:
+            if not connection.offer(stream_frame if connection.event_stream else frame):
+                self.frames_lost += 1
+        self.frames_sent += 1
+        self.frames_queued += len(room)
+        return len(room)
+
+    def room_size(self, trip_id: uuid.UUID) -> int:
+        return len(self._rooms.get(trip_id, ()))
+
+    def stats(self) -> Dict[str, int]:
+        """Counters since startup: events in, frames out."""
+        return {
+            "connections": len(self),
+            "rooms": len(self._rooms),
+            "events_received": self.events_received,
+            "frames_sent": self.frames_sent,
+            "frames_queued": self.frames_queued,
+            "frames_lost": self.frames_lost,
+            "resyncs": self.resyncs,
+            "resumes": self.resumes,
+        }
+
+    def __len__(self) -> int:
+        return sum(len(room) for room in self._rooms.values())
+
+
+def create_broker(rooms: TripRooms) -> TripEventBroker:
+    if settings.realtime_broker == "postgres":
+        return PostgresBroker(
+            rooms,
+            settings.database_url,
+            keepalive_seconds=settings.realtime_listener_keepalive_seconds,
+        )
+    return InMemoryBroker(rooms)
+
+
+trip_rooms = TripRooms(
+    settings.websocket_send_queue_size,
+    settings.websocket_slow_client_policy,
+    settings.realtime_coalesce_window_ms / 1000,
+    settings.realtime_replay_buffer_size,
+    settings.realtime_room_retention_seconds,
+)
+trip_broker = create_broker(trip_rooms)
+
+
+async def current_event_version(db: AsyncSession, trip_id: uuid.UUID) -> int:
+    """The trip's latest event version."""
+    version = await db.scalar(select(Trip.event_version).where(Trip.id == trip_id))
+    return version or 0
+
+
+async def publish_trip_events(
+    db: AsyncSession,
+    trip_id: uuid.UUID,
+    events: Sequence[Tuple[str, Dict[str, Any]]],
+) -> None:
+    """
+    Publish (type, data) events about changes made in the current
+    transaction; call as the last statement before committing. Clients
+    receive them once the transaction commits.
+
+    Bumping the event version locks the trip row until the commit, so
+    versions are handed out in commit order and concurrent writers to the
+    trip queue on it only for the commit itself.
+
+    ``data`` travels through the broker, so it should hold ids and small
+    values rather than whole objects.
+    """
+    if not events:
+        return
+    stmt = (
+        update(Trip)
+        .where(Trip.id == trip_id)
+        # Not a change to the trip itself
+        .values(
+            event_version=Trip.event_version + len(events),
+            updated_at=Trip.updated_at,
+        )
+        .returning(Trip.event_version)
+        .execution_options(synchronize_session=False)
+    )
+    last_version = (await db.execute(stmt)).scalar_one_or_none()
+    if last_version is None:
+        return
+
+    first_version = last_version - len(events) + 1
+    for version, (event_type, data) in enumerate(events, first_version):
+        message = TripEventMessage(trip_id, version, event_type, jsonable_encoder(data))
+        await trip_broker.publish(db, message)
+
+
+async def publish_trip_event(
+    db: AsyncSession,
+    trip_id: uuid.UUID,
+    event_type: str,
+    data: Dict[str, Any],
+) -> None:
+    """Publish one event; see publish_trip_events."""
+    await publish_trip_events(db, trip_id, [(event_type, data)])
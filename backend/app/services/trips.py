@@ -0,0 +1,378 @@
+"""
+Trip Services
+
+Trip lookup and membership checks shared by the trip, city and voting routes,
+the cache of rendered trip and vote responses they invalidate, and the delta
+sync of trip state for clients catching up.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import ColumnElement, func, literal, or_, select, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload, raiseload, selectinload
+
+from app.core.cache import TaggedCache, get_redis
+from app.core.config import settings
+from app.core.etags import content_version, row_stamps
+from app.core.pagination import encode_cursor, paginate_desc
+from app.models.city import City, TripCity
+from app.models.trip import Trip, TripMember, TripStatus, UserPreference
+from app.models.user import User
+from app.models.voting import CityVote
+from app.schemas.trips import (
+    TripChangesResponse,
+    TripCityResponse,
+    TripDeletedIds,
+    TripDetailResponse,
+)
+
+# Rendered trip and vote responses; writes to a trip invalidate trip_tag()
+response_cache = TaggedCache(
+    ttl_seconds=settings.response_cache_ttl_seconds,
+    max_entries=settings.response_cache_size,
+    shared=get_redis() if settings.response_cache_shared else None,
+    sync_seconds=settings.response_cache_sync_seconds,
+    early_refresh_beta=settings.response_cache_early_refresh_beta,
+    prefix="responses",
+)
+
+
+def trip_tag(trip_id: uuid.UUID) -> str:
+    """Cache tag of everything rendered from a trip and its cities and votes."""
+    return f"trip:{trip_id}"
+
+
+async def require_trip_member(
+    db: AsyncSession,
+    trip_id: uuid.UUID,
+    user_id: uuid.UUID,
+    lock: bool = False,
+) -> TripMember:
+    """
+    Get the membership of a user in a trip.
+
+    Args:
+        db: Database session
+        trip_id: Trip to check
+        user_id: User that must belong to the trip
+        lock: Lock the membership row until the transaction ends, which
+            serializes concurrent writes made on behalf of the same member
+
+    Returns:
+        The user's trip membership
+
+    Raises:
+        HTTPException: If the trip does not exist or the user is not a member
+    """
+    stmt = select(TripMember).where(
+        TripMember.trip_id == trip_id,
+        TripMember.user_id == user_id,
+    )
+    if lock:
+        # Row locks can only be taken on the primary
+        db.info["read_only"] = False
+        stmt = stmt.with_for_update()
+    result = await db.execute(stmt)
+    member = result.scalar_one_or_none()
+
+    if member is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found",
+        )
+
+    return member
+
+
+async def list_member_trips(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    trip_status: Optional[TripStatus] = None,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    List the trips a user belongs to, newest first.
+
+    Walks the user's memberships in the order of their copy of the trip's
+    created_at, with keyset pagination on (trip_created_at, trip_id), so
+    a page reads only its own rows of
+    ix_trip_members_user_id_trip_created_at_live no matter how many trips
+    exist or how deep the client has scrolled.
+
+    ``trip_status`` filters the joined trips and has no index of its own:
+    a user belongs to a handful of trips, so at worst the walk reads all
+    of their memberships. Indexing it would mean copying the status onto
+    every membership and rewriting them whenever a trip changes status.
+
+    Args:
+        db: Database session
+        user_id: Member whose trips are listed
+        trip_status: Only include trips with this status
+        cursor: Cursor returned with the previous page
+        limit: Page size
+
+    Returns:
+        The page of trips and the cursor for the next page, if any
+    """
+    # Counts every member, not only the membership the outer query walks
+    member_count = (
+        select(func.count(TripMember.id))
+        .where(TripMember.trip_id == Trip.id)
+        .correlate(Trip)
+        .scalar_subquery()
+    )
+    city_count = (
+        select(func.count(TripCity.id))
+        .where(TripCity.trip_id == Trip.id)
+        .scalar_subquery()
+    )
+
+    stmt = (
+        select(
+            Trip,
+            TripMember.trip_created_at,
+            member_count.label("member_count"),
+            city_count.label("city_count"),
+        )
+        .select_from(TripMember)
+        .join(Trip, Trip.id == TripMember.trip_id)
+        .where(TripMember.user_id == user_id)
+    )
+    if trip_status is not None:
+        stmt = stmt.where(Trip.status == trip_status.value)
+    stmt = paginate_desc(
+        stmt, TripMember.trip_created_at, TripMember.trip_id, cursor, limit
+    )
+
+    rows = (await db.execute(stmt)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.trip_created_at, last.Trip.id)
+
+    items = [
+        {
+            **row.Trip.to_dict(),
+            "member_count": row.member_count,
+            "city_count": row.city_count,
+        }
+        for row in rows
+    ]
+    return items, next_cursor
+
+
+async def load_trip_detail(db: AsyncSession, trip_id: uuid.UUID) -> Trip:
+    """
+    Load a trip with everything the trip page renders.
+
+    Members and cities are fetched with one SELECT ... IN query each, with
+    their users and cities joined in. Any other relationship access raises
+    instead of silently issuing a query per row.
+
+    Raises:
+        HTTPException: If the trip does not exist
+    """
+    stmt = (
+        select(Trip)
+        .where(Trip.id == trip_id)
+        .options(
+            selectinload(Trip.members).joinedload(TripMember.user, innerjoin=True),
+            selectinload(Trip.cities).joinedload(TripCity.city, innerjoin=True),
+            raiseload("*"),
+        )
+    )
+    result = await db.execute(stmt)
+    trip = result.scalar_one_or_none()
+
+    if trip is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found",
+        )
+
+    return trip
+
+
+async def render_trip_detail(db: AsyncSession, trip_id: uuid.UUID) -> Dict[str, Any]:
+    """Render the JSON-ready trip detail response for the response cache."""
+    trip = await load_trip_detail(db, trip_id)
+    return TripDetailResponse.model_validate(trip).model_dump(mode="json")
+
+
+async def render_trip_cities(
+    db: AsyncSession,
+    trip_id: uuid.UUID,
+) -> List[Dict[str, Any]]:
+    """Render the JSON-ready list of a trip's cities, oldest first."""
+    stmt = (
+        select(TripCity)
+        .where(TripCity.trip_id == trip_id)
+        .options(joinedload(TripCity.city, innerjoin=True), raiseload("*"))
+        .order_by(TripCity.created_at, TripCity.id)
+    )
+    trip_cities = (await db.execute(stmt)).scalars()
+    return [
+        TripCityResponse.model_validate(trip_city).model_dump(mode="json")
+        for trip_city in trip_cities
+    ]
+
+
+def _trip_cities_stamps(trip_id: uuid.UUID) -> list:
+    return [
+        row_stamps(TripCity, TripCity.trip_id == trip_id),
+        row_stamps(
+            City,
+            TripCity.trip_id == trip_id,
+            via=[(TripCity, TripCity.city_id == City.id)],
+        ),
+    ]
+
+
+async def trip_detail_version(db: AsyncSession, trip_id: uuid.UUID) -> int:
+    """Content version of the trip detail response, for its ETag."""
+    return await content_version(
+        db,
+        row_stamps(Trip, Trip.id == trip_id),
+        row_stamps(TripMember, TripMember.trip_id == trip_id),
+        row_stamps(
+            User,
+            TripMember.trip_id == trip_id,
+            via=[(TripMember, TripMember.user_id == User.id)],
+        ),
+        *_trip_cities_stamps(trip_id),
+    )
+
+
+async def trip_cities_version(db: AsyncSession, trip_id: uuid.UUID) -> int:
+    """Content version of the trip city list, for its ETag."""
+    return await content_version(db, *_trip_cities_stamps(trip_id))
+
+
+# Sync cursors count microseconds of row update time since the epoch
+_CURSOR_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Rows each delta sync reports, keyed as in the response
+_SYNCED_ROWS = (
+    ("members", TripMember),
+    ("cities", TripCity),
+    ("votes", CityVote),
+    ("preferences", UserPreference),
+)
+
+
+def _sync_cursor(at: datetime) -> int:
+    return (at - _CURSOR_EPOCH) // _MICROSECOND
+
+
+async def trip_changes(
+    db: AsyncSession,
+    trip_id: uuid.UUID,
+    since: Optional[int] = None,
+) -> TripChangesResponse:
+    """
+    Get the trip rows that changed after a sync cursor.
+
+    Rows count as changed when their ``updated_at`` is past the cursor;
+    members and cities also when their user or city changed. Rows
+    soft deleted since then are listed by id in ``deleted``.
+
+    The new cursor points ``trip_changes_overlap_seconds`` before the
+    sync, so a row committed late by a transaction still in flight, or
+    stamped by a worker whose clock runs slightly behind, is sent again
+    next time rather than missed. Clients apply rows by id, so repeats
+    are harmless.
+
+    Without a cursor, or with one older than ``trip_changes_max_age_hours``
+    (or from the future), every live row is returned instead, with
+    ``snapshot`` set: the client replaces what it holds.
+
+    Raises:
+        HTTPException: If the trip does not exist
+    """
+    # A lagging replica could still be missing rows older than the cursor
+    db.info["read_only"] = False
+
+    now = datetime.utcnow()
+    cursor = _sync_cursor(
+        now - timedelta(seconds=settings.trip_changes_overlap_seconds)
+    )
+    oldest = _sync_cursor(now - timedelta(hours=settings.trip_changes_max_age_hours))
+    changed_after: Optional[datetime] = None
+    if since is not None and oldest <= since <= _sync_cursor(now):
+        changed_after = _CURSOR_EPOCH + since * _MICROSECOND
+
+    def changed(*models: Any) -> ColumnElement[bool]:
+        if changed_after is None:
+            return true()
+        return or_(*(model.updated_at > changed_after for model in models))
+
+    trip = (
+        await db.execute(select(Trip).where(Trip.id == trip_id).options(raiseload("*")))
+    ).scalar_one_or_none()
+    if trip is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found",
+        )
+
+    members = await db.execute(
+        select(TripMember)
+        .join(TripMember.user)
+        .where(TripMember.trip_id == trip_id, changed(TripMember, User))
+        .options(contains_eager(TripMember.user), raiseload("*"))
+        .order_by(TripMember.joined_at, TripMember.id)
+    )
+    cities = await db.execute(
+        select(TripCity)
+        .join(TripCity.city)
+        .where(TripCity.trip_id == trip_id, changed(TripCity, City))
+        .options(contains_eager(TripCity.city), raiseload("*"))
+        .order_by(TripCity.created_at, TripCity.id)
+    )
+    votes = await db.execute(
+        select(CityVote)
+        .where(CityVote.trip_id == trip_id, changed(CityVote))
+        .options(raiseload("*"))
+        .order_by(CityVote.created_at, CityVote.id)
+    )
+    preferences = await db.execute(
+        select(UserPreference)
+        .where(UserPreference.trip_id == trip_id, changed(UserPreference))
+        .options(raiseload("*"))
+    )
+
+    deleted = TripDeletedIds()
+    if changed_after is not None:
+        # Tombstones of all four tables in one round trip
+        tombstones = union_all(
+            *(
+                select(literal(key).label("kind"), model.id).where(
+                    model.trip_id == trip_id,
+                    model.updated_at > changed_after,
+                    model.deleted_at.is_not(None),
+                )
+                for key, model in _SYNCED_ROWS
+            )
+        ).execution_options(include_deleted=True)
+        for kind, row_id in await db.execute(tombstones):
+            getattr(deleted, kind).append(row_id)
+
+    return TripChangesResponse(
+        cursor=cursor,
+        snapshot=changed_after is None,
+        event_version=trip.event_version,
+        trip=trip if changed_after is None or trip.updated_at > changed_after else None,
+        members=members.scalars().all(),
+        cities=cities.scalars().all(),
+        votes=votes.scalars().all(),
+        preferences=preferences.scalars().all(),
+        deleted=deleted,
+    )
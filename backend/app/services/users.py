@@ -0,0 +1,251 @@
+"""
+User Services
+
+Account creation and profile sync for Google sign-in, and the cache of
+authenticated users that spares each API request its users lookup.
+"""
+
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import structlog
+from sqlalchemy import DateTime, exists, false, or_, select, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.cache import TTLCache
+from app.core.database import dialect_insert
+from app.core.ids import uuid7
+from app.models.user import User
+
+logger = structlog.get_logger()
+
+
+async def upsert_google_user(
+    db: AsyncSession,
+    google_id: str,
+    email: str,
+    name: Optional[str],
+    avatar_url: Optional[str],
+) -> Tuple[User, bool]:
+    """
+    Create a user on first login or sync their Google profile afterwards.
+
+    One INSERT ... ON CONFLICT (google_id) DO UPDATE covers both cases and
+    cannot race with a concurrent first login into a unique violation.
+    The update only happens when email, name or avatar changed, so repeat
+    logins do not rewrite the row. Soft-deleted accounts are returned as
+    they are, never revived.
+
+    On PostgreSQL the unchanged row is read back by the same statement;
+    other databases need a second SELECT in that case.
+
+    Returns:
+        The user, and whether the row was inserted or updated
+    """
+    users = User.__table__
+    now = datetime.utcnow()
+    insert = dialect_insert(db)
+    stmt = insert(users).values(
+        id=uuid7(),
+        google_id=google_id,
+        email=email,
+        name=name,
+        avatar_url=avatar_url,
+        created_at=now,
+        updated_at=now,
+        version=1,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[users.c.google_id],
+        set_={
+            "email": stmt.excluded.email,
+            "name": stmt.excluded.name,
+            "avatar_url": stmt.excluded.avatar_url,
+            "updated_at": stmt.excluded.updated_at,
+            "version": users.c.version + 1,
+        },
+        where=users.c.deleted_at.is_(None)
+        & or_(
+            users.c.email.is_distinct_from(stmt.excluded.email),
+            users.c.name.is_distinct_from(stmt.excluded.name),
+            users.c.avatar_url.is_distinct_from(stmt.excluded.avatar_url),
+        ),
+    )
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Return the written row, or else the existing unchanged one
+        written = stmt.returning(*users.c, true().label("written")).cte("written")
+        unchanged = select(*users.c, false().label("written")).where(
+            users.c.google_id == google_id,
+            ~exists(select(written.c.id)),
+        )
+        query = select(User, written.c.written).from_statement(
+            union_all(select(written), unchanged)
+        )
+    else:
+        query = select(User, true().label("written")).from_statement(
+            stmt.returning(*users.c, true().label("written"))
+        )
+
+    execution_options = {"include_deleted": True, "populate_existing": True}
+    row = (await db.execute(query, execution_options=execution_options)).first()
+    if row is not None:
+        return row[0], row[1]
+
+    result = await db.execute(
+        select(User)
+        .where(User.google_id == google_id)
+        .execution_options(**execution_options)
+    )
+    return result.scalar_one(), False
+
+
+class PrincipalCache:
+    """
+    Cache of authenticated users, keyed by user id and access token.
+
+    Entries live for ``ttl_seconds`` but never past the token's ``exp``.
+    The in-process LRU tier answers most lookups; the optional shared tier
+    (a Redis client) lets workers reuse each other's lookups.
+
+    ``invalidate`` bumps a per-user generation, which drops the user's
+    entries in this worker and in the shared tier. Other workers' local
+    entries can lag by at most ``ttl_seconds``.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        shared: Any = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.local = TTLCache(max_entries)
+        self.shared = shared
+        self._generations = TTLCache(max_entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    @staticmethod
+    def _token_key(user_id: uuid.UUID, payload: Dict[str, Any]) -> str:
+        return f"principal:{user_id}:{payload.get('jti') or payload.get('exp')}"
+
+    @staticmethod
+    def _generation_key(user_id: uuid.UUID) -> str:
+        return f"principal:{user_id}:generation"
+
+    def _ttl(self, payload: Dict[str, Any]) -> float:
+        exp = payload.get("exp")
+        if exp is None:
+            return self.ttl_seconds
+        return min(self.ttl_seconds, exp - time.time())
+
+    async def load(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        payload: Dict[str, Any],
+    ) -> Optional[User]:
+        """
+        Get a cached user, attached to the session without a query.
+
+        Returns:
+            The user, or None on a cache miss
+        """
+        if not self.enabled:
+            return None
+
+        key = self._token_key(user_id, payload)
+        generation = self._generations.get(user_id, 0)
+        entry = self.local.get(key)
+        if entry is None or entry[0] != generation:
+            entry = await self._load_shared(user_id, key)
+            if entry is None:
+                return None
+            self.local.set(key, entry, self._ttl(payload))
+
+        user = _user_from_columns(entry[1])
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+
+    async def _load_shared(self, user_id: uuid.UUID, key: str) -> Optional[tuple]:
+        if self.shared is None:
+            return None
+        try:
+            raw, generation = await self.shared.mget(key, self._generation_key(user_id))
+        except Exception as e:
+            logger.warning("Shared principal cache unavailable", error=str(e))
+            return None
+        if raw is None:
+            return None
+        generation = int(generation or 0)
+        stored_generation, columns = json.loads(raw)
+        if stored_generation != generation:
+            return None
+        self._generations.set(user_id, generation, self.ttl_seconds)
+        return generation, columns
+
+    async def store(self, user: User, payload: Dict[str, Any]) -> None:
+        """Cache a user loaded for a token."""
+        ttl = self._ttl(payload)
+        if not self.enabled or ttl <= 0:
+            return
+
+        key = self._token_key(user.id, payload)
+        generation = self._generations.get(user.id, 0)
+        entry = (generation, _user_columns(user))
+        self.local.set(key, entry, ttl)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, json.dumps(entry), ex=max(1, int(ttl)))
+            except Exception as e:
+                logger.warning("Shared principal cache unavailable", error=str(e))
+
+    async def invalidate(self, user_id: uuid.UUID) -> None:
+        """Drop every cached entry of a user, e.g. after a profile change."""
+        if not self.enabled:
+            return
+
+        generation = self._generations.get(user_id, 0) + 1
+        if self.shared is not None:
+            try:
+                generation = await self.shared.incr(self._generation_key(user_id))
+                await self.shared.expire(
+                    self._generation_key(user_id), int(self.ttl_seconds) + 1
+                )
+            except Exception as e:
+                logger.warning("Shared principal cache unavailable", error=str(e))
+        self._generations.set(user_id, generation, self.ttl_seconds)
+
+
+def _user_columns(user: User) -> Dict[str, Any]:
+    """JSON-safe column values of a user."""
+    columns = {}
+    for column in User.__table__.columns:
+        value = getattr(user, column.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, uuid.UUID):
+            value = str(value)
+        columns[column.key] = value
+    return columns
+
+
+def _user_from_columns(columns: Dict[str, Any]) -> User:
+    """Rebuild a user from the output of ``_user_columns``."""
+    values = {}
+    for column in User.__table__.columns:
+        value = columns.get(column.key)
+        if value is not None:
+            if isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif column.key == "id":
+                value = uuid.UUID(value)
+        values[column.key] = value
+    return User(**values)
@@ -0,0 +1,510 @@
+"""
+Voting Services
+
+Vote casting and the per-city vote tallies stored on TripCity.
+
+Tallies are updated with relative UPDATEs in the same transaction as the
+vote write, so reading a city's vote summary never has to count votes.
+`reconcile_vote_tallies` rebuilds them from city_votes if they ever drift.
+"""
+
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import structlog
+from fastapi import HTTPException, status
+from sqlalchemy import and_, bindparam, case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.database import dialect_insert
+from app.core.etags import content_version, row_stamps
+from app.models.city import City, TripCity
+from app.models.user import User
+from app.models.voting import CityVote, VoteType
+from app.schemas.voting import CastVoteRequest
+
+logger = structlog.get_logger()
+
+# TripCity tally column for each vote type
+VOTE_COUNTERS: Dict[VoteType, str] = {
+    VoteType.LIKE: "like_count",
+    VoteType.DONT_MIND: "dont_mind_count",
+    VoteType.DISLIKE: "dislike_count",
+}
+
+
+def summary_from_counts(like: int, dont_mind: int, dislike: int) -> Dict[str, int]:
+    """Build a vote summary payload from tally values."""
+    return {"like": like, "dont_mind": dont_mind, "dislike": dislike}
+
+
+def _sync_tallies(trip_city: TripCity, summary: Dict[str, int]) -> None:
+    """Copy tallies written by a relative UPDATE onto the loaded TripCity."""
+    for vote_type, column in VOTE_COUNTERS.items():
+        set_committed_value(trip_city, column, summary[vote_type.value])
+
+
+async def get_trip_city(
+    db: AsyncSession,
+    trip_id: uuid.UUID,
+    city_id: uuid.UUID,
+) -> TripCity:
+    """
+    Get a city under consideration for a trip.
+
+    Raises:
+        HTTPException: If the city is not part of the trip
+    """
+    stmt = select(TripCity).where(
+        TripCity.trip_id == trip_id,
+        TripCity.city_id == city_id,
+    )
+    result = await db.execute(stmt)
+    trip_city = result.scalar_one_or_none()
+
+    if trip_city is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="City is not part of this trip",
+        )
+
+    return trip_city
+
+
+async def trip_votes_version(db: AsyncSession, trip_id: uuid.UUID) -> int:
+    """Content version of a trip's vote list, for its ETag."""
+    return await content_version(
+        db,
+        row_stamps(CityVote, CityVote.trip_id == trip_id),
+        row_stamps(
+            City,
+            CityVote.trip_id == trip_id,
+            via=[(CityVote, CityVote.city_id == City.id)],
+        ),
+        row_stamps(
+            User,
+            CityVote.trip_id == trip_id,
+            via=[(CityVote, CityVote.user_id == User.id)],
+        ),
+    )
+
+
+async def city_votes_version(
+    db: AsyncSession,
+    trip_id: uuid.UUID,
+    city_id: uuid.UUID,
+) -> int:
+    """Content version of a trip city's votes and tally, for its ETag."""
+    return await content_version(
+        db,
+        row_stamps(TripCity, TripCity.trip_id == trip_id, TripCity.city_id == city_id),
+        row_stamps(CityVote, CityVote.trip_id == trip_id, CityVote.city_id == city_id),
+    )
+
+
+async def apply_vote_delta(
+    db: AsyncSession,
+    trip_city: TripCity,
+    old: Optional[VoteType],
+    new: Optional[VoteType],
+) -> Optional[Dict[str, int]]:
+    """
+    Move one vote between tallies of a trip city.
+
+    Args:
+        db: Database session
+        trip_city: Voted trip city
+        old: Vote type being withdrawn, if any
+        new: Vote type being added, if any
+
+    Returns:
+        The updated vote summary, or None when nothing changed
+    """
+    if old == new:
+        return None
+
+    values: Dict[str, Any] = {}
+    if old is not None:
+        column = getattr(TripCity, VOTE_COUNTERS[old])
+        values[column.key] = column - 1
+    if new is not None:
+        column = getattr(TripCity, VOTE_COUNTERS[new])
+        values[column.key] = column + 1
+
+    stmt = (
+        update(TripCity)
+        .where(
+            TripCity.trip_id == trip_city.trip_id,
+            TripCity.city_id == trip_city.city_id,
+        )
+        .values(**values)
+        .returning(
+            TripCity.like_count,
+            TripCity.dont_mind_count,
+            TripCity.dislike_count,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(stmt)
+    return summary_from_counts(*result.one())
+
+
+async def cast_vote(
+    db: AsyncSession,
+    trip_city: TripCity,
+    user_id: uuid.UUID,
+    vote_type: VoteType,
+    comment: Optional[str] = None,
+) -> Tuple[CityVote, Dict[str, int]]:
+    """
+    Create or change a user's vote on a trip city.
+
+    The caller owns the transaction; the vote and the tally change are
+    flushed together and become visible on commit.
+
+    Returns:
+        The vote and the updated vote summary for the city
+    """
+    # Row locks can only be taken on the primary
+    db.info["read_only"] = False
+    stmt = (
+        select(CityVote)
+        .where(
+            CityVote.trip_id == trip_city.trip_id,
+            CityVote.city_id == trip_city.city_id,
+            CityVote.user_id == user_id,
+        )
+        .with_for_update()
+        # A withdrawn vote is revived instead of inserting a duplicate
+        .execution_options(include_deleted=True)
+    )
+    result = await db.execute(stmt)
+    vote = result.scalar_one_or_none()
+
+    old: Optional[VoteType] = None
+    if vote is None:
+        vote = CityVote(
+            trip_id=trip_city.trip_id,
+            city_id=trip_city.city_id,
+            user_id=user_id,
+            vote_type=vote_type,
+            comment=comment,
+        )
+        db.add(vote)
+    else:
+        if vote.is_deleted:
+            # Re-voting revives the row kept by the unique constraint
+            vote.restore()
+        else:
+            old = VoteType(vote.vote_type)
+        vote.vote_type = vote_type
+        vote.comment = comment
+        vote.version += 1
+
+    await db.flush()
+
+    summary = await apply_vote_delta(db, trip_city, old, vote_type)
+    if summary is None:
+        return vote, trip_city.vote_summary
+
+    _sync_tallies(trip_city, summary)
+    return vote, summary
+
+
+async def remove_vote(
+    db: AsyncSession,
+    trip_city: TripCity,
+    user_id: uuid.UUID,
+) -> Dict[str, int]:
+    """
+    Withdraw a user's vote on a trip city.
+
+    Returns:
+        The updated vote summary for the city
+
+    Raises:
+        HTTPException: If the user has no vote on the city
+    """
+    # Row locks can only be taken on the primary
+    db.info["read_only"] = False
+    stmt = (
+        select(CityVote)
+        .where(
+            CityVote.trip_id == trip_city.trip_id,
+            CityVote.city_id == trip_city.city_id,
+            CityVote.user_id == user_id,
+        )
+        .with_for_update()
+    )
+    result = await db.execute(stmt)
+    vote = result.scalar_one_or_none()
+
+    if vote is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Vote not found",
+        )
+
+    vote.soft_delete()
+    vote.version += 1
+    await db.flush()
+
+    summary = await apply_vote_delta(db, trip_city, VoteType(vote.vote_type), None)
+    # Withdrawing a vote always changes a tally
+    assert summary is not None
+    _sync_tallies(trip_city, summary)
+    return summary
+
+
+async def apply_vote_deltas(
+    db: AsyncSession,
+    trip_id: uuid.UUID,
+    deltas: Dict[uuid.UUID, Counter[VoteType]],
+) -> None:
+    """
+    Apply tally changes for several cities of a trip in one executemany.
+
+    Args:
+        db: Database session
+        trip_id: Trip of the voted cities
+        deltas: Per-city change of each vote type count
+    """
+    params: List[Dict[str, Any]] = []
+    # Rows are locked in city order, so two ballots over the same cities
+    # cannot each hold a row the other waits on
+    for city_id, delta in sorted(deltas.items()):
+        if any(delta.values()):
+            params.append({"b_city_id": city_id})
+            for vote_type, column in VOTE_COUNTERS.items():
+                params[-1][f"d_{column}"] = delta[vote_type]
+    if not params:
+        return
+
+    table = TripCity.__table__
+    stmt = (
+        update(table)
+        .where(table.c.trip_id == trip_id, table.c.city_id == bindparam("b_city_id"))
+        .values(
+            {
+                column: table.c[column] + bindparam(f"d_{column}")
+                for column in VOTE_COUNTERS.values()
+            }
+        )
+    )
+    await db.execute(stmt, params)
+
+
+async def cast_votes(
+    db: AsyncSession,
+    trip_id: uuid.UUID,
+    user_id: uuid.UUID,
+    ballots: Sequence[CastVoteRequest],
+) -> Tuple[List[CityVote], Dict[uuid.UUID, Dict[str, int]]]:
+    """
+    Create or change a user's votes on several cities of a trip at once.
+
+    All votes are written with a single multi-row INSERT ... ON CONFLICT
+    on uq_city_vote. The caller must hold the member lock from
+    require_trip_member so the previous votes read here stay current.
+
+    Returns:
+        The written votes and the updated vote summary per city
+
+    Raises:
+        HTTPException: If any city is not part of the trip
+    """
+    city_ids = [ballot.city_id for ballot in ballots]
+
+    # Validate the cities and read the user's previous live votes in one query
+    stmt = (
+        select(TripCity.city_id, CityVote.vote_type)
+        .outerjoin(
+            CityVote,
+            and_(
+                CityVote.trip_id == TripCity.trip_id,
+                CityVote.city_id == TripCity.city_id,
+                CityVote.user_id == user_id,
+            ),
+        )
+        .where(
+            TripCity.trip_id == trip_id,
+            TripCity.city_id.in_(city_ids),
+        )
+    )
+    previous: Dict[uuid.UUID, Optional[VoteType]] = {
+        city_id: VoteType(vote_type) if vote_type else None
+        for city_id, vote_type in await db.execute(stmt)
+    }
+
+    missing = [city_id for city_id in city_ids if city_id not in previous]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"City is not part of this trip: {missing[0]}",
+        )
+
+    now = datetime.utcnow()
+    insert = dialect_insert(db)
+    stmt = insert(CityVote).values(
+        [
+            {
+                "trip_id": trip_id,
+                "city_id": ballot.city_id,
+                "user_id": user_id,
+                "vote_type": ballot.vote_type.value,
+                "comment": ballot.comment,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for ballot in ballots
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["trip_id", "city_id", "user_id"],
+        set_={
+            "vote_type": stmt.excluded.vote_type,
+            "comment": stmt.excluded.comment,
+            "updated_at": stmt.excluded.updated_at,
+            "deleted_at": None,
+            "version": CityVote.version + 1,
+        },
+    ).returning(CityVote)
+    result = await db.execute(stmt, execution_options={"populate_existing": True})
+    votes = list(result.scalars())
+
+    deltas: Dict[uuid.UUID, Counter[VoteType]] = {}
+    for ballot in ballots:
+        delta = deltas.setdefault(ballot.city_id, Counter())
+        old = previous[ballot.city_id]
+        if old != ballot.vote_type:
+            if old is not None:
+                delta[old] -= 1
+            delta[ballot.vote_type] += 1
+    await apply_vote_deltas(db, trip_id, deltas)
+
+    stmt = select(
+        TripCity.city_id,
+        TripCity.like_count,
+        TripCity.dont_mind_count,
+        TripCity.dislike_count,
+    ).where(TripCity.trip_id == trip_id, TripCity.city_id.in_(city_ids))
+    summaries = {
+        city_id: summary_from_counts(*counts)
+        for city_id, *counts in await db.execute(stmt)
+    }
+
+    return votes, summaries
+
+
+async def _tally_drift(
+    db: AsyncSession,
+    trip_id: Optional[uuid.UUID],
+) -> List[Dict[str, Any]]:
+    """
+    Read how far each trip city's stored tallies are from its live votes.
+
+    Stored and counted values come from one statement, so a vote and its
+    tally update are either both seen or both missed.
+
+    Returns:
+        Per drifted trip city, its id and the change each tally needs
+    """
+    counts = select(
+        CityVote.trip_id,
+        CityVote.city_id,
+        *(
+            func.sum(case((CityVote.vote_type == vote_type.value, 1), else_=0)).label(
+                column
+            )
+            for vote_type, column in VOTE_COUNTERS.items()
+        ),
+    ).group_by(CityVote.trip_id, CityVote.city_id)
+    if trip_id is not None:
+        counts = counts.where(CityVote.trip_id == trip_id)
+    tallies = counts.subquery()
+
+    stmt = select(
+        TripCity.id,
+        *(
+            func.coalesce(tallies.c[column], 0) - TripCity.__table__.c[column]
+            for column in VOTE_COUNTERS.values()
+        ),
+    ).outerjoin(
+        tallies,
+        and_(
+            tallies.c.trip_id == TripCity.trip_id,
+            tallies.c.city_id == TripCity.city_id,
+        ),
+    )
+    if trip_id is not None:
+        stmt = stmt.where(TripCity.trip_id == trip_id)
+
+    drift = []
+    for row_id, *changes in await db.execute(stmt):
+        if any(changes):
+            drift.append(
+                {
+                    "b_id": row_id,
+                    **{
+                        f"d_{column}": change
+                        for column, change in zip(VOTE_COUNTERS.values(), changes)
+                    },
+                }
+            )
+    return drift
+
+
+async def reconcile_vote_tallies(
+    db: AsyncSession,
+    trip_id: Optional[uuid.UUID] = None,
+) -> int:
+    """
+    Rebuild TripCity vote tallies from the live rows in city_votes.
+
+    The trip cities are locked first, in the order vote writers lock them,
+    so votes arriving during the rebuild wait for it. Corrections are
+    applied as relative UPDATEs like vote tallies themselves, so even a
+    vote landing between the read and the write is kept.
+
+    Args:
+        db: Database session
+        trip_id: Limit the rebuild to one trip
+
+    Returns:
+        Number of trip cities whose tallies were corrected
+    """
+    # Row locks can only be taken on the primary
+    db.info["read_only"] = False
+    locked = (
+        select(TripCity.id)
+        .order_by(TripCity.trip_id, TripCity.city_id)
+        .with_for_update()
+    )
+    if trip_id is not None:
+        locked = locked.where(TripCity.trip_id == trip_id)
+    await db.execute(locked)
+
+    drift = await _tally_drift(db, trip_id)
+    if drift:
+        table = TripCity.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                {
+                    column: table.c[column] + bindparam(f"d_{column}")
+                    for column in VOTE_COUNTERS.values()
+                }
+            )
+        )
+        await db.execute(stmt, drift)
+        logger.warning(
+            "Corrected drifted vote tallies",
+            trip_id=str(trip_id) if trip_id else None,
+            corrected=len(drift),
+        )
+
+    return len(drift)
@@ -0,0 +1,446 @@
+"""
+Benchmark Support
+
+Shared setup for the benchmark scripts: a database engine with the schema
+created, seed data helpers, and timing/report utilities.
+
+Benchmarks default to an in-memory SQLite database so they run anywhere;
+pass --database-url to measure against PostgreSQL.
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import re
+import statistics
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import structlog
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, insert
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.sql.expression import BinaryExpression
+from sqlalchemy.sql.operators import custom_op
+
+from app.core.database import Base, get_db
+from app.core.security import create_access_token
+from app.models import City, Trip, TripCity, TripMember, TripRole, User
+
+SQLITE_MEMORY_URL = "sqlite+aiosqlite://"
+
+CITY_SYLLABLES = [
+    "ba",
+    "ber",
+    "ca",
+    "dor",
+    "el",
+    "fa",
+    "gra",
+    "ha",
+    "is",
+    "jo",
+    "ka",
+    "lin",
+    "ma",
+    "no",
+    "or",
+    "pa",
+    "qui",
+    "ra",
+    "san",
+    "to",
+    "ur",
+    "va",
+    "wen",
+    "zu",
+]
+
+# Keep per-request logging out of the measurements
+structlog.configure(
+    wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+)
+
+
+@compiles(UUID, "sqlite")
+def _compile_uuid_sqlite(type_, compiler, **kw):
+    """Store UUID columns as 32-char hex strings on SQLite."""
+    return "CHAR(32)"
+
+
+# pg_trgm setting read by the % operator
+TRIGRAM_THRESHOLD = "pg_trgm.similarity_threshold"
+
+
+def _trigrams(text: str) -> FrozenSet[str]:
+    trigrams = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        trigrams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(trigrams)
+
+
+def trigram_similarity(a: Optional[str], b: Optional[str]) -> Optional[float]:
+    """pg_trgm's similarity(): the share of word trigrams two strings share."""
+    if a is None or b is None:
+        return None
+    left, right = _trigrams(a), _trigrams(b)
+    if not left or not right:
+        return 0.0
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared)
+
+
+@compiles(BinaryExpression, "sqlite")
+def _compile_trigram_match(binary, compiler, **kw):
+    """Compile pg_trgm's ``a % b`` as a similarity() test against its threshold."""
+    if isinstance(binary.operator, custom_op) and binary.operator.opstring == "%":
+        return "similarity(%s, %s) >= current_setting('%s')" % (
+            compiler.process(binary.left, **kw),
+            compiler.process(binary.right, **kw),
+            TRIGRAM_THRESHOLD,
+        )
+    return compiler.visit_binary(binary, **kw)
+
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    """
+    Provide the PostgreSQL functions city search uses on the benchmark database:
+    pg_trgm's similarity(), greatest(), and set_config()/current_setting()
+    for the similarity threshold.
+    """
+    settings = {TRIGRAM_THRESHOLD: "0.3"}
+
+    def set_config(name, value, is_local):
+        settings[name] = value
+        return value
+
+    def current_setting(name):
+        return float(settings[name])
+
+    dbapi_connection.create_function(
+        "similarity", 2, trigram_similarity, deterministic=True
+    )
+    dbapi_connection.create_function("greatest", -1, max, deterministic=True)
+    dbapi_connection.create_function("set_config", 3, set_config)
+    dbapi_connection.create_function("current_setting", 1, current_setting)
+
+
+def base_parser(description: str) -> argparse.ArgumentParser:
+    """Argument parser with the options every benchmark accepts."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--database-url",
+        default=SQLITE_MEMORY_URL,
+        help="Async SQLAlchemy URL (default: in-memory SQLite)",
+    )
+    return parser
+
+
+async def create_engine(url: str = SQLITE_MEMORY_URL) -> AsyncEngine:
+    """Create an engine and a fresh schema for a benchmark run."""
+    if url.startswith("sqlite"):
+        engine = create_async_engine(
+            url,
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+        event.listen(engine.sync_engine, "connect", _register_sqlite_functions)
+    else:
+        engine = create_async_engine(url, pool_size=10)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+def session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False,
+    )
+
+
+@asynccontextmanager
+async def api_client(sessions: async_sessionmaker) -> AsyncIterator[AsyncClient]:
+    """In-process HTTP client for the API bound to the benchmark database."""
+    from app.main import app
+
+    async def override_get_db():
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://bench"
+        ) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+
+
+class WebSocketClient:
+    """
+    In-process WebSocket client talking ASGI straight to the app; open
+    connections inside ``api_client`` so they use the benchmark database.
+    """
+
+    def __init__(self, path: str):
+        path, _, query = path.partition("?")
+        self._scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+            "subprotocols": [],
+        }
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        # Cleared to stop reading, like a client whose network stalled
+        self.reading = asyncio.Event()
+        self.reading.set()
+        self.close_code: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _send(self, message) -> None:
+        await self.reading.wait()
+        await self._from_app.put(message)
+
+    async def connect(self) -> bool:
+        """Open the connection; False when the app refused it."""
+        from app.main import app
+
+        self._task = asyncio.create_task(app(self._scope, self._to_app.get, self._send))
+        await self._to_app.put({"type": "websocket.connect"})
+        message = await self._from_app.get()
+        if message["type"] == "websocket.close":
+            self.close_code = message.get("code", 1000)
+            return False
+        return True
+
+    async def receive_text(self) -> Optional[str]:
+        """Next text frame, or None once the server closed the connection."""
+        message = await self._from_app.get()
+        if message["type"] == "websocket.close":
+            self.close_code = message.get("code", 1000)
+            return None
+        return message["text"]
+
+    @property
+    def closed(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    async def close(self) -> None:
+        if self._task is None or self._task.done():
+            return
+        self.reading.set()
+        await self._to_app.put({"type": "websocket.disconnect", "code": 1000})
+        await self._task
+
+
+class EventStreamClient:
+    """
+    In-process Server-Sent Events client talking ASGI straight to the app;
+    open streams inside ``api_client`` so they use the benchmark database.
+    """
+
+    def __init__(self, path: str, headers: Optional[Dict[str, str]] = None):
+        path, _, query = path.partition("?")
+        self._scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"bench")]
+            + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+        self._requested = False
+        self._disconnected = asyncio.Event()
+        self._started = asyncio.Event()
+        self._frames: asyncio.Queue = asyncio.Queue()
+        self._buffer = ""
+        self.status_code: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _receive(self):
+        if not self._requested:
+            self._requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self._disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def _send(self, message) -> None:
+        if message["type"] == "http.response.start":
+            self.status_code = message["status"]
+            self._started.set()
+            return
+        self._buffer += message.get("body", b"").decode()
+        *frames, self._buffer = self._buffer.split("\n\n")
+        for frame in frames:
+            self._frames.put_nowait(frame)
+        if not message.get("more_body", False):
+            self._frames.put_nowait(None)
+
+    async def connect(self) -> bool:
+        """Send the request; False when the app refused it."""
+        from app.main import app
+
+        self._task = asyncio.create_task(app(self._scope, self._receive, self._send))
+        started = asyncio.create_task(self._started.wait())
+        await asyncio.wait([started, self._task], return_when=asyncio.FIRST_COMPLETED)
+        started.cancel()
+        return self.status_code == 200
+
+    async def receive_frame(self) -> Optional[str]:
+        """Next raw frame, or None once the server ended the stream."""
+        return await self._frames.get()
+
+    async def close(self) -> None:
+        if self._task is None or self._task.done():
+            return
+        self._disconnected.set()
+        await self._task
+
+
+def auth_headers(user: User) -> Dict[str, str]:
+    token = create_access_token(data={"sub": str(user.id), "email": user.email})
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def seed_trip(
+    session: AsyncSession,
+    city_count: int,
+    member_count: int = 1,
+) -> "tuple[Trip, List[User], List[City]]":
+    """Create a trip with members and candidate cities."""
+    users = [
+        User(google_id=f"bench-{i}", email=f"bench{i}@example.com", name=f"Bench {i}")
+        for i in range(member_count)
+    ]
+    session.add_all(users)
+    await session.flush()
+
+    trip = Trip(name="Benchmark Trip", owner_id=users[0].id)
+    session.add(trip)
+    await session.flush()
+
+    session.add_all(
+        TripMember(
+            trip_id=trip.id,
+            trip_created_at=trip.created_at,
+            user_id=user.id,
+            role=TripRole.OWNER if i == 0 else TripRole.MEMBER,
+        )
+        for i, user in enumerate(users)
+    )
+
+    cities = [
+        City(google_place_id=f"bench-place-{i}", name=f"City {i}", country="Benchland")
+        for i in range(city_count)
+    ]
+    session.add_all(cities)
+    await session.flush()
+    session.add_all(
+        TripCity(trip_id=trip.id, city_id=city.id, added_by=users[0].id)
+        for city in cities
+    )
+    await session.commit()
+    return trip, users, cities
+
+
+def synthetic_cities(count: int, seed: int = 11) -> List[Tuple[str, str, str]]:
+    """(place_id, name, formatted_address) rows with made-up city names."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        name = "".join(rng.choices(CITY_SYLLABLES, k=rng.randint(2, 4))).title()
+        rows.append((f"bench-place-{i}", name, f"{name}, Benchland"))
+    return rows
+
+
+async def seed_cities(
+    session: AsyncSession, rows: Sequence[Tuple[str, str, str]]
+) -> None:
+    """Bulk insert synthetic_cities rows into cities."""
+    now = datetime.utcnow()
+    for offset in range(0, len(rows), 5000):
+        await session.execute(
+            insert(City),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "google_place_id": place_id,
+                    "name": name,
+                    "country": "Benchland",
+                    "formatted_address": address,
+                    "created_at": now,
+                    "updated_at": now,
+                    "version": 1,
+                }
+                for place_id, name, address in rows[offset : offset + 5000]
+            ],
+        )
+    await session.commit()
+
+
+class Timer:
+    """Collect wall-clock samples in milliseconds."""
+
+    def __init__(self) -> None:
+        self.samples: List[float] = []
+        self._start: Optional[float] = None
+
+    def __enter__(self) -> "Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.samples.append((time.perf_counter() - self._start) * 1000)
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(title: str, rows: Dict[str, Sequence[float]], unit: str = "ms") -> None:
+    """Print mean/p50/p99 for each labelled set of samples."""
+    print(f"\n{title}")
+    print(f"{'':<32}{'mean':>10}{'p50':>10}{'p99':>10}")
+    for label, samples in rows.items():
+        print(
+            f"{label:<32}"
+            f"{statistics.fmean(samples):>8.3f}{unit}"
+            f"{percentile(samples, 50):>8.3f}{unit}"
+            f"{percentile(samples, 99):>8.3f}{unit}"
+        )
@@ -0,0 +1,89 @@
+"""
+Principal Cache Benchmark
+
+Measures /api/v1/auth/me throughput with the authenticated-user cache
+disabled and enabled, for a pool of users with one token each.
+
+Usage:
+    python -m benchmarks.bench_auth_me [--requests 5000] [--users 50]
+"""
+
+import asyncio
+import time
+
+from app.api.v1 import auth
+from app.models import User
+from app.services.users import PrincipalCache
+from benchmarks._support import (
+    Timer,
+    api_client,
+    auth_headers,
+    base_parser,
+    create_engine,
+    report,
+    session_factory,
+)
+
+CONCURRENCY = 20
+
+
+async def main(database_url: str, requests: int, user_count: int) -> None:
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+    async with sessions() as session:
+        users = [
+            User(
+                google_id=f"bench-{i}", email=f"bench{i}@example.com", name=f"Bench {i}"
+            )
+            for i in range(user_count)
+        ]
+        session.add_all(users)
+        await session.commit()
+    headers = [auth_headers(user) for user in users]
+
+    caches = {
+        "no cache": PrincipalCache(ttl_seconds=0, max_entries=0),
+        "principal cache": PrincipalCache(ttl_seconds=30, max_entries=10_000),
+    }
+    timers = {}
+    throughput = {}
+    original = auth.principal_cache
+    try:
+        async with api_client(sessions) as client:
+            for label, cache in caches.items():
+                auth.principal_cache = cache
+                timer = timers[label] = Timer()
+
+                async def call(i: int) -> None:
+                    with timer:
+                        response = await client.get(
+                            "/api/v1/auth/me", headers=headers[i % user_count]
+                        )
+                    assert response.status_code == 200
+
+                started = time.perf_counter()
+                for offset in range(0, requests, CONCURRENCY):
+                    batch = range(offset, min(offset + CONCURRENCY, requests))
+                    await asyncio.gather(*(call(i) for i in batch))
+                throughput[label] = requests / (time.perf_counter() - started)
+    finally:
+        auth.principal_cache = original
+
+    await engine.dispose()
+
+    report(
+        f"/auth/me latency, {requests} requests over {user_count} users, "
+        f"{CONCURRENCY} concurrent ({engine.dialect.name})",
+        {label: timer.samples for label, timer in timers.items()},
+    )
+    print()
+    for label, rate in throughput.items():
+        print(f"{label:<32}{rate:>10.0f} req/s")
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.requests, args.users))
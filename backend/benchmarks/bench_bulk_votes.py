@@ -0,0 +1,81 @@
+"""
+Bulk Vote Benchmark
+
+Compares the per-vote cost of swiping through a trip's candidate cities
+with one POST per vote against a single bulk request.
+
+Usage:
+    python -m benchmarks.bench_bulk_votes [--cities 40] [--rounds 20]
+"""
+
+import asyncio
+
+from app.models.voting import VoteType
+from benchmarks._support import (
+    Timer,
+    api_client,
+    auth_headers,
+    base_parser,
+    create_engine,
+    report,
+    seed_trip,
+    session_factory,
+)
+
+VOTE_TYPES = list(VoteType)
+
+
+async def main(database_url: str, city_count: int, rounds: int) -> None:
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+    async with sessions() as session:
+        trip, (user,), cities = await seed_trip(session, city_count)
+    headers = auth_headers(user)
+
+    single, bulk = Timer(), Timer()
+    async with api_client(sessions) as client:
+        for round_number in range(rounds):
+            # Alternate vote types so every round really changes the votes
+            vote_type = VOTE_TYPES[round_number % len(VOTE_TYPES)].value
+            with single:
+                for city in cities:
+                    response = await client.post(
+                        f"/api/v1/voting/trips/{trip.id}/votes",
+                        json={"city_id": str(city.id), "vote_type": vote_type},
+                        headers=headers,
+                    )
+                    response.raise_for_status()
+
+            vote_type = VOTE_TYPES[(round_number + 1) % len(VOTE_TYPES)].value
+            with bulk:
+                response = await client.post(
+                    f"/api/v1/voting/trips/{trip.id}/votes/bulk",
+                    json={
+                        "votes": [
+                            {"city_id": str(city.id), "vote_type": vote_type}
+                            for city in cities
+                        ]
+                    },
+                    headers=headers,
+                )
+                response.raise_for_status()
+
+    await engine.dispose()
+
+    report(
+        f"Per-vote cost, {city_count} cities x {rounds} rounds ({engine.dialect.name})",
+        {
+            "single POST per vote": [s / city_count for s in single.samples],
+            "one bulk POST": [s / city_count for s in bulk.samples],
+        },
+    )
+    speedup = sum(single.samples) / sum(bulk.samples)
+    print(f"\nBulk path is {speedup:.1f}x cheaper per vote")
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--cities", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.cities, args.rounds))
@@ -0,0 +1,82 @@
+"""
+City Import Benchmark
+
+Loads a generated gazetteer dataset into an empty cities table one ORM
+object at a time, as seed_database does, and with the chunked import
+command (binary COPY on PostgreSQL, batched upserts elsewhere), then
+re-imports it to measure the merge of unchanged rows.
+
+Usage:
+    python -m benchmarks.bench_city_import [--cities 50000] [--database-url ...]
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import delete
+
+from app.commands import import_cities
+from app.models import City
+from app.services.cities import IMPORT_COLUMNS, read_city_dataset
+from benchmarks._support import (
+    base_parser,
+    create_engine,
+    session_factory,
+    synthetic_cities,
+)
+
+
+def write_dataset(path: str, count: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("google_place_id\tname\tcountry\tlatitude\tlongitude\n")
+        for i, (place_id, name, _) in enumerate(synthetic_cities(count)):
+            f.write(f"{place_id}\t{name}\tBenchland\t{i % 90}.5\t{i % 180}.25\n")
+
+
+async def add_one_by_one(sessions, path: str) -> None:
+    async with sessions() as session:
+        for row in read_city_dataset(path):
+            session.add(City(**dict(zip(IMPORT_COLUMNS[1:], row[1:]))))
+        await session.commit()
+
+
+async def main(database_url: str, city_count: int) -> None:
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cities.tsv")
+        write_dataset(path, city_count)
+
+        timings = {}
+        started = time.perf_counter()
+        await add_one_by_one(sessions, path)
+        timings["ORM add per city"] = time.perf_counter() - started
+
+        async with sessions() as session:
+            await session.execute(delete(City))
+            await session.commit()
+
+        loader = (
+            "COPY + merge" if engine.dialect.name == "postgresql" else "batched upsert"
+        )
+        for label in (f"import_cities ({loader})", "re-import, unchanged"):
+            started = time.perf_counter()
+            await import_cities.run(path, sessions=sessions)
+            timings[label] = time.perf_counter() - started
+
+    print(f"\nCity import, {city_count} rows, {engine.dialect.name}")
+    print(f"{'':<32}{'seconds':>10}{'rows/s':>12}")
+    for label, seconds in timings.items():
+        print(f"{label:<32}{seconds:>10.2f}{city_count / seconds:>12,.0f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--cities", type=int, default=50_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.cities))
@@ -0,0 +1,108 @@
+"""
+Fuzzy City Search Benchmark
+
+Measures search_known_cities for misspelled city names at two similarity
+thresholds, and the ``name ILIKE '%query%'`` scan it replaces (which also
+misses every misspelling).
+
+Meant for PostgreSQL, where the trigram match uses the GIN indexes; the
+plan of one search is printed. On the default SQLite database every search
+scans the table and calls the Python similarity() stand-in, so use a
+smaller --cities there.
+
+Usage:
+    python -m benchmarks.bench_city_search \
+        --database-url postgresql+asyncpg://... [--cities 200000]
+"""
+
+import asyncio
+import random
+
+from sqlalchemy import select
+
+from app.models import City
+from app.services.cities import search_known_cities
+from benchmarks._support import (
+    Timer,
+    base_parser,
+    create_engine,
+    report,
+    seed_cities,
+    session_factory,
+    synthetic_cities,
+)
+
+QUERIES = 20
+LIMIT = 10
+THRESHOLDS = (0.3, 0.5)
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """Swap two adjacent letters."""
+    i = rng.randrange(len(name) - 1)
+    return name[:i] + name[i + 1] + name[i] + name[i + 2 :]
+
+
+async def main(database_url: str, city_count: int) -> None:
+    rows = synthetic_cities(city_count)
+    rng = random.Random(5)
+    queries = [misspell(rng.choice(rows)[1], rng) for _ in range(QUERIES)]
+
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+    async with sessions() as session:
+        await seed_cities(session, rows)
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql("ANALYZE cities")
+
+    timers = {}
+    hits = {}
+    async with sessions() as session:
+        for threshold in THRESHOLDS:
+            label = f"trigram, threshold {threshold}"
+            timer = timers[label] = Timer()
+            hits[label] = 0
+            for query in queries:
+                with timer:
+                    results = await search_known_cities(
+                        session, query, LIMIT, threshold
+                    )
+                hits[label] += bool(results)
+
+        label = "ILIKE '%query%'"
+        timer = timers[label] = Timer()
+        hits[label] = 0
+        for query in queries:
+            with timer:
+                result = await session.execute(
+                    select(City.google_place_id, City.name, City.formatted_address)
+                    .where(City.name.ilike(f"%{query}%"))
+                    .limit(LIMIT)
+                )
+            hits[label] += bool(result.all())
+
+    report(
+        f"Misspelled city search, {city_count} cities, {QUERIES} queries",
+        {label: timer.samples for label, timer in timers.items()},
+    )
+    print()
+    for label, found in hits.items():
+        print(f"{label:<32}{found:>10}/{QUERIES} found")
+
+    if engine.dialect.name == "postgresql":
+        match = select(City.id).where(City.name.op("%")(queries[0]))
+        sql = match.compile(engine, compile_kwargs={"literal_binds": True})
+        async with engine.connect() as conn:
+            plan = await conn.exec_driver_sql(f"EXPLAIN {sql}")
+            print("\nPlan of the trigram match:")
+            print("\n".join(row[0] for row in plan))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--cities", type=int, default=200_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.cities))
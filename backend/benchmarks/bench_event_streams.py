@@ -0,0 +1,189 @@
+"""
+Trip Event Stream Benchmark
+
+Holds thousands of in-process SSE connections to one trip through the
+real /sse/trips/{trip_id} endpoint, and measures what each held stream
+costs in memory, how long every client takes to receive an event, and
+how many dropped clients resume from Last-Event-ID rather than resync.
+
+For comparison, measures the cheapest poll a client without a stream
+would make instead: GET /api/v1/trips/{id} answered 304 from If-None-Match.
+
+Usage:
+    python -m benchmarks.bench_event_streams [--connections 2000] [--events 200]
+        [--reconnects 200] [--polls 2000] [--poll-interval 5]
+"""
+
+import asyncio
+import gc
+import tracemalloc
+
+from app.services.broker import TripEventMessage
+from app.services.realtime import trip_rooms
+from benchmarks._support import (
+    EventStreamClient,
+    Timer,
+    api_client,
+    auth_headers,
+    base_parser,
+    create_engine,
+    report,
+    seed_trip,
+    session_factory,
+)
+
+CONNECT_BATCH = 200
+
+
+class Delivery:
+    """Counts the clients that received the event in flight."""
+
+    def __init__(self, expected: int) -> None:
+        self.expected = expected
+        self.received = 0
+        self.done = asyncio.Event()
+
+    def start(self) -> None:
+        self.received = 0
+        self.done.clear()
+
+    async def read(self, client: EventStreamClient) -> None:
+        while (frame := await client.receive_frame()) is not None:
+            if frame.startswith("id:"):
+                self.received += 1
+                if self.received == self.expected:
+                    self.done.set()
+
+
+def traced_kb() -> float:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] / 1024
+
+
+async def main(
+    database_url: str,
+    connection_count: int,
+    event_count: int,
+    reconnect_count: int,
+    poll_count: int,
+    poll_interval: float,
+) -> None:
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+    async with sessions() as session:
+        trip, users, _ = await seed_trip(session, city_count=30, member_count=10)
+    headers = auth_headers(users[0])
+    url = f"/sse/trips/{trip.id}"
+    version = 0
+
+    def publish(count: int) -> None:
+        nonlocal version
+        for _ in range(count):
+            version += 1
+            trip_rooms.deliver(
+                TripEventMessage(
+                    trip.id, version, "city_added", {"city_id": str(trip.id)}
+                )
+            )
+
+    async with api_client(sessions) as http:
+        clients = [EventStreamClient(url, headers) for _ in range(connection_count)]
+        tracemalloc.start()
+        before = traced_kb()
+        for offset in range(0, connection_count, CONNECT_BATCH):
+            accepted = await asyncio.gather(
+                *(
+                    client.connect()
+                    for client in clients[offset : offset + CONNECT_BATCH]
+                )
+            )
+            assert all(accepted), "a stream was refused"
+        # Every stream has sent its first frame and waits on its queue
+        await asyncio.gather(*(client.receive_frame() for client in clients))
+        per_stream_kb = (traced_kb() - before) / connection_count
+        tracemalloc.stop()
+
+        delivery = Delivery(connection_count)
+        readers = [asyncio.create_task(delivery.read(client)) for client in clients]
+        delivery_timer = Timer()
+        for _ in range(event_count):
+            delivery.start()
+            with delivery_timer:
+                publish(1)
+                await delivery.done.wait()
+
+        # Drop some clients, publish while they are away, and bring them back
+        dropped = clients[:reconnect_count]
+        for client in dropped:
+            await client.close()
+        last_seen = version
+        publish(10)
+        stats_before = trip_rooms.stats()
+        returning = [
+            EventStreamClient(url, {**headers, "Last-Event-ID": str(last_seen)})
+            for _ in dropped
+        ]
+        await asyncio.gather(*(client.connect() for client in returning))
+        stats_after = trip_rooms.stats()
+
+        for reader in readers:
+            reader.cancel()
+        for client in clients[reconnect_count:] + returning:
+            await client.close()
+
+        detail_url = f"/api/v1/trips/{trip.id}"
+        etag = (await http.get(detail_url, headers=headers)).headers["etag"]
+        poll_timer = Timer()
+        for _ in range(poll_count):
+            with poll_timer:
+                response = await http.get(
+                    detail_url, headers={**headers, "If-None-Match": etag}
+                )
+            assert response.status_code == 304
+
+    await engine.dispose()
+
+    report(
+        f"{connection_count} SSE streams on one trip, {event_count} events",
+        {
+            "event delivered to every stream": delivery_timer.samples,
+            "304 poll (per request)": poll_timer.samples,
+        },
+    )
+    poll_ms = sum(poll_timer.samples) / len(poll_timer.samples)
+    print(
+        "\nPython heap per held stream (server and in-process client): "
+        f"{per_stream_kb:.1f}KB"
+    )
+    print(
+        f"Reconnects with Last-Event-ID: "
+        f"{stats_after['resumes'] - stats_before['resumes']} resumed, "
+        f"{stats_after['resyncs'] - stats_before['resyncs']} resynced "
+        f"of {reconnect_count}"
+    )
+    print(
+        f"{connection_count} clients polling every {poll_interval:g}s instead: "
+        f"{connection_count / poll_interval:.0f} requests/s, "
+        f"{connection_count / poll_interval * poll_ms / 1000:.2f} "
+        "worker-seconds per second"
+    )
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--reconnects", type=int, default=200)
+    parser.add_argument("--polls", type=int, default=2000)
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.database_url,
+            args.connections,
+            args.events,
+            args.reconnects,
+            args.polls,
+            args.poll_interval,
+        )
+    )
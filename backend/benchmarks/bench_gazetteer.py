@@ -0,0 +1,136 @@
+"""
+Gazetteer Benchmark
+
+Measures city autocomplete latency for 2-4 character prefixes from the
+memory-mapped gazetteer and from a ``name ILIKE 'prefix%'`` query on the
+cities table, then forks worker processes that map the same gazetteer and
+reports how much of it each one holds privately.
+
+Usage:
+    python -m benchmarks.bench_gazetteer [--cities 200000] [--workers 4]
+"""
+
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+
+from sqlalchemy import select
+
+from app.models import City
+from app.services.gazetteer import Gazetteer, build_gazetteer
+from benchmarks._support import (
+    Timer,
+    base_parser,
+    create_engine,
+    report,
+    seed_cities,
+    session_factory,
+    synthetic_cities,
+)
+
+QUERIES = 2000
+LIMIT = 10
+
+
+def mapping_usage(path: str) -> dict:
+    """Rss, Pss and private kB of this process's mapping of ``path``."""
+    usage = {"Rss": 0, "Pss": 0, "Private": 0}
+    inside = False
+    with open("/proc/self/smaps") as smaps:
+        for line in smaps:
+            field = line.split()
+            if not field[0].endswith(":"):
+                inside = line.rstrip().endswith(path)
+            elif inside and field[0] in ("Rss:", "Pss:"):
+                usage[field[0][:-1]] += int(field[1])
+            elif inside and field[0].startswith("Private_"):
+                usage["Private"] += int(field[1])
+    return usage
+
+
+def worker(path: str, prefixes: list, start, results) -> None:
+    gazetteer = Gazetteer(path)
+    for prefix in prefixes:
+        gazetteer.search(prefix, LIMIT)
+    # Read every record so the whole file is resident, then measure together
+    for index in range(len(gazetteer)):
+        gazetteer._record(index)
+    start.wait()
+    results.put(mapping_usage(os.path.realpath(path)))
+    start.wait()
+
+
+async def main(database_url: str, city_count: int, workers: int) -> None:
+    rows = synthetic_cities(city_count)
+    rng = random.Random(3)
+    prefixes = [rng.choice(rows)[1][: rng.randint(2, 4)] for _ in range(QUERIES)]
+
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+    async with sessions() as session:
+        await seed_cities(session, rows)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "gazetteer.bin")
+        build_gazetteer(rows, path)
+        gazetteer = Gazetteer(path)
+
+        gazetteer_timer = Timer()
+        for prefix in prefixes:
+            with gazetteer_timer:
+                gazetteer.search(prefix, LIMIT)
+
+        database_timer = Timer()
+        async with sessions() as session:
+            for prefix in prefixes:
+                with database_timer:
+                    await session.execute(
+                        select(City.google_place_id, City.name, City.formatted_address)
+                        .where(City.name.ilike(f"{prefix}%"))
+                        .order_by(City.name)
+                        .limit(LIMIT)
+                    )
+        gazetteer.close()
+
+        report(
+            f"City autocomplete, {city_count} cities, {QUERIES} prefix queries",
+            {
+                "gazetteer (mmap)": gazetteer_timer.samples,
+                "database ILIKE": database_timer.samples,
+            },
+        )
+
+        context = multiprocessing.get_context("fork")
+        start = context.Barrier(workers)
+        results = context.Queue()
+        processes = [
+            context.Process(target=worker, args=(path, prefixes, start, results))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        usages = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        print(
+            f"\nGazetteer file {os.path.getsize(path) / 1024:,.0f}kB, {workers} workers"
+        )
+        print(f"{'':<32}{'Rss':>10}{'Pss':>10}{'Private':>10}")
+        for i, usage in enumerate(usages):
+            print(
+                f"{f'worker {i}':<32}"
+                f"{usage['Rss']:>8,}kB{usage['Pss']:>8,}kB{usage['Private']:>8,}kB"
+            )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--cities", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.cities, args.workers))
@@ -0,0 +1,115 @@
+"""
+Nearby Cities Benchmark
+
+Measures "cities within a radius" lookups through the geohash index
+(nearby_cities) against a brute-force scan that reads every city's
+coordinates and ranks them all by haversine distance, and checks that
+both return the same cities.
+
+Usage:
+    python -m benchmarks.bench_nearby [--cities 1000000] [--radius-km 50]
+"""
+
+import asyncio
+import random
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from app.core.geo import city_geohash, nearest
+from app.models import City
+from app.services.cities import nearby_cities
+from benchmarks._support import (
+    Timer,
+    base_parser,
+    create_engine,
+    report,
+    session_factory,
+)
+
+QUERIES = 20
+LIMIT = 20
+
+
+async def seed(session, count: int, rng: random.Random) -> None:
+    now = datetime.utcnow()
+    for offset in range(0, count, 10_000):
+        rows = []
+        for i in range(offset, min(offset + 10_000, count)):
+            latitude = round(rng.uniform(-60, 70), 6)
+            longitude = round(rng.uniform(-180, 180), 6)
+            rows.append(
+                {
+                    "id": uuid.uuid4(),
+                    "google_place_id": f"bench-place-{i}",
+                    "name": f"City {i}",
+                    "country": "Benchland",
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "geohash": city_geohash(latitude, longitude),
+                    "created_at": now,
+                    "updated_at": now,
+                    "version": 1,
+                }
+            )
+        await session.execute(insert(City), rows)
+    await session.commit()
+
+
+async def brute_force(session, latitude, longitude, radius_km):
+    candidates = (
+        await session.execute(select(City.id, City.latitude, City.longitude))
+    ).all()
+    ranked = nearest(
+        latitude,
+        longitude,
+        [(float(lat), float(lng)) for _, lat, lng in candidates],
+        radius_km,
+        LIMIT,
+    )
+    return [candidates[index].id for index, _ in ranked]
+
+
+async def main(database_url: str, city_count: int, radius_km: float) -> None:
+    rng = random.Random(13)
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+    async with sessions() as session:
+        await seed(session, city_count, rng)
+    # Planner statistics, as a live database has them
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("ANALYZE cities")
+
+    points = [(rng.uniform(-55, 65), rng.uniform(-180, 180)) for _ in range(QUERIES)]
+    geohash_timer = Timer()
+    brute_timer = Timer()
+    mismatches = 0
+    async with sessions() as session:
+        for latitude, longitude in points:
+            with geohash_timer:
+                nearby = await nearby_cities(
+                    session, latitude, longitude, radius_km, LIMIT
+                )
+            with brute_timer:
+                expected = await brute_force(session, latitude, longitude, radius_km)
+            mismatches += [city.id for city, _ in nearby] != expected
+
+    report(
+        f"Cities within {radius_km:g}km, {city_count} cities, {QUERIES} lookups",
+        {
+            "geohash cells": geohash_timer.samples,
+            "brute-force scan": brute_timer.samples,
+        },
+    )
+    print(f"\nLookups whose results differ: {mismatches}/{QUERIES}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--cities", type=int, default=1_000_000)
+    parser.add_argument("--radius-km", type=float, default=50.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.cities, args.radius_km))
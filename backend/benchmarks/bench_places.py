@@ -0,0 +1,95 @@
+"""
+Places Cache Benchmark
+
+Replays a skewed stream of city searches and place lookups against the
+fake Places server with simulated network latency, straight through the
+client and through the read-through cache, and reports latency and the
+share of lookups answered without calling Places.
+
+Usage:
+    python -m benchmarks.bench_places [--lookups 5000] [--latency-ms 30]
+"""
+
+import argparse
+import asyncio
+import random
+
+import httpx
+
+from app.services.fake_places import DEFAULT_CITIES, create_fake_places, place_id_for
+from app.services.places import PlacesCache, PlacesClient
+from benchmarks._support import Timer, report
+
+CONCURRENCY = 20
+
+
+def workload(lookups: int, seed: int = 7) -> list:
+    """Zipf-like mix of searches (a tenth with no match) and detail lookups."""
+    rng = random.Random(seed)
+    queries = [name for name, *_ in DEFAULT_CITIES] + [
+        f"{name[:3]}xq" for name, *_ in DEFAULT_CITIES
+    ]
+    place_ids = [place_id_for(name, country) for name, country, *_ in DEFAULT_CITIES]
+    weights = [1 / rank for rank in range(1, len(queries) + 1)]
+    ops = []
+    for _ in range(lookups):
+        if rng.random() < 0.7:
+            ops.append(("search", rng.choices(queries, weights)[0]))
+        else:
+            ops.append(
+                ("details", rng.choices(place_ids, weights[: len(place_ids)])[0])
+            )
+    return ops
+
+
+async def main(lookups: int, latency_ms: float) -> None:
+    server = create_fake_places(latency_seconds=latency_ms / 1000)
+    ops = workload(lookups)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server)) as http:
+        client = PlacesClient("http://places.bench", "bench-key", http=http)
+        backends = {
+            "direct client": client,
+            "read-through cache": PlacesCache(
+                client,
+                search_ttl_seconds=3600,
+                details_ttl_seconds=86400,
+                negative_ttl_seconds=300,
+                max_entries=10_000,
+            ),
+        }
+        timers = {}
+        upstream = {}
+        for label, backend in backends.items():
+            server.state.requests.clear()
+            timer = timers[label] = Timer()
+
+            async def call(op: str, arg: str) -> None:
+                with timer:
+                    await getattr(backend, op)(arg)
+
+            for offset in range(0, lookups, CONCURRENCY):
+                await asyncio.gather(
+                    *(call(op, arg) for op, arg in ops[offset : offset + CONCURRENCY])
+                )
+            upstream[label] = sum(server.state.requests.values())
+
+    report(
+        f"Places lookups, {lookups} lookups, {CONCURRENCY} concurrent, "
+        f"{latency_ms:g}ms simulated latency",
+        {label: timer.samples for label, timer in timers.items()},
+    )
+    print()
+    for label, calls in upstream.items():
+        print(
+            f"{label:<32}{calls:>10} Places calls"
+            f"{1 - calls / lookups:>10.1%} hit rate"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.lookups, args.latency_ms))
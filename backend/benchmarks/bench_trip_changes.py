@@ -0,0 +1,116 @@
+"""
+Trip Catch-Up Benchmark
+
+A client that saw a vote change catches up with a trip where every member
+has voted on every city: by refetching the trip and its votes, against
+asking GET /api/v1/trips/{id}/changes for what changed since its cursor.
+Measures latency and body bytes per catch-up.
+
+The sync overlap is turned off, as the votes here are seconds apart at
+most; with the default overlap, rows changed within it are sent twice.
+
+Usage:
+    python -m benchmarks.bench_trip_changes [--syncs 500] [--members 10] [--cities 30]
+"""
+
+import asyncio
+
+from app.core.config import settings
+from benchmarks._support import (
+    Timer,
+    api_client,
+    auth_headers,
+    base_parser,
+    create_engine,
+    report,
+    seed_trip,
+    session_factory,
+)
+
+
+async def main(
+    database_url: str, syncs: int, member_count: int, city_count: int
+) -> None:
+    settings.trip_changes_overlap_seconds = 0.0
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+    async with sessions() as session:
+        trip, users, cities = await seed_trip(session, city_count, member_count)
+    headers = [auth_headers(user) for user in users]
+    votes_url = f"/api/v1/voting/trips/{trip.id}/votes"
+    changes_url = f"/api/v1/trips/{trip.id}/changes"
+
+    async with api_client(sessions) as client:
+        for user_headers in headers:
+            response = await client.post(
+                f"{votes_url}/bulk",
+                json={
+                    "votes": [
+                        {"city_id": str(city.id), "vote_type": "like"}
+                        for city in cities
+                    ]
+                },
+                headers=user_headers,
+            )
+            assert response.status_code == 200
+        cursor = (await client.get(changes_url, headers=headers[0])).json()["cursor"]
+
+        refetch_timer = Timer()
+        changes_timer = Timer()
+        refetch_bytes = changes_bytes = 0
+        for i in range(syncs):
+            # Someone changes their mind about a city
+            response = await client.post(
+                votes_url,
+                json={
+                    "city_id": str(cities[i % city_count].id),
+                    "vote_type": ("dislike", "like")[i % 2],
+                },
+                headers=headers[1 + i % (member_count - 1)],
+            )
+            assert response.status_code == 200
+
+            with refetch_timer:
+                detail = await client.get(
+                    f"/api/v1/trips/{trip.id}", headers=headers[0]
+                )
+                votes = await client.get(votes_url, headers=headers[0])
+            refetch_bytes += len(detail.content) + len(votes.content)
+
+            with changes_timer:
+                changes = await client.get(
+                    changes_url, params={"since": cursor}, headers=headers[0]
+                )
+            data = changes.json()
+            assert not data["snapshot"] and len(data["votes"]) == 1
+            cursor = data["cursor"]
+            changes_bytes += len(changes.content)
+
+    await engine.dispose()
+
+    report(
+        f"Catching up after one vote, {syncs} syncs, {member_count} members, "
+        f"{city_count} cities ({engine.dialect.name})",
+        {
+            "refetch trip + votes": refetch_timer.samples,
+            "changes since cursor": changes_timer.samples,
+        },
+    )
+    print()
+    print(
+        f"{'refetch trip + votes':<32}{refetch_bytes / syncs:>10.0f} "
+        "body bytes per sync"
+    )
+    print(
+        f"{'changes since cursor':<32}{changes_bytes / syncs:>10.0f} "
+        "body bytes per sync"
+    )
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--syncs", type=int, default=500)
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--cities", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.syncs, args.members, args.cities))
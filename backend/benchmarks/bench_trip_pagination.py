@@ -0,0 +1,132 @@
+"""
+Trip Pagination Benchmark
+
+Measures trip listing latency at page 1 and at a deep page with keyset
+(cursor) pagination, and with the OFFSET pagination it replaces.
+
+Usage:
+    python -m benchmarks.bench_trip_pagination [--pages 1000] [--per-page 20]
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, text
+
+from app.core.pagination import encode_cursor
+from app.models import Trip, TripMember, User
+from app.services.trips import list_member_trips
+from benchmarks._support import (
+    Timer,
+    base_parser,
+    create_engine,
+    report,
+    session_factory,
+)
+
+REPEATS = 50
+
+
+async def seed(session, trip_count: int) -> uuid.UUID:
+    user = User(google_id="bench", email="bench@example.com", name="Bench")
+    session.add(user)
+    await session.flush()
+
+    start = datetime(2020, 1, 1)
+    for offset in range(0, trip_count, 5000):
+        trips = [
+            {
+                "id": uuid.uuid4(),
+                "name": f"Trip {i}",
+                "owner_id": user.id,
+                "status": "planning",
+                "created_at": start + timedelta(minutes=i),
+                "updated_at": start + timedelta(minutes=i),
+                "version": 1,
+            }
+            for i in range(offset, min(offset + 5000, trip_count))
+        ]
+        await session.execute(insert(Trip), trips)
+        await session.execute(
+            insert(TripMember),
+            [
+                {
+                    "trip_id": trip["id"],
+                    "user_id": user.id,
+                    "role": "owner",
+                    "joined_at": start,
+                    "trip_created_at": trip["created_at"],
+                    "created_at": start,
+                    "updated_at": start,
+                    "version": 1,
+                }
+                for trip in trips
+            ],
+        )
+    await session.commit()
+    # Give the planner fresh statistics, as autovacuum would on PostgreSQL
+    await session.execute(text("ANALYZE"))
+    return user.id
+
+
+async def offset_page(session, user_id, page: int, per_page: int):
+    stmt = (
+        select(Trip)
+        .join(TripMember, TripMember.trip_id == Trip.id)
+        .where(TripMember.user_id == user_id)
+        .order_by(Trip.created_at.desc(), Trip.id.desc())
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+    )
+    return (await session.execute(stmt)).all()
+
+
+async def main(database_url: str, pages: int, per_page: int) -> None:
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+    async with sessions() as session:
+        user_id = await seed(session, pages * per_page + per_page)
+
+        # Cursor pointing at the last row of page (pages - 1)
+        stmt = (
+            select(Trip.created_at, Trip.id)
+            .order_by(Trip.created_at.desc(), Trip.id.desc())
+            .offset((pages - 1) * per_page - 1)
+            .limit(1)
+        )
+        deep_cursor = encode_cursor(*(await session.execute(stmt)).one())
+
+        timers = {
+            "keyset page 1": Timer(),
+            f"keyset page {pages}": Timer(),
+            "offset page 1": Timer(),
+            f"offset page {pages}": Timer(),
+        }
+        for _ in range(REPEATS):
+            with timers["keyset page 1"]:
+                await list_member_trips(session, user_id, limit=per_page)
+            with timers[f"keyset page {pages}"]:
+                items, _ = await list_member_trips(
+                    session, user_id, cursor=deep_cursor, limit=per_page
+                )
+            with timers["offset page 1"]:
+                await offset_page(session, user_id, 1, per_page)
+            with timers[f"offset page {pages}"]:
+                await offset_page(session, user_id, pages, per_page)
+        assert len(items) == per_page
+
+    await engine.dispose()
+
+    report(
+        f"Trip listing latency, {pages * per_page} trips ({engine.dialect.name})",
+        {label: timer.samples for label, timer in timers.items()},
+    )
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--per-page", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.pages, args.per_page))
@@ -0,0 +1,85 @@
+"""
+Unchanged Trip Poll Benchmark
+
+Measures polling GET /api/v1/trips/{id} for a trip that has not changed:
+a full response with the response cache off and warm, against a
+conditional GET whose If-None-Match still matches and gets a 304.
+
+Usage:
+    python -m benchmarks.bench_trip_poll [--polls 2000] [--members 10] [--cities 30]
+"""
+
+import asyncio
+
+from app.api.v1 import trips as trips_api
+from app.core.cache import TaggedCache
+from benchmarks._support import (
+    Timer,
+    api_client,
+    auth_headers,
+    base_parser,
+    create_engine,
+    report,
+    seed_trip,
+    session_factory,
+)
+
+
+async def main(
+    database_url: str, polls: int, member_count: int, city_count: int
+) -> None:
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+    async with sessions() as session:
+        trip, users, _ = await seed_trip(session, city_count, member_count)
+    headers = auth_headers(users[0])
+    url = f"/api/v1/trips/{trip.id}"
+
+    original = trips_api.response_cache
+    modes = {
+        "full, no cache": (TaggedCache(0, 1000), False),
+        "full, cached": (TaggedCache(60, 1000), False),
+        "If-None-Match -> 304": (TaggedCache(60, 1000), True),
+    }
+    timers = {}
+    transferred = {}
+    try:
+        async with api_client(sessions) as client:
+            for label, (cache, conditional) in modes.items():
+                trips_api.response_cache = cache
+                response = await client.get(url, headers=headers)
+                poll_headers = dict(headers)
+                if conditional:
+                    poll_headers["If-None-Match"] = response.headers["etag"]
+                expected = 304 if conditional else 200
+
+                timer = timers[label] = Timer()
+                size = 0
+                for _ in range(polls):
+                    with timer:
+                        response = await client.get(url, headers=poll_headers)
+                    assert response.status_code == expected
+                    size += len(response.content)
+                transferred[label] = size / polls
+    finally:
+        trips_api.response_cache = original
+
+    await engine.dispose()
+
+    report(
+        f"Unchanged trip poll, {polls} polls, {member_count} members, "
+        f"{city_count} cities ({engine.dialect.name})",
+        {label: timer.samples for label, timer in timers.items()},
+    )
+    print()
+    for label, size in transferred.items():
+        print(f"{label:<32}{size:>10.0f} body bytes per poll")
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--polls", type=int, default=2000)
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--cities", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.polls, args.members, args.cities))
@@ -0,0 +1,207 @@
+"""
+Trip Room Load Test
+
+Holds thousands of in-process WebSocket connections, spread over a number
+of trips, through the real /ws/trips/{trip_id} endpoint (token check and
+membership query included); a share of them stop reading as a stalled
+mobile client would. Broadcasts events to each trip in turn and measures
+how long publishing blocks the caller, how long every healthy client in
+the room takes to receive each event, and what the stalled clients cost.
+--trips 1 puts every connection in a single room.
+
+Usage:
+    python -m benchmarks.bench_trip_rooms [--connections 5000] [--trips 500]
+        [--slow-percent 2] [--events-per-trip 300] [--queue-size 256]
+"""
+
+import asyncio
+import random
+import resource
+import time
+
+from app.core.security import create_access_token
+from app.models import Trip, TripMember, TripRole
+from app.services.realtime import trip_rooms
+from benchmarks._support import (
+    Timer,
+    WebSocketClient,
+    api_client,
+    base_parser,
+    create_engine,
+    report,
+    seed_trip,
+    session_factory,
+)
+
+CONNECT_BATCH = 200
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Delivery:
+    """Counts the healthy clients that received the event in flight."""
+
+    def __init__(self) -> None:
+        self.expected = 0
+        self.received = 0
+        self.done = asyncio.Event()
+
+    def start(self, expected: int) -> None:
+        self.expected = expected
+        self.received = 0
+        self.done.clear()
+        if expected == 0:
+            self.done.set()
+
+    async def read(self, client: WebSocketClient) -> None:
+        while await client.receive_text() is not None:
+            self.received += 1
+            if self.received == self.expected:
+                self.done.set()
+
+
+async def seed_trips(session, trip_count: int, member_count: int):
+    """Trips sharing the same members."""
+    trip, users, _ = await seed_trip(session, city_count=1, member_count=member_count)
+    trips = [trip]
+    for i in range(1, trip_count):
+        trip = Trip(name=f"Benchmark Trip {i}", owner_id=users[0].id)
+        session.add(trip)
+        trips.append(trip)
+    await session.flush()
+    session.add_all(
+        TripMember(
+            trip_id=trip.id,
+            trip_created_at=trip.created_at,
+            user_id=user.id,
+            role=TripRole.OWNER if j == 0 else TripRole.MEMBER,
+        )
+        for trip in trips[1:]
+        for j, user in enumerate(users)
+    )
+    await session.commit()
+    return trips, users
+
+
+async def main(
+    database_url: str,
+    connection_count: int,
+    trip_count: int,
+    slow_percent: float,
+    events_per_trip: int,
+    queue_size: int,
+) -> None:
+    trip_rooms.queue_size = queue_size
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+    async with sessions() as session:
+        trips, users = await seed_trips(session, trip_count, member_count=10)
+    tokens = [
+        create_access_token(data={"sub": str(user.id), "email": user.email})
+        for user in users
+    ]
+
+    slow_count = round(connection_count * slow_percent / 100)
+    # Connection i watches trip i % trip_count
+    clients = [
+        WebSocketClient(
+            f"/ws/trips/{trips[i % trip_count].id}?token={tokens[i % len(tokens)]}"
+        )
+        for i in range(connection_count)
+    ]
+    async with api_client(sessions):
+        rss_before = peak_rss_mb()
+        started = time.perf_counter()
+        for offset in range(0, connection_count, CONNECT_BATCH):
+            accepted = await asyncio.gather(
+                *(
+                    client.connect()
+                    for client in clients[offset : offset + CONNECT_BATCH]
+                )
+            )
+            assert all(accepted), "a connection was refused"
+        connect_seconds = time.perf_counter() - started
+        rss_growth = peak_rss_mb() - rss_before
+
+        slow = random.Random(7).sample(clients, slow_count)
+        for client in slow:
+            client.reading.clear()
+        healthy = [client for client in clients if client.reading.is_set()]
+        healthy_per_trip = [0] * trip_count
+        for i, client in enumerate(clients):
+            healthy_per_trip[i % trip_count] += client.reading.is_set()
+        delivery = Delivery()
+        readers = [asyncio.create_task(delivery.read(client)) for client in healthy]
+
+        publish_timer = Timer()
+        delivery_timer = Timer()
+        for i in range(events_per_trip * trip_count):
+            trip_index = i % trip_count
+            delivery.start(healthy_per_trip[trip_index])
+            with delivery_timer:
+                with publish_timer:
+                    trip_rooms.broadcast(
+                        trips[trip_index].id,
+                        "vote_cast",
+                        {
+                            "city_id": trips[trip_index].id,
+                            "user_id": users[i % len(users)].id,
+                            "vote_type": "like",
+                            "vote_summary": {"like": i, "dont_mind": 0, "dislike": 0},
+                        },
+                    )
+                await delivery.done.wait()
+
+        # Give the slow clients' close handshakes time to give up
+        await asyncio.sleep(1.5)
+        still_open = len(trip_rooms)
+        slow_dropped = sum(client.closed for client in slow)
+
+        for reader in readers:
+            reader.cancel()
+        for client in clients:
+            await client.close()
+
+    report(
+        f"{connection_count} connections in {trip_count} trips ({slow_count} stalled), "
+        f"{events_per_trip} events per trip, send queue {queue_size}",
+        {
+            "broadcast (publisher blocked)": publish_timer.samples,
+            "delivered to every healthy client": delivery_timer.samples,
+        },
+    )
+    print(
+        f"\nConnected in {connect_seconds:.2f}s "
+        f"({connection_count / connect_seconds:.0f}/s)"
+    )
+    print(
+        f"Peak RSS growth while connecting: {rss_growth:.1f}MB "
+        f"({rss_growth * 1024 / connection_count:.1f}KB per connection)"
+    )
+    print(f"Stalled clients disconnected: {slow_dropped}/{slow_count}")
+    print(f"Connections left open: {still_open}/{len(healthy)} healthy")
+    print(f"Frames lost to full queues: {trip_rooms.frames_lost}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--trips", type=int, default=500)
+    parser.add_argument("--slow-percent", type=float, default=2.0)
+    parser.add_argument("--events-per-trip", type=int, default=300)
+    parser.add_argument("--queue-size", type=int, default=256)
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.database_url,
+            args.connections,
+            args.trips,
+            args.slow_percent,
+            args.events_per_trip,
+            args.queue_size,
+        )
+    )
@@ -0,0 +1,94 @@
+"""
+Trip Detail Stampede Benchmark
+
+Fires bursts of concurrent GET /api/v1/trips/{id} requests from different
+members at a cold cache, as when a trip link is shared in a group chat,
+and counts how many trip detail loads each burst runs.
+
+Usage:
+    python -m benchmarks.bench_trip_stampede [--burst 50] [--bursts 20] [--cities 30]
+"""
+
+import asyncio
+
+from app.api.v1 import trips as trips_api
+from app.core.cache import TaggedCache
+from benchmarks._support import (
+    Timer,
+    api_client,
+    auth_headers,
+    base_parser,
+    create_engine,
+    report,
+    seed_trip,
+    session_factory,
+)
+
+
+async def main(database_url: str, burst: int, bursts: int, city_count: int) -> None:
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+    async with sessions() as session:
+        trip, users, _ = await seed_trip(session, city_count, member_count=burst)
+    headers = [auth_headers(user) for user in users]
+    url = f"/api/v1/trips/{trip.id}"
+
+    loads = []
+    render_trip_detail = trips_api.render_trip_detail
+
+    async def counting_render(db, trip_id):
+        loads.append(None)
+        return await render_trip_detail(db, trip_id)
+
+    caches = {
+        "no cache": TaggedCache(0, 1000),
+        "single-flight cache": TaggedCache(60, 1000),
+    }
+    timers = {}
+    load_counts = {}
+    original = trips_api.response_cache
+    trips_api.render_trip_detail = counting_render
+    try:
+        async with api_client(sessions) as client:
+            # Warm the principal cache so bursts measure the trip read
+            for member_headers in headers:
+                await client.get("/api/v1/auth/me", headers=member_headers)
+
+            for label, cache in caches.items():
+                trips_api.response_cache = cache
+                timer = timers[label] = Timer()
+                loads.clear()
+
+                async def call(i: int) -> None:
+                    with timer:
+                        response = await client.get(url, headers=headers[i])
+                    assert response.status_code == 200
+
+                for _ in range(bursts):
+                    # Every burst starts cold, as after an invalidation
+                    await cache.invalidate(f"trip:{trip.id}")
+                    await asyncio.gather(*(call(i) for i in range(burst)))
+                load_counts[label] = len(loads) / bursts
+    finally:
+        trips_api.response_cache = original
+        trips_api.render_trip_detail = render_trip_detail
+
+    await engine.dispose()
+
+    report(
+        f"Trip detail latency, {bursts} cold bursts of {burst} concurrent "
+        f"requests, {city_count} cities ({engine.dialect.name})",
+        {label: timer.samples for label, timer in timers.items()},
+    )
+    print()
+    for label, count in load_counts.items():
+        print(f"{label:<32}{count:>10.1f} detail loads per burst")
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--cities", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.burst, args.bursts, args.cities))
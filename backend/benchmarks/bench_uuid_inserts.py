@@ -0,0 +1,125 @@
+"""
+UUID Primary Key Insert Benchmark
+
+Fills city_votes with random (v4) and time-ordered (v7) primary keys and
+compares insert throughput as the table grows, plus the final size of the
+primary key index.
+
+Usage:
+    python -m benchmarks.bench_uuid_inserts [--rows 2000000] [--batch 20000]
+
+Use a file or PostgreSQL database for realistic numbers; the in-memory
+default never has to go to disk for index pages:
+    python -m benchmarks.bench_uuid_inserts \\
+        --database-url sqlite+aiosqlite:///bench_uuid.db
+"""
+
+import asyncio
+import math
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from sqlalchemy import insert, text
+
+from app.core.ids import uuid7
+from app.models import CityVote
+from benchmarks._support import base_parser, create_engine, seed_trip, session_factory
+
+GENERATORS: Dict[str, Callable[[], uuid.UUID]] = {
+    "uuid4": uuid.uuid4,
+    "uuid7": uuid7,
+}
+
+
+async def primary_key_size(session) -> int:
+    """Size of the city_votes primary key index in bytes."""
+    if session.get_bind().dialect.name == "sqlite":
+        stmt = text(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = ("
+            "SELECT name FROM sqlite_master WHERE type = 'index' "
+            "AND tbl_name = 'city_votes' AND sql IS NULL ORDER BY name LIMIT 1)"
+        )
+    else:
+        stmt = text("SELECT pg_relation_size('pk_city_votes')")
+    return (await session.execute(stmt)).scalar() or 0
+
+
+async def run(database_url: str, generate: Callable, rows: int, batch: int) -> Dict:
+    engine = await create_engine(database_url)
+    sessions = session_factory(engine)
+
+    # Every vote needs a distinct (trip, city, user)
+    member_count = 1000
+    city_count = math.ceil(rows / member_count)
+    async with sessions() as session:
+        trip, users, cities = await seed_trip(session, city_count, member_count)
+
+    now = datetime.utcnow()
+    chunk_rates: List[float] = []
+    async with sessions() as session:
+        for offset in range(0, rows, batch):
+            votes = [
+                {
+                    "id": generate(),
+                    "trip_id": trip.id,
+                    "city_id": cities[i // member_count].id,
+                    "user_id": users[i % member_count].id,
+                    "vote_type": "like",
+                    "created_at": now,
+                    "updated_at": now,
+                    "version": 1,
+                }
+                for i in range(offset, min(offset + batch, rows))
+            ]
+            started = time.perf_counter()
+            await session.execute(insert(CityVote), votes)
+            await session.commit()
+            chunk_rates.append(len(votes) / (time.perf_counter() - started))
+
+        index_bytes = await primary_key_size(session)
+
+    await engine.dispose()
+
+    tail = chunk_rates[-max(1, len(chunk_rates) // 10) :]
+    return {
+        "first": chunk_rates[0],
+        "last": sum(tail) / len(tail),
+        "overall": len(chunk_rates) / sum(1 / rate for rate in chunk_rates),
+        "index_mb": index_bytes / 1024 / 1024,
+        "dialect": engine.dialect.name,
+    }
+
+
+async def main(database_url: str, rows: int, batch: int) -> None:
+    results = {
+        name: await run(database_url, generate, rows, batch)
+        for name, generate in GENERATORS.items()
+    }
+
+    dialect = next(iter(results.values()))["dialect"]
+    print(f"\ncity_votes inserts, {rows} rows in batches of {batch} ({dialect})")
+    print(f"{'':<10}{'first':>14}{'last 10%':>14}{'overall':>14}{'pk index':>12}")
+    for name, result in results.items():
+        print(
+            f"{name:<10}"
+            f"{result['first']:>10.0f} r/s"
+            f"{result['last']:>10.0f} r/s"
+            f"{result['overall']:>10.0f} r/s"
+            f"{result['index_mb']:>9.1f} MB"
+        )
+
+    v4, v7 = results["uuid4"], results["uuid7"]
+    print(
+        f"\nuuid7 sustains {v7['last'] / v4['last']:.1f}x the late-table insert rate"
+        f" with a {v7['index_mb'] / v4['index_mb']:.2f}x primary key index"
+    )
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--batch", type=int, default=20_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.rows, args.batch))
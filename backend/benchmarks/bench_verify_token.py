@@ -0,0 +1,74 @@
+"""
+Token Verification Benchmark
+
+Measures verify_token per call for valid and invalid tokens, with the
+verified/rejected token caches cold and warm.
+
+Usage:
+    python -m benchmarks.bench_verify_token [--calls 20000] [--tokens 100]
+"""
+
+import argparse
+import time
+from typing import Callable, List
+
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.security import create_access_token, verify_token
+
+BATCH = 100
+
+
+def clear_caches() -> None:
+    security.verified_tokens.clear()
+    security.rejected_tokens.clear()
+
+
+def verify(token: str) -> None:
+    try:
+        verify_token(token)
+    except HTTPException:
+        pass
+
+
+def measure(
+    tokens: List[str], calls: int, before_batch: Callable[[], None]
+) -> List[float]:
+    """Microseconds per call, averaged over batches of ``BATCH`` calls."""
+    samples = []
+    for offset in range(0, calls, BATCH):
+        before_batch()
+        started = time.perf_counter()
+        for i in range(offset, offset + BATCH):
+            verify(tokens[i % len(tokens)])
+        samples.append((time.perf_counter() - started) * 1e6 / BATCH)
+    return samples
+
+
+def main(calls: int, token_count: int) -> None:
+    valid = [create_access_token({"sub": f"user-{i}"}) for i in range(token_count)]
+    invalid = [token[:-4] + "AAAA" for token in valid]
+
+    rows = {}
+    for label, tokens in (("valid", valid), ("invalid", invalid)):
+        rows[f"{label}, uncached"] = measure(tokens, calls, clear_caches)
+        clear_caches()
+        for token in tokens:
+            verify(token)
+        rows[f"{label}, cached"] = measure(tokens, calls, lambda: None)
+        clear_caches()
+
+    print(f"\nverify_token, {calls} calls over {token_count} tokens")
+    print(f"{'':<24}{'mean':>10}{'min':>10}")
+    for label, samples in rows.items():
+        mean = sum(samples) / len(samples)
+        print(f"{label:<24}{mean:>8.2f}us{min(samples):>8.2f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, default=100)
+    args = parser.parse_args()
+    main(args.calls, args.tokens)
@@ -0,0 +1,137 @@
+"""
+Vote Coalescing Benchmark
+
+Replays a vote burst (every member of a trip voting on every city, at
+random times within --duration seconds) through the trip rooms under
+several coalescing windows at once, one trip per window, each room holding
+a connection per member. Reports events produced against frames sent, and
+how long after each vote the first frame reflecting it reached a client.
+
+Usage:
+    python -m benchmarks.bench_vote_coalescing [--members 10] [--cities 30]
+        [--duration 60] [--windows 0,100,250]
+"""
+
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Dict, List
+
+from app.services.broker import TripEventMessage
+from app.services.realtime import TripRooms
+from benchmarks._support import base_parser, report
+
+
+class SinkSocket:
+    """Client socket that records when each event version first arrives."""
+
+    def __init__(self) -> None:
+        self.arrivals: Dict[int, float] = {}
+        self._closed = asyncio.Event()
+
+    async def send_text(self, frame: str) -> None:
+        self.arrivals.setdefault(json.loads(frame)["version"], time.perf_counter())
+
+    async def receive(self):
+        await self._closed.wait()
+        return {"type": "websocket.disconnect"}
+
+    async def close(self, code: int = 1000) -> None:
+        self._closed.set()
+
+
+async def replay(
+    window_ms: int,
+    schedule: List[float],
+    cities: List[str],
+    members: int,
+) -> dict:
+    rooms = TripRooms(
+        queue_size=1024, policy="disconnect", coalesce_window_seconds=window_ms / 1000
+    )
+    trip_id = uuid.uuid4()
+    sockets = [SinkSocket() for _ in range(members)]
+    connections = [rooms.join(trip_id, socket, uuid.uuid4()) for socket in sockets]
+    serving = [asyncio.create_task(connection.serve()) for connection in connections]
+
+    likes = dict.fromkeys(cities, 0)
+    produced_at: Dict[int, float] = {}
+    started = time.perf_counter()
+    for version, (at, city) in enumerate(zip(schedule, cities * members), 1):
+        await asyncio.sleep(max(0.0, started + at - time.perf_counter()))
+        likes[city] += 1
+        produced_at[version] = time.perf_counter()
+        rooms.deliver(
+            TripEventMessage(
+                trip_id,
+                version,
+                "vote_cast",
+                {
+                    "city_id": city,
+                    "vote_summary": {"like": likes[city], "dont_mind": 0, "dislike": 0},
+                },
+            )
+        )
+    await asyncio.sleep(window_ms / 1000 + 0.05)
+
+    for socket in sockets:
+        await socket.close()
+    await asyncio.gather(*serving)
+
+    # A vote shows up in the first frame carrying its version or a later one
+    arrivals = sorted(sockets[0].arrivals.items())
+    latencies = []
+    for version, produced in produced_at.items():
+        arrived = next(at for frame_version, at in arrivals if frame_version >= version)
+        latencies.append((arrived - produced) * 1000)
+    return {"stats": rooms.stats(), "latencies": latencies}
+
+
+async def main(
+    members: int, city_count: int, duration: float, windows: List[int]
+) -> None:
+    rng = random.Random(5)
+    cities = [str(uuid.uuid4()) for _ in range(city_count)]
+    schedule = sorted(rng.uniform(0, duration) for _ in range(members * city_count))
+
+    results = await asyncio.gather(
+        *(replay(window, schedule, cities, members) for window in windows)
+    )
+
+    report(
+        f"{members} members voting on {city_count} cities over {duration:g}s: "
+        "vote to first frame reflecting it",
+        {
+            f"window {window}ms": result["latencies"]
+            for window, result in zip(windows, results)
+        },
+    )
+    print(f"\n{'':<16}{'events':>10}{'frames':>10}{'to clients':>12}{'ratio':>10}")
+    for window, result in zip(windows, results):
+        stats = result["stats"]
+        print(
+            f"{f'window {window}ms':<16}"
+            f"{stats['events_received']:>10}"
+            f"{stats['frames_sent']:>10}"
+            f"{stats['frames_queued']:>12}"
+            f"{stats['events_received'] / stats['frames_sent']:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--cities", type=int, default=30)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--windows", default="0,100,250")
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.members,
+            args.cities,
+            args.duration,
+            [int(window) for window in args.windows.split(",")],
+        )
+    )
@@ -0,0 +1,51 @@
+"""trip city vote tallies
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TALLY_COLUMNS = {
+    "like_count": "like",
+    "dont_mind_count": "dont_mind",
+    "dislike_count": "dislike",
+}
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("trip_cities") as batch_op:
+        for column in TALLY_COLUMNS:
+            batch_op.add_column(
+                sa.Column(column, sa.Integer(), server_default="0", nullable=False)
+            )
+
+    # Backfill tallies from existing votes
+    for column, vote_type in TALLY_COLUMNS.items():
+        op.execute(
+            f"""
+            UPDATE trip_cities SET {column} = (
+                SELECT count(*) FROM city_votes
+                WHERE city_votes.trip_id = trip_cities.trip_id
+                  AND city_votes.city_id = trip_cities.city_id
+                  AND city_votes.vote_type = '{vote_type}'
+                  AND city_votes.deleted_at IS NULL
+            )
+            """
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("trip_cities") as batch_op:
+        for column in TALLY_COLUMNS:
+            batch_op.drop_column(column)
@@ -0,0 +1,90 @@
+"""live row indexes
+
+Revision ID: 0003
+Revises: 0001
+Create Date: 2026-10-17 10:00:00.000000
+
+Adds partial indexes (``WHERE deleted_at IS NULL``) for the foreign key
+columns that live-row lookups filter on, and drops the unique constraints
+that duplicated each table's primary key index.
+
+A foreign key may have been bound to the duplicate unique index instead
+of the primary key, in which case PostgreSQL refuses to drop it. Such
+foreign keys are dropped first and re-created afterwards, so they bind to
+the primary key.
+"""
+from typing import List, Sequence, Tuple, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = (
+    "users",
+    "trips",
+    "trip_members",
+    "invite_links",
+    "user_preferences",
+    "cities",
+    "trip_cities",
+    "city_votes",
+)
+
+LIVE_INDEXES = (
+    ("ix_trip_members_user_id_trip_id_live", "trip_members", ["user_id", "trip_id"]),
+    ("ix_user_preferences_trip_id_live", "user_preferences", ["trip_id"]),
+    ("ix_trip_cities_trip_id_live", "trip_cities", ["trip_id"]),
+    ("ix_city_votes_trip_id_created_at_live", "city_votes", ["trip_id", "created_at"]),
+    ("ix_city_votes_city_id_live", "city_votes", ["city_id"]),
+)
+
+
+def _dependent_foreign_keys(constraint_name: str) -> List[Tuple[str, str, str]]:
+    """Foreign keys that use the index behind a unique constraint."""
+    result = op.get_bind().execute(
+        sa.text(
+            "SELECT fk.conrelid::regclass::text, fk.conname, "
+            "pg_get_constraintdef(fk.oid) "
+            "FROM pg_constraint fk "
+            "JOIN pg_constraint uq ON fk.conindid = uq.conindid "
+            "WHERE fk.contype = 'f' AND uq.contype = 'u' AND uq.conname = :name"
+        ),
+        {"name": constraint_name},
+    )
+    return [tuple(row) for row in result]
+
+
+def upgrade() -> None:
+    for name, table, columns in LIVE_INDEXES:
+        op.create_index(
+            name,
+            table,
+            columns,
+            postgresql_where=sa.text("deleted_at IS NULL"),
+        )
+
+    dependents = []
+    for table in TABLES:
+        dependents.extend(_dependent_foreign_keys(f"uq_{table}_id"))
+    for table, name, _ in dependents:
+        op.drop_constraint(name, table, type_="foreignkey")
+
+    for table in TABLES:
+        op.drop_constraint(f"uq_{table}_id", table, type_="unique")
+
+    for table, name, definition in dependents:
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.create_unique_constraint(f"uq_{table}_id", table, ["id"])
+
+    for name, table, _ in reversed(LIVE_INDEXES):
+        op.drop_index(name, table_name=table)
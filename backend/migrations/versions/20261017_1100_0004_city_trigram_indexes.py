@@ -0,0 +1,47 @@
+"""city trigram indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 11:00:00.000000
+
+Adds GIN trigram indexes on live city names and countries for fuzzy city
+search, and a live index on trip_cities.city_id for counting how many
+trips a city is on.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGRAM_COLUMNS = ("name", "country")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in TRIGRAM_COLUMNS:
+        op.create_index(
+            f"ix_cities_{column}_trgm",
+            "cities",
+            [column],
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+            postgresql_where=sa.text("deleted_at IS NULL"),
+        )
+    op.create_index(
+        "ix_trip_cities_city_id_live",
+        "trip_cities",
+        ["city_id"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_trip_cities_city_id_live", table_name="trip_cities")
+    for column in reversed(TRIGRAM_COLUMNS):
+        op.drop_index(f"ix_cities_{column}_trgm", table_name="cities")
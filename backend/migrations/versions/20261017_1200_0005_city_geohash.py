@@ -0,0 +1,72 @@
+"""city geohash
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 12:00:00.000000
+
+Adds cities.geohash for nearby-city lookups, fills it in for existing
+cities with coordinates, and indexes it for live rows.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.core.geo import city_geohash
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10_000
+
+cities = sa.table(
+    "cities",
+    sa.column("id"),
+    sa.column("latitude"),
+    sa.column("longitude"),
+    sa.column("geohash"),
+)
+
+
+def upgrade() -> None:
+    op.add_column("cities", sa.Column("geohash", sa.String(12), nullable=True))
+
+    bind = op.get_bind()
+    update = (
+        sa.update(cities)
+        .where(cities.c.id == sa.bindparam("city_id"))
+        .values(geohash=sa.bindparam("hash"))
+    )
+    last_id = None
+    while True:
+        query = (
+            sa.select(cities.c.id, cities.c.latitude, cities.c.longitude)
+            .where(cities.c.latitude.is_not(None), cities.c.longitude.is_not(None))
+            .order_by(cities.c.id)
+            .limit(BATCH_SIZE)
+        )
+        if last_id is not None:
+            query = query.where(cities.c.id > last_id)
+        rows = bind.execute(query).all()
+        if not rows:
+            break
+        bind.execute(
+            update,
+            [{"city_id": id, "hash": city_geohash(lat, lng)} for id, lat, lng in rows],
+        )
+        last_id = rows[-1].id
+
+    op.create_index(
+        "ix_cities_geohash_live",
+        "cities",
+        ["geohash"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cities_geohash_live", table_name="cities")
+    op.drop_column("cities", "geohash")
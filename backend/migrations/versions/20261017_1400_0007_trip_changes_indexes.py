@@ -0,0 +1,34 @@
+"""trip changes indexes
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 14:00:00.000000
+
+Adds (trip_id, updated_at) indexes on the tables the trip delta sync
+reads. They cover soft-deleted rows too, which the partial live-row
+indexes leave out, so tombstones are found without a table scan.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ("trip_members", "trip_cities", "city_votes", "user_preferences")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.create_index(
+            f"ix_{table}_trip_id_updated_at", table, ["trip_id", "updated_at"]
+        )
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_trip_id_updated_at", table_name=table)
@@ -0,0 +1,65 @@
+"""member trip created at
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 15:00:00.000000
+
+Copies trips.created_at onto trip_members as trip_created_at and indexes
+live memberships on (user_id, trip_created_at, trip_id), so a user's trip
+list is read one page at a time from their own memberships. The index
+replaces ix_trip_members_user_id_trip_id_live, whose lookups by user it
+also serves.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+trips = sa.table("trips", sa.column("id"), sa.column("created_at"))
+trip_members = sa.table(
+    "trip_members",
+    sa.column("trip_id"),
+    sa.column("trip_created_at"),
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "trip_members",
+        sa.Column("trip_created_at", sa.DateTime(), nullable=True),
+    )
+    op.execute(
+        sa.update(trip_members).values(
+            trip_created_at=sa.select(trips.c.created_at)
+            .where(trips.c.id == trip_members.c.trip_id)
+            .scalar_subquery()
+        )
+    )
+    op.alter_column("trip_members", "trip_created_at", nullable=False)
+
+    op.create_index(
+        "ix_trip_members_user_id_trip_created_at_live",
+        "trip_members",
+        ["user_id", "trip_created_at", "trip_id"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.drop_index("ix_trip_members_user_id_trip_id_live", table_name="trip_members")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_trip_members_user_id_trip_id_live",
+        "trip_members",
+        ["user_id", "trip_id"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.drop_index(
+        "ix_trip_members_user_id_trip_created_at_live", table_name="trip_members"
+    )
+    op.drop_column("trip_members", "trip_created_at")
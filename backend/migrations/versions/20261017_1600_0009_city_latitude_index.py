@@ -0,0 +1,33 @@
+"""city latitude index
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 16:00:00.000000
+
+Indexes the latitude of live cities, for nearby-city lookups near the
+poles, where geohash cells are too narrow to cover the search circle and
+the latitude band it spans is read instead.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_cities_latitude_live",
+        "cities",
+        ["latitude"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cities_latitude_live", table_name="cities")
@@ -0,0 +1,498 @@
+"""
+Shared test fixtures.
+
+Runs the API against an in-memory SQLite database so database-backed
+endpoints can be tested without a PostgreSQL server.
+"""
+
+import asyncio
+import json
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Dict, FrozenSet, List, Optional, Tuple
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.sql.expression import BinaryExpression
+from sqlalchemy.sql.operators import custom_op
+
+from app.core.database import Base, get_db
+from app.core.security import create_access_token
+from app.main import app
+from app.models import City, Trip, TripCity, TripMember, TripRole, User
+
+
+@compiles(UUID, "sqlite")
+def _compile_uuid_sqlite(type_, compiler, **kw):
+    """Store UUID columns as 32-char hex strings on SQLite."""
+    return "CHAR(32)"
+
+
+# pg_trgm setting read by the % operator
+TRIGRAM_THRESHOLD = "pg_trgm.similarity_threshold"
+
+
+def _trigrams(text: str) -> FrozenSet[str]:
+    trigrams = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        trigrams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(trigrams)
+
+
+def trigram_similarity(a: Optional[str], b: Optional[str]) -> Optional[float]:
+    """pg_trgm's similarity(): the share of word trigrams two strings share."""
+    if a is None or b is None:
+        return None
+    left, right = _trigrams(a), _trigrams(b)
+    if not left or not right:
+        return 0.0
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared)
+
+
+@compiles(BinaryExpression, "sqlite")
+def _compile_trigram_match(binary, compiler, **kw):
+    """Compile pg_trgm's ``a % b`` as a similarity() test against its threshold."""
+    if isinstance(binary.operator, custom_op) and binary.operator.opstring == "%":
+        return "similarity(%s, %s) >= current_setting('%s')" % (
+            compiler.process(binary.left, **kw),
+            compiler.process(binary.right, **kw),
+            TRIGRAM_THRESHOLD,
+        )
+    return compiler.visit_binary(binary, **kw)
+
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    """
+    Provide the PostgreSQL functions city search uses on the test database:
+    pg_trgm's similarity(), greatest(), and set_config()/current_setting()
+    for the similarity threshold.
+    """
+    settings = {TRIGRAM_THRESHOLD: "0.3"}
+
+    def set_config(name, value, is_local):
+        settings[name] = value
+        return value
+
+    def current_setting(name):
+        return float(settings[name])
+
+    dbapi_connection.create_function(
+        "similarity", 2, trigram_similarity, deterministic=True
+    )
+    dbapi_connection.create_function("greatest", -1, max, deterministic=True)
+    dbapi_connection.create_function("set_config", 3, set_config)
+    dbapi_connection.create_function("current_setting", 1, current_setting)
+
+
+class FakeRedis:
+    """In-memory stand-in for the subset of redis.asyncio.Redis the app uses."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    def _live(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._live(key)
+
+    async def mget(self, *keys: str) -> List[Optional[bytes]]:
+        return [self._live(key) for key in keys]
+
+    async def set(self, key: str, value, ex: Optional[int] = None) -> bool:
+        expires_at = time.monotonic() + ex if ex else None
+        self._data[key] = (self._encode(value), expires_at)
+        return True
+
+    async def incr(self, key: str) -> int:
+        value = int(self._live(key) or 0) + 1
+        expires_at = self._data.get(key, (None, None))[1]
+        self._data[key] = (self._encode(value), expires_at)
+        return value
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        value = self._live(key)
+        if value is None:
+            return False
+        self._data[key] = (value, time.monotonic() + seconds)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._data.pop(key, None) is not None for key in keys)
+
+
+class ASGIWebSocket:
+    """In-process WebSocket client talking ASGI straight to the app."""
+
+    def __init__(self, path: str):
+        path, _, query = path.partition("?")
+        self._scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"test")],
+            "client": ("127.0.0.1", 50000),
+            "server": ("test", 80),
+            "subprotocols": [],
+        }
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        # Cleared to stop reading, like a client whose network stalled
+        self.reading = asyncio.Event()
+        self.reading.set()
+        self.close_code: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _send(self, message) -> None:
+        await self.reading.wait()
+        await self._from_app.put(message)
+
+    async def connect(self) -> bool:
+        """Open the connection; False when the app refused it."""
+        self._task = asyncio.create_task(app(self._scope, self._to_app.get, self._send))
+        await self._to_app.put({"type": "websocket.connect"})
+        message = await self._from_app.get()
+        if message["type"] == "websocket.close":
+            self.close_code = message.get("code", 1000)
+            await self._task
+            return False
+        return True
+
+    async def receive_json(self, timeout: float = 1.0):
+        message = await asyncio.wait_for(self._from_app.get(), timeout)
+        if message["type"] == "websocket.close":
+            self.close_code = message.get("code", 1000)
+            raise ConnectionError(f"Closed by the server with code {self.close_code}")
+        return json.loads(message["text"])
+
+    async def wait_closed(self, timeout: float = 1.0) -> None:
+        """Wait for the app to end the connection on its own."""
+        await asyncio.wait_for(asyncio.shield(self._task), timeout)
+
+    async def close(self) -> None:
+        if self._task is None or self._task.done():
+            return
+        self.reading.set()
+        await self._to_app.put({"type": "websocket.disconnect", "code": 1000})
+        await self._task
+
+
+class ASGIEventStream:
+    """In-process Server-Sent Events client talking ASGI straight to the app."""
+
+    def __init__(self, path: str, headers: Optional[Dict[str, str]] = None):
+        path, _, query = path.partition("?")
+        self._scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"test")]
+            + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+            "client": ("127.0.0.1", 50000),
+            "server": ("test", 80),
+        }
+        self._requested = False
+        self._disconnected = asyncio.Event()
+        self._started: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._frames: asyncio.Queue = asyncio.Queue()
+        self._buffer = ""
+        # Cleared to stop reading, like a client whose network stalled
+        self.reading = asyncio.Event()
+        self.reading.set()
+        self.status_code: Optional[int] = None
+        self.headers: Dict[str, str] = {}
+        self.body = b""
+        self._task: Optional[asyncio.Task] = None
+
+    async def _receive(self):
+        if not self._requested:
+            self._requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self._disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def _send(self, message) -> None:
+        await self.reading.wait()
+        if message["type"] == "http.response.start":
+            self.status_code = message["status"]
+            self.headers = {k.decode(): v.decode() for k, v in message["headers"]}
+            self._started.set_result(None)
+            return
+        self.body += message.get("body", b"")
+        self._buffer += message.get("body", b"").decode()
+        *frames, self._buffer = self._buffer.split("\n\n")
+        for frame in frames:
+            await self._frames.put(frame)
+        if not message.get("more_body", False):
+            await self._frames.put(None)
+
+    async def connect(self) -> int:
+        """Send the request; returns the response status."""
+        self._task = asyncio.create_task(app(self._scope, self._receive, self._send))
+        await asyncio.wait(
+            [self._started, self._task], return_when=asyncio.FIRST_COMPLETED
+        )
+        return self.status_code
+
+    async def receive_frame(self, timeout: float = 1.0) -> str:
+        """Next raw frame (event, comment or retry field)."""
+        frame = await asyncio.wait_for(self._frames.get(), timeout)
+        if frame is None:
+            raise ConnectionError("Stream ended by the server")
+        return frame
+
+    async def receive_event(self, timeout: float = 1.0) -> Tuple[Optional[str], dict]:
+        """Next event as (id, decoded data), skipping comments and retry fields."""
+        while True:
+            fields: Dict[str, str] = {}
+            for line in (await self.receive_frame(timeout)).split("\n"):
+                name, _, value = line.partition(":")
+                fields[name] = value.lstrip(" ")
+            if "data" in fields:
+                return fields.get("id"), json.loads(fields["data"])
+
+    async def wait_closed(self, timeout: float = 1.0) -> None:
+        """Wait for the app to end the stream on its own."""
+        await asyncio.wait_for(asyncio.shield(self._task), timeout)
+
+    async def close(self) -> None:
+        if self._task is None or self._task.done():
+            return
+        self.reading.set()
+        self._disconnected.set()
+        await self._task
+
+
+@pytest.fixture
+def fake_redis() -> FakeRedis:
+    return FakeRedis()
+
+
+@pytest.fixture
+async def engine():
+    """In-memory database with all tables created."""
+    test_engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    event.listen(test_engine.sync_engine, "connect", _register_sqlite_functions)
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield test_engine
+
+    await test_engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False,
+    )
+
+
+@pytest.fixture
+async def db(session_factory) -> AsyncGenerator[AsyncSession, None]:
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+async def client(session_factory) -> AsyncGenerator[AsyncClient, None]:
+    """HTTP client for the API, bound to the test database."""
+
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def ws_connect(client):
+    """
+    Open in-process WebSocket connections to the API, bound to the same
+    test database as ``client``. Connections still open are closed at
+    the end of the test.
+    """
+    sockets: List[ASGIWebSocket] = []
+
+    async def _ws_connect(path: str) -> ASGIWebSocket:
+        socket = ASGIWebSocket(path)
+        sockets.append(socket)
+        await socket.connect()
+        return socket
+
+    yield _ws_connect
+    for socket in sockets:
+        await socket.close()
+
+
+@pytest.fixture
+async def sse_connect(client):
+    """
+    Open in-process SSE streams from the API, bound to the same test
+    database as ``client``. Streams still open are closed at the end of
+    the test.
+    """
+    streams: List[ASGIEventStream] = []
+
+    async def _sse_connect(
+        path: str, headers: Optional[Dict[str, str]] = None
+    ) -> ASGIEventStream:
+        stream = ASGIEventStream(path, headers)
+        streams.append(stream)
+        await stream.connect()
+        return stream
+
+    yield _sse_connect
+    for stream in streams:
+        await stream.close()
+
+
+@pytest.fixture
+def make_user(db):
+    async def _make_user(name: str = "Test User") -> User:
+        slug = name.lower().replace(" ", ".")
+        user = User(google_id=f"google-{slug}", email=f"{slug}@example.com", name=name)
+        db.add(user)
+        await db.commit()
+        return user
+
+    return _make_user
+
+
+@pytest.fixture
+def make_trip(db):
+    async def _make_trip(owner: User, *members: User, name: str = "Europe") -> Trip:
+        trip = Trip(name=name, owner_id=owner.id)
+        db.add(trip)
+        await db.flush()
+        db.add(
+            TripMember(
+                trip_id=trip.id,
+                trip_created_at=trip.created_at,
+                user_id=owner.id,
+                role=TripRole.OWNER,
+            )
+        )
+        for member in members:
+            db.add(
+                TripMember(
+                    trip_id=trip.id, trip_created_at=trip.created_at, user_id=member.id
+                )
+            )
+        await db.commit()
+        return trip
+
+    return _make_trip
+
+
+@pytest.fixture
+def add_city(db):
+    async def _add_city(
+        trip: Trip, name: str = "Paris", country: str = "France"
+    ) -> City:
+        city = City(google_place_id=f"place-{name.lower()}", name=name, country=country)
+        db.add(city)
+        await db.flush()
+        db.add(TripCity(trip_id=trip.id, city_id=city.id, added_by=trip.owner_id))
+        await db.commit()
+        return city
+
+    return _add_city
+
+
+@pytest.fixture
+def auth_headers():
+    """Build an Authorization header carrying a valid token for a user."""
+
+    def _auth_headers(user: User) -> dict:
+        token = create_access_token(data={"sub": str(user.id), "email": user.email})
+        return {"Authorization": f"Bearer {token}"}
+
+    return _auth_headers
+
+
+@pytest.fixture
+def record_queries(engine):
+    """Record the statements and parameters sent to the database in a block."""
+
+    @contextmanager
+    def _record_queries():
+        captured: List[Tuple[str, Any]] = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        try:
+            yield captured
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    return _record_queries
+
+
+@pytest.fixture
+def assert_max_queries(record_queries):
+    """
+    Fail a test when a block issues more SQL statements than its budget.
+
+    Usage:
+        with assert_max_queries(5):
+            await client.get(f"/api/v1/trips/{trip.id}")
+    """
+
+    @contextmanager
+    def _assert_max_queries(budget: int):
+        with record_queries() as captured:
+            yield captured
+
+        if len(captured) > budget:
+            listing = "\n\n".join(
+                f"{i}. {statement}" for i, (statement, _) in enumerate(captured, 1)
+            )
+            pytest.fail(
+                f"Expected at most {budget} queries, got {len(captured)}:\n\n{listing}"
+            )
+
+    return _assert_max_queries
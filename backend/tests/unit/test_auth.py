@@ -0,0 +1,167 @@
+"""
+Unit tests for the authentication API.
+
+Google's token and user info endpoints are replaced with canned responses.
+"""
+
+import time
+
+import pytest
+from sqlalchemy import select
+
+from app.api.v1 import auth
+from app.models import User
+from app.services.users import PrincipalCache
+
+
+@pytest.fixture
+def google_user(monkeypatch):
+    """Make the Google OAuth exchange return a fixed profile."""
+    profile = {
+        "id": "google-123",
+        "email": "ada@example.com",
+        "name": "Ada",
+        "picture": "https://example.com/ada.png",
+    }
+
+    async def exchange_code_for_token(code, redirect_uri):
+        return {"access_token": "google-access-token"}
+
+    async def get_google_user_info(access_token):
+        return dict(profile)
+
+    monkeypatch.setattr(auth, "exchange_code_for_token", exchange_code_for_token)
+    monkeypatch.setattr(auth, "get_google_user_info", get_google_user_info)
+    return profile
+
+
+class TestGoogleLogin:
+    """Test signing in with Google."""
+
+    async def test_first_login_creates_user(self, client, db, google_user):
+        response = await client.post("/api/v1/auth/google", json={"code": "abc"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["user"]["email"] == "ada@example.com"
+        assert data["access_token"]
+
+        result = await db.execute(select(User).where(User.google_id == "google-123"))
+        user = result.scalar_one()
+        assert str(user.id) == data["user"]["id"]
+        assert user.created_at is not None
+
+    async def test_login_updates_profile(self, client, db, google_user):
+        await client.post("/api/v1/auth/google", json={"code": "abc"})
+        google_user["name"] = "Ada Lovelace"
+
+        response = await client.post("/api/v1/auth/google", json={"code": "abc"})
+
+        assert response.json()["user"]["name"] == "Ada Lovelace"
+        result = await db.execute(
+            select(User.name).where(User.google_id == "google-123")
+        )
+        assert result.scalar_one() == "Ada Lovelace"
+
+    async def test_first_login_query_budget(
+        self, client, google_user, assert_max_queries
+    ):
+        # A single INSERT ... ON CONFLICT ... RETURNING
+        with assert_max_queries(1):
+            response = await client.post("/api/v1/auth/google", json={"code": "abc"})
+
+        assert response.status_code == 200
+
+    async def test_unchanged_profile_is_not_rewritten(
+        self, client, db, google_user, assert_max_queries
+    ):
+        await client.post("/api/v1/auth/google", json={"code": "abc"})
+        result = await db.execute(select(User).where(User.google_id == "google-123"))
+        before = result.scalar_one()
+        version, updated_at = before.version, before.updated_at
+
+        # The skipped upsert, then a read of the row (PostgreSQL does both in one)
+        with assert_max_queries(2) as captured:
+            response = await client.post("/api/v1/auth/google", json={"code": "abc"})
+
+        assert response.status_code == 200
+        await db.refresh(before)
+        assert (before.version, before.updated_at) == (version, updated_at)
+        assert not any(s.lstrip().upper().startswith("UPDATE") for s, _ in captured)
+
+    async def test_deleted_account_is_rejected(self, client, db, google_user):
+        await client.post("/api/v1/auth/google", json={"code": "abc"})
+        result = await db.execute(select(User).where(User.google_id == "google-123"))
+        result.scalar_one().soft_delete()
+        await db.commit()
+        google_user["name"] = "Someone Else"
+
+        response = await client.post("/api/v1/auth/google", json={"code": "abc"})
+
+        assert response.status_code == 403
+        assert response.json()["detail"] == "Account has been deleted"
+
+    async def test_login_token_authenticates(self, client, google_user):
+        response = await client.post("/api/v1/auth/google", json={"code": "abc"})
+        token = response.json()["access_token"]
+
+        response = await client.get(
+            "/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["name"] == "Ada"
+
+
+class TestPrincipalCache:
+    """Test caching of authenticated users."""
+
+    async def test_repeat_requests_skip_users_lookup(
+        self, client, make_user, auth_headers, assert_max_queries
+    ):
+        user = await make_user("Ada")
+        headers = auth_headers(user)
+        await client.get("/api/v1/auth/me", headers=headers)
+
+        with assert_max_queries(0):
+            response = await client.get("/api/v1/auth/me", headers=headers)
+
+        assert response.json()["name"] == "Ada"
+
+    async def test_profile_change_on_login_invalidates(self, client, google_user):
+        response = await client.post("/api/v1/auth/google", json={"code": "abc"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await client.get("/api/v1/auth/me", headers=headers)
+
+        google_user["name"] = "Ada Lovelace"
+        await client.post("/api/v1/auth/google", json={"code": "abc"})
+        response = await client.get("/api/v1/auth/me", headers=headers)
+
+        assert response.json()["name"] == "Ada Lovelace"
+
+    async def test_shared_tier_serves_other_workers(
+        self, db, make_user, fake_redis, assert_max_queries
+    ):
+        user = await make_user("Ada")
+        payload = {"sub": str(user.id), "exp": time.time() + 3600}
+        worker_a = PrincipalCache(60, 100, shared=fake_redis)
+        worker_b = PrincipalCache(60, 100, shared=fake_redis)
+
+        await worker_a.store(user, payload)
+        db.expunge_all()
+        with assert_max_queries(0):
+            cached = await worker_b.load(db, user.id, payload)
+        assert (cached.id, cached.name) == (user.id, "Ada")
+        assert cached.created_at == user.created_at
+
+        await worker_a.invalidate(user.id)
+        worker_b.local.clear()
+        assert await worker_b.load(db, user.id, payload) is None
+
+    async def test_entries_expire_with_token(self, db, make_user):
+        user = await make_user("Ada")
+        cache = PrincipalCache(60, 100)
+
+        await cache.store(user, {"sub": str(user.id), "exp": time.time() - 1})
+
+        assert len(cache.local) == 0
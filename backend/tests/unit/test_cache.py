@@ -0,0 +1,300 @@
+"""
+Unit tests for the tagged response cache, single-flight loading, and the
+cache's use by the trip and voting routes.
+"""
+
+import asyncio
+import sys
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import SingleFlight, TaggedCache, get_redis
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def loader(*values):
+    """Load function returning each value in turn, counting calls."""
+    calls = []
+
+    async def load():
+        calls.append(None)
+        return values[len(calls) - 1], len(calls)
+
+    return load, calls
+
+
+class TestTaggedCache:
+    """Test lookups, invalidation and the shared tier."""
+
+    async def test_second_lookup_is_cached(self):
+        cache = TaggedCache(60, 100)
+        load, calls = loader({"name": "Europe"})
+
+        first = await cache.get_or_load("trip:1", ["trip:1"], load)
+        second = await cache.get_or_load("trip:1", ["trip:1"], load)
+
+        assert first.value == second.value == {"name": "Europe"}
+        assert second.version == 1
+        assert len(calls) == 1
+
+    async def test_invalidate_retires_tagged_entries(self):
+        cache = TaggedCache(60, 100)
+        load, _ = loader("old", "new")
+        await cache.get_or_load("trip:1", ["trip:1"], load)
+
+        await cache.invalidate("trip:2")
+        assert (await cache.get_or_load("trip:1", ["trip:1"], load)).value == "old"
+
+        await cache.invalidate("trip:1")
+        assert (await cache.get_or_load("trip:1", ["trip:1"], load)).value == "new"
+
+    async def test_load_racing_invalidation_is_not_kept(self):
+        cache = TaggedCache(60, 100)
+        values = iter(["stale", "fresh"])
+
+        async def load():
+            value = next(values)
+            if value == "stale":
+                # A write commits while this load is reading
+                await cache.invalidate("trip:1")
+            return value, None
+
+        assert (await cache.get_or_load("trip:1", ["trip:1"], load)).value == "stale"
+        assert (await cache.get_or_load("trip:1", ["trip:1"], load)).value == "fresh"
+
+    async def test_refresh_replaces_entry(self):
+        cache = TaggedCache(60, 100)
+        load, _ = loader("old", "new")
+        await cache.get_or_load("trip:1", ["trip:1"], load)
+
+        entry = await cache.get_or_load("trip:1", ["trip:1"], load, refresh=True)
+
+        assert entry.value == "new"
+        assert (await cache.get_or_load("trip:1", ["trip:1"], load)).value == "new"
+
+    async def test_disabled_cache_always_loads(self):
+        cache = TaggedCache(0, 100)
+        load, calls = loader("a", "b")
+
+        await cache.get_or_load("trip:1", ["trip:1"], load)
+        await cache.get_or_load("trip:1", ["trip:1"], load)
+
+        assert len(calls) == 2
+
+    async def test_shared_tier_serves_other_workers(self, fake_redis):
+        worker_a = TaggedCache(60, 100, shared=fake_redis, sync_seconds=0)
+        worker_b = TaggedCache(60, 100, shared=fake_redis, sync_seconds=0)
+        load, calls = loader({"votes": 1}, {"votes": 2})
+
+        await worker_a.get_or_load("trip:1", ["trip:1"], load)
+        entry = await worker_b.get_or_load("trip:1", ["trip:1"], load)
+        assert (entry.value, entry.version) == ({"votes": 1}, 1)
+        assert len(calls) == 1
+
+        await worker_b.invalidate("trip:1")
+        entry = await worker_a.get_or_load("trip:1", ["trip:1"], load)
+        assert entry.value == {"votes": 2}
+
+    async def test_shared_tier_outage_falls_back_to_loading(self):
+        class DownRedis:
+            async def get(self, *args, **kwargs):
+                raise ConnectionError("down")
+
+            mget = set = incr = expire = get
+
+        cache = TaggedCache(60, 100, shared=DownRedis())
+        load, _ = loader("a", "b")
+
+        assert (await cache.get_or_load("trip:1", ["trip:1"], load)).value == "a"
+        await cache.invalidate("trip:1")
+        assert (await cache.get_or_load("trip:1", ["trip:1"], load)).value == "b"
+
+    def test_missing_redis_package_keeps_caches_local(self, monkeypatch):
+        monkeypatch.setattr(cache_module, "_redis", None)
+        monkeypatch.setattr(cache_module, "_redis_unavailable", False)
+        monkeypatch.setitem(sys.modules, "redis.asyncio", None)
+
+        assert get_redis() is None
+        assert get_redis() is None
+
+
+class TestSingleFlight:
+    """Test sharing of concurrent calls."""
+
+    async def test_concurrent_calls_share_one_run(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def call():
+            calls.append(None)
+            await asyncio.sleep(0.01)
+            return "trip"
+
+        results = await asyncio.gather(*(flights.do("trip:1", call) for _ in range(20)))
+
+        assert results == ["trip"] * 20
+        assert len(calls) == 1
+        assert len(flights) == 0
+
+    async def test_exception_is_shared(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def call():
+            calls.append(None)
+            await asyncio.sleep(0.01)
+            raise LookupError("no trip")
+
+        results = await asyncio.gather(
+            *(flights.do("trip:1", call) for _ in range(5)), return_exceptions=True
+        )
+
+        assert all(isinstance(result, LookupError) for result in results)
+        assert len(calls) == 1
+
+    async def test_waiter_takes_over_from_cancelled_leader(self):
+        flights = SingleFlight()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "trip"
+
+        leader = asyncio.create_task(flights.do("trip:1", slow))
+        await started.wait()
+        waiter = asyncio.create_task(flights.do("trip:1", fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await waiter == "trip"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+
+class TestStampedeProtection:
+    """Test single-flight misses and early refresh in the tagged cache."""
+
+    async def test_concurrent_misses_load_once(self):
+        cache = TaggedCache(60, 100)
+        calls = []
+
+        async def load():
+            calls.append(None)
+            await asyncio.sleep(0.01)
+            return {"name": "Europe"}, 1
+
+        entries = await asyncio.gather(
+            *(cache.get_or_load("trip:1", ["trip:1"], load) for _ in range(50))
+        )
+
+        assert {entry.value["name"] for entry in entries} == {"Europe"}
+        assert len(calls) == 1
+
+    async def test_hot_entry_is_refreshed_before_expiry(self):
+        clock = FakeClock()
+        cache = TaggedCache(60, 100, clock=clock)
+        values = iter(["old", "new"])
+
+        async def load():
+            await asyncio.sleep(0.01)
+            return next(values), None
+
+        await cache.get_or_load("trip:1", ["trip:1"], load)
+
+        # Far from expiry even the unluckiest draw keeps the entry
+        cache.random = lambda: 0.999
+        clock.now += 30
+        assert (await cache.get_or_load("trip:1", ["trip:1"], load)).value == "old"
+
+        # Close to expiry a 10ms load is likely, but not certain, to refresh
+        clock.now += 29.995
+        cache.random = lambda: 0.1
+        assert (await cache.get_or_load("trip:1", ["trip:1"], load)).value == "old"
+        cache.random = lambda: 0.99
+        assert (await cache.get_or_load("trip:1", ["trip:1"], load)).value == "new"
+
+    async def test_early_refresh_can_be_disabled(self):
+        clock = FakeClock()
+        cache = TaggedCache(60, 100, early_refresh_beta=0, clock=clock)
+        cache.random = lambda: 0.99
+        load, calls = loader("old", "new")
+
+        await cache.get_or_load("trip:1", ["trip:1"], load)
+        clock.now += 59.9999999
+        await cache.get_or_load("trip:1", ["trip:1"], load)
+
+        assert len(calls) == 1
+
+
+class TestCachedRoutes:
+    """Test caching and invalidation of trip and vote responses."""
+
+    async def test_trip_detail_is_cached(
+        self, client, make_user, make_trip, add_city, auth_headers, assert_max_queries
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        await add_city(trip, "Paris")
+        headers = auth_headers(owner)
+        first = await client.get(f"/api/v1/trips/{trip.id}", headers=headers)
+
+        # Only the membership check and the content version
+        with assert_max_queries(2):
+            second = await client.get(f"/api/v1/trips/{trip.id}", headers=headers)
+
+        assert second.status_code == 200
+        assert second.json() == first.json()
+
+    async def test_vote_invalidates_trip_responses(
+        self, client, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        city = await add_city(trip, "Paris")
+        headers = auth_headers(owner)
+        trip_url = f"/api/v1/trips/{trip.id}"
+        votes_url = f"/api/v1/voting/trips/{trip.id}/votes"
+        await client.get(trip_url, headers=headers)
+        assert (await client.get(votes_url, headers=headers)).json() == []
+
+        await client.post(
+            votes_url,
+            json={"city_id": str(city.id), "vote_type": "like"},
+            headers=headers,
+        )
+
+        detail = (await client.get(trip_url, headers=headers)).json()
+        assert detail["cities"][0]["vote_summary"]["like"] == 1
+        votes = (await client.get(votes_url, headers=headers)).json()
+        assert [vote["vote_type"] for vote in votes] == ["like"]
+
+        await client.delete(
+            f"/api/v1/voting/trips/{trip.id}/cities/{city.id}/votes", headers=headers
+        )
+        detail = (await client.get(trip_url, headers=headers)).json()
+        assert detail["cities"][0]["vote_summary"]["like"] == 0
+
+    async def test_cached_trip_still_requires_membership(
+        self, client, make_user, make_trip, auth_headers
+    ):
+        owner = await make_user("Owner")
+        outsider = await make_user("Outsider")
+        trip = await make_trip(owner)
+        await client.get(f"/api/v1/trips/{trip.id}", headers=auth_headers(owner))
+
+        response = await client.get(
+            f"/api/v1/trips/{trip.id}", headers=auth_headers(outsider)
+        )
+
+        assert response.status_code == 404
@@ -0,0 +1,233 @@
+"""
+Unit tests for fuzzy search of stored cities.
+
+SQLite stands in for pg_trgm: tests/conftest.py provides ``similarity()``
+as a Python function and compiles the ``%`` operator against the
+threshold set with ``set_config()``.
+"""
+
+import pytest
+
+from app.api.v1 import cities as cities_api
+from app.core.geo import covering_cells, encode_geohash
+from app.models import City, TripCity
+from app.services.cities import nearby_cities, search_known_cities
+from app.services.places import save_city
+from tests.conftest import trigram_similarity
+
+
+@pytest.fixture
+def make_cities(db):
+    async def _make_cities(*cities):
+        rows = [
+            City(
+                google_place_id=f"place-{name.lower()}-{country.lower()}",
+                name=name,
+                country=country,
+            )
+            for name, country in cities
+        ]
+        db.add_all(rows)
+        await db.commit()
+        return rows
+
+    return _make_cities
+
+
+def names(results):
+    return [result["name"] for result in results]
+
+
+class TestTrigramSimilarity:
+    """Test the SQLite stand-in against pg_trgm's documented results."""
+
+    def test_matches_pg_trgm(self):
+        assert trigram_similarity("word", "two words") == pytest.approx(
+            0.363636, abs=1e-6
+        )
+        assert trigram_similarity("Paris", "PARIS") == 1.0
+        assert trigram_similarity("abc", "xyz") == 0.0
+        assert trigram_similarity("", "abc") == 0.0
+        assert trigram_similarity(None, "abc") is None
+
+
+class TestSearchKnownCities:
+    """Test fuzzy search and ranking of stored cities."""
+
+    async def test_typos_find_the_city(self, db, make_cities):
+        await make_cities(
+            ("Barcelona", "Spain"), ("Berlin", "Germany"), ("Lisbon", "Portugal")
+        )
+
+        assert names(await search_known_cities(db, "Barcleona")) == ["Barcelona"]
+        assert names(await search_known_cities(db, "berln")) == ["Berlin"]
+
+    async def test_country_matches(self, db, make_cities):
+        await make_cities(
+            ("Porto", "Portugal"), ("Lisbon", "Portugal"), ("Rome", "Italy")
+        )
+
+        assert names(await search_known_cities(db, "Portugall")) == ["Lisbon", "Porto"]
+
+    async def test_popular_city_ranks_first_among_equals(
+        self, db, make_cities, make_user, make_trip
+    ):
+        texas, france = await make_cities(("Paris", "Texas"), ("Paris", "France"))
+        owner = await make_user()
+        trip = await make_trip(owner)
+        db.add(TripCity(trip_id=trip.id, city_id=france.id, added_by=owner.id))
+        await db.commit()
+
+        results = await search_known_cities(db, "paris")
+
+        assert [result["place_id"] for result in results] == [
+            france.google_place_id,
+            texas.google_place_id,
+        ]
+
+    async def test_threshold_and_limit(self, db, make_cities):
+        await make_cities(("Milan", "Italy"), ("Milton", "Canada"), ("Mila", "Algeria"))
+
+        assert names(await search_known_cities(db, "milan", threshold=0.9)) == ["Milan"]
+        assert len(await search_known_cities(db, "milan", threshold=0.1)) == 3
+        assert len(await search_known_cities(db, "milan", limit=1, threshold=0.1)) == 1
+
+    async def test_deleted_cities_are_skipped(self, db, make_cities):
+        (vienna,) = await make_cities(("Vienna", "Austria"))
+        vienna.soft_delete()
+        await db.commit()
+
+        assert await search_known_cities(db, "Vienna") == []
+
+
+@pytest.fixture
+def place_cities(db):
+    async def _place_cities(*cities):
+        rows = [
+            City(
+                google_place_id=f"place-{name.lower()}",
+                name=name,
+                country="Somewhere",
+                latitude=latitude,
+                longitude=longitude,
+            )
+            for name, latitude, longitude in cities
+        ]
+        db.add_all(rows)
+        await db.commit()
+        return rows
+
+    return _place_cities
+
+
+class TestNearbyCities:
+    """Test geohash maintenance and radius lookups."""
+
+    async def test_geohash_follows_coordinates(self, db, place_cities):
+        (paris,) = await place_cities(("Paris", 48.856614, 2.3522219))
+        assert paris.geohash == "u09tvw0f6"
+
+        paris.latitude, paris.longitude = 51.5072178, -0.1275862
+        await db.commit()
+        assert paris.geohash.startswith("gcpvj")
+
+        paris.latitude = None
+        await db.commit()
+        assert paris.geohash is None
+
+    async def test_saved_places_get_a_geohash(self, db):
+        city = await save_city(
+            db,
+            {
+                "google_place_id": "place-rome",
+                "name": "Rome",
+                "country": "Italy",
+                "formatted_address": "Rome, Italy",
+                "latitude": 41.9027835,
+                "longitude": 12.4963655,
+            },
+        )
+
+        assert city.geohash == encode_geohash(41.9027835, 12.4963655)
+
+    async def test_nearest_first_within_radius(self, db, place_cities):
+        await place_cities(
+            ("Paris", 48.856614, 2.3522219),
+            ("Versailles", 48.8048649, 2.1203554),
+            ("Saint-Denis", 48.935564, 2.3579641),
+            ("Reims", 49.258329, 4.031696),
+            ("Nowhere", None, None),
+        )
+
+        nearby = await nearby_cities(db, 48.86, 2.35, radius_km=30)
+
+        assert [city.name for city, _ in nearby] == [
+            "Paris",
+            "Saint-Denis",
+            "Versailles",
+        ]
+        assert nearby[1][1] == pytest.approx(8.4, abs=0.1)
+        assert len(await nearby_cities(db, 48.86, 2.35, radius_km=30, limit=1)) == 1
+        assert len(await nearby_cities(db, 48.86, 2.35, radius_km=200)) == 4
+
+    async def test_near_the_pole_reads_only_the_latitude_band(
+        self, db, place_cities, record_queries
+    ):
+        await place_cities(
+            ("Longyearbyen", 78.2232, 15.6267),
+            ("Station Nord", 81.6, -16.67),
+            ("Alert", 82.5018, -62.3481),
+            ("Paris", 48.856614, 2.3522219),
+        )
+
+        # Too close to the pole for geohash cells to cover the circle
+        assert covering_cells(80.0, 0.0, 500) == []
+        with record_queries() as queries:
+            nearby = await nearby_cities(db, 80.0, 0.0, radius_km=500)
+
+        assert [city.name for city, _ in nearby] == ["Station Nord", "Longyearbyen"]
+        candidates, _ = queries[0]
+        assert "latitude BETWEEN" in candidates
+
+    async def test_deleted_cities_are_skipped(self, db, place_cities):
+        (paris,) = await place_cities(("Paris", 48.856614, 2.3522219))
+        paris.soft_delete()
+        await db.commit()
+
+        assert await nearby_cities(db, 48.86, 2.35, radius_km=10) == []
+
+    async def test_nearby_endpoint(self, client, place_cities, make_user, auth_headers):
+        await place_cities(("Paris", 48.856614, 2.3522219))
+
+        response = await client.get(
+            "/api/v1/cities/nearby",
+            params={"lat": 48.86, "lng": 2.35, "radius_km": 5},
+            headers=auth_headers(await make_user()),
+        )
+
+        assert response.status_code == 200
+        (result,) = response.json()["results"]
+        assert result["name"] == "Paris"
+        assert result["distance_km"] == pytest.approx(0.4, abs=0.05)
+
+
+class TestSearchEndpoint:
+    """Test city search answered from stored cities."""
+
+    async def test_stored_city_is_found_before_places(
+        self, client, make_cities, make_user, auth_headers, monkeypatch
+    ):
+        await make_cities(("Barcelona", "Spain"))
+
+        async def no_places(query):
+            raise AssertionError("Places should not be called")
+
+        monkeypatch.setattr(cities_api.places, "search", no_places)
+        response = await client.get(
+            "/api/v1/cities/search",
+            params={"q": "Barcleona"},
+            headers=auth_headers(await make_user()),
+        )
+
+        assert response.status_code == 200
+        assert names(response.json()["results"]) == ["Barcelona"]
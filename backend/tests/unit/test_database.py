@@ -0,0 +1,333 @@
+"""
+Unit tests for read-replica routing, soft-delete filtering and the
+create helper in app.core.database.
+
+Two SQLite files stand in for the primary and the replica; copying the
+primary file to the replica path plays the part of replication.
+"""
+
+import shutil
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.requests import HTTPConnection
+
+from app.core.database import (
+    Base,
+    ReplicaStickiness,
+    bind_session_user,
+    create_session_factory,
+    get_db,
+    insert_returning,
+    session_info,
+    share_stickiness,
+)
+from app.main import app
+from app.models import City, Trip, TripCity, TripMember, TripRole, User
+from app.services.trips import require_trip_member, response_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+async def replicated(tmp_path, client, monkeypatch):
+    """
+    Routing session factory over a primary and a replica SQLite file.
+
+    The response cache is off unless a test turns it back on.
+    """
+    monkeypatch.setattr(response_cache, "ttl_seconds", 0)
+    primary_path, replica_path = tmp_path / "primary.db", tmp_path / "replica.db"
+    primary = create_async_engine(f"sqlite+aiosqlite:///{primary_path}")
+    async with primary.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    replica = create_async_engine(f"sqlite+aiosqlite:///{replica_path}")
+
+    async def replicate():
+        """Copy the primary's committed state to the replica."""
+        await replica.dispose()
+        shutil.copy(primary_path, replica_path)
+
+    await replicate()
+    clock = FakeClock()
+    sessions = create_session_factory(
+        primary, replica, ReplicaStickiness(5.0, clock=clock)
+    )
+
+    async def override_get_db(connection: HTTPConnection):
+        async with sessions(info=session_info(connection)) as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    yield sessions, replicate, clock
+
+    await primary.dispose()
+    await replica.dispose()
+
+
+async def seed_trip(sessions):
+    """An owner and a member sharing a trip with one city."""
+    async with sessions() as session:
+        owner = User(google_id="g-owner", email="o@example.com", name="Owner")
+        member = User(google_id="g-member", email="m@example.com", name="Member")
+        city = City(google_place_id="place-paris", name="Paris", country="France")
+        session.add_all([owner, member, city])
+        await session.flush()
+        trip = Trip(name="Europe", owner_id=owner.id)
+        session.add(trip)
+        await session.flush()
+        session.add_all(
+            [
+                TripMember(
+                    trip_id=trip.id,
+                    trip_created_at=trip.created_at,
+                    user_id=owner.id,
+                    role=TripRole.OWNER,
+                ),
+                TripMember(
+                    trip_id=trip.id, trip_created_at=trip.created_at, user_id=member.id
+                ),
+                TripCity(trip_id=trip.id, city_id=city.id, added_by=owner.id),
+            ]
+        )
+        await session.commit()
+    return owner, member, trip, city
+
+
+class TestReplicaRouting:
+    """Test which engine serves reads and writes."""
+
+    async def test_read_only_session_reads_replica(self, replicated):
+        sessions, replicate, _ = replicated
+
+        async with sessions() as session:
+            session.add(User(google_id="g-1", email="a@example.com", name="A"))
+            await session.commit()
+
+        async with sessions(info={"read_only": True}) as session:
+            result = await session.execute(select(User))
+            assert result.scalars().all() == []
+
+        async with sessions() as session:
+            result = await session.execute(select(User))
+            assert len(result.scalars().all()) == 1
+
+        await replicate()
+        async with sessions(info={"read_only": True}) as session:
+            result = await session.execute(select(User))
+            assert len(result.scalars().all()) == 1
+
+    async def test_locking_reads_use_primary(self, replicated):
+        sessions, _, _ = replicated
+        owner, _, trip, _ = await seed_trip(sessions)
+
+        # The replica has not seen the trip yet
+        async with sessions(info={"read_only": True}) as session:
+            member = await require_trip_member(session, trip.id, owner.id, lock=True)
+            assert member.user_id == owner.id
+
+    async def test_window_is_shared_between_workers(self, replicated, fake_redis):
+        sessions, replicate, _ = replicated
+        owner, member, _, _ = await seed_trip(sessions)
+        await replicate()
+        worker_a = ReplicaStickiness(5.0, shared=fake_redis)
+        worker_b = ReplicaStickiness(5.0, shared=fake_redis)
+
+        async with sessions(stickiness=worker_a) as session:
+            await bind_session_user(session, owner.id)
+            (await session.get(User, owner.id)).name = "Renamed"
+            await session.commit()
+            await share_stickiness(session)
+
+        async def read_name(user):
+            async with sessions(
+                info={"read_only": True}, stickiness=worker_b
+            ) as session:
+                await bind_session_user(session, user.id)
+                result = await session.execute(
+                    select(User.name).where(User.id == user.id)
+                )
+                return result.scalar_one()
+
+        # The writer reads the primary on the other worker too
+        assert await read_name(owner) == "Renamed"
+        assert await read_name(member) == "Member"
+
+    async def test_user_reads_own_writes_within_window(
+        self, replicated, client, auth_headers
+    ):
+        sessions, replicate, clock = replicated
+        owner, member, trip, city = await seed_trip(sessions)
+        await replicate()
+
+        votes_url = f"/api/v1/voting/trips/{trip.id}/cities/{city.id}/votes"
+        response = await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(city.id), "vote_type": "like"},
+            headers=auth_headers(owner),
+        )
+        assert response.status_code == 200
+
+        # The voter reads the primary right after voting
+        response = await client.get(votes_url, headers=auth_headers(owner))
+        assert response.json()["vote_summary"]["like"] == 1
+
+        # Other members read the replica, which has not caught up yet
+        response = await client.get(votes_url, headers=auth_headers(member))
+        assert response.json()["vote_summary"]["like"] == 0
+
+        # Once the window passes the voter is back on the replica
+        clock.now += 6
+        response = await client.get(votes_url, headers=auth_headers(owner))
+        assert response.json()["vote_summary"]["like"] == 0
+
+        await replicate()
+        response = await client.get(votes_url, headers=auth_headers(member))
+        assert response.json()["vote_summary"]["like"] == 1
+
+    async def test_cached_replica_reads_do_not_hide_own_writes(
+        self, replicated, client, auth_headers, monkeypatch
+    ):
+        monkeypatch.setattr(response_cache, "ttl_seconds", 60.0)
+        sessions, replicate, _ = replicated
+        owner, member, trip, city = await seed_trip(sessions)
+        await replicate()
+
+        votes_url = f"/api/v1/voting/trips/{trip.id}/cities/{city.id}/votes"
+        await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(city.id), "vote_type": "like"},
+            headers=auth_headers(owner),
+        )
+        # The member caches what the lagging replica still says
+        response = await client.get(votes_url, headers=auth_headers(member))
+        assert response.json()["vote_summary"]["like"] == 0
+
+        response = await client.get(votes_url, headers=auth_headers(owner))
+        assert response.json()["vote_summary"]["like"] == 1
+
+
+class TestReplicaStickiness:
+    """Test the per-user stickiness window."""
+
+    def test_window_expires(self):
+        clock = FakeClock()
+        stickiness = ReplicaStickiness(5.0, clock=clock)
+
+        stickiness.mark("user-1")
+        assert stickiness.is_sticky("user-1")
+        assert not stickiness.is_sticky("user-2")
+
+        clock.now += 5
+        assert not stickiness.is_sticky("user-1")
+
+    def test_expired_entries_are_pruned_when_full(self):
+        clock = FakeClock()
+        stickiness = ReplicaStickiness(5.0, clock=clock, max_entries=2)
+
+        stickiness.mark("user-1")
+        stickiness.mark("user-2")
+        clock.now += 10
+        stickiness.mark("user-3")
+
+        assert list(stickiness._until) == ["user-3"]
+
+    async def test_shared_window_reaches_other_workers(self, fake_redis):
+        worker_a = ReplicaStickiness(5.0, shared=fake_redis)
+        worker_b = ReplicaStickiness(5.0, shared=fake_redis)
+
+        worker_a.mark("user-1")
+        await worker_a.share("user-1")
+
+        assert await worker_b.check("user-1")
+        assert not await worker_b.check("user-2")
+        assert not worker_b.is_sticky("user-1")
+
+    async def test_shared_outage_falls_back_to_local_window(self):
+        class DownRedis:
+            async def get(self, *args, **kwargs):
+                raise ConnectionError("down")
+
+            set = get
+
+        stickiness = ReplicaStickiness(5.0, shared=DownRedis())
+
+        await stickiness.share("user-1")
+        assert not await stickiness.check("user-1")
+        stickiness.mark("user-1")
+        assert await stickiness.check("user-1")
+
+
+class TestSoftDeleteFiltering:
+    """Test that soft-deleted rows are excluded unless asked for."""
+
+    async def test_deleted_rows_are_hidden(self, db, make_user, make_trip):
+        owner = await make_user("Owner")
+        live = await make_trip(owner, name="Live")
+        deleted = await make_trip(owner, name="Deleted")
+        deleted.soft_delete()
+        await db.commit()
+
+        result = await db.execute(select(Trip))
+        assert [trip.id for trip in result.scalars()] == [live.id]
+
+        result = await db.execute(select(Trip).execution_options(include_deleted=True))
+        assert {trip.id for trip in result.scalars()} == {live.id, deleted.id}
+
+    async def test_relationship_loads_skip_deleted_rows(
+        self, client, db, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        await add_city(trip)
+        rome = await add_city(trip, "Rome", "Italy")
+
+        result = await db.execute(
+            select(TripMember).where(TripMember.user_id == member.id)
+        )
+        result.scalar_one().soft_delete()
+        result = await db.execute(select(TripCity).where(TripCity.city_id == rome.id))
+        result.scalar_one().soft_delete()
+        await db.commit()
+
+        response = await client.get(
+            f"/api/v1/trips/{trip.id}", headers=auth_headers(owner)
+        )
+
+        data = response.json()
+        assert [m["user"]["name"] for m in data["members"]] == ["Owner"]
+        assert [c["city"]["name"] for c in data["cities"]] == ["Paris"]
+
+        response = await client.get(
+            f"/api/v1/trips/{trip.id}", headers=auth_headers(member)
+        )
+        assert response.status_code == 404
+
+
+class TestInsertReturning:
+    """Test creating rows with one INSERT ... RETURNING."""
+
+    async def test_returns_complete_object_in_one_statement(
+        self, db, make_user, assert_max_queries
+    ):
+        owner = await make_user("Owner")
+
+        with assert_max_queries(1):
+            trip = await insert_returning(db, Trip, name="Europe", owner_id=owner.id)
+            await db.commit()
+
+        assert trip.id is not None
+        assert trip.created_at is not None
+        assert trip.version == 1
+        assert trip.status == "planning"
+        assert await db.get(Trip, trip.id) is trip
@@ -0,0 +1,139 @@
+"""
+Unit tests for ETags and conditional GETs on trip and vote responses.
+"""
+
+from sqlalchemy import select
+from starlette.requests import Request
+
+from app.core.etags import is_not_modified
+from app.models import User
+
+
+def request_with(if_none_match: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "headers": [(b"if-none-match", if_none_match.encode())],
+        }
+    )
+
+
+class TestIfNoneMatch:
+    """Test matching of If-None-Match against an ETag."""
+
+    def test_weak_comparison(self):
+        etag = 'W/"00ff"'
+
+        assert is_not_modified(request_with('W/"00ff"'), etag)
+        assert is_not_modified(request_with('"00ff"'), etag)
+        assert not is_not_modified(request_with('W/"00fe"'), etag)
+
+    def test_list_and_wildcard(self):
+        etag = 'W/"00ff"'
+
+        assert is_not_modified(request_with('W/"0001", W/"00ff"'), etag)
+        assert is_not_modified(request_with("*"), etag)
+
+
+class TestConditionalGets:
+    """Test 304 answers and ETag changes on writes."""
+
+    async def test_unchanged_trip_answers_304(
+        self, client, make_user, make_trip, add_city, auth_headers, assert_max_queries
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        await add_city(trip)
+        headers = auth_headers(owner)
+        response = await client.get(f"/api/v1/trips/{trip.id}", headers=headers)
+        etag = response.headers["etag"]
+        assert etag.startswith('W/"')
+
+        # Membership check and the content version aggregate
+        with assert_max_queries(2):
+            response = await client.get(
+                f"/api/v1/trips/{trip.id}", headers={**headers, "If-None-Match": etag}
+            )
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+    async def test_vote_changes_etags(
+        self, client, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        city = await add_city(trip)
+        headers = auth_headers(owner)
+        urls = [
+            f"/api/v1/trips/{trip.id}",
+            f"/api/v1/trips/{trip.id}/cities",
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            f"/api/v1/voting/trips/{trip.id}/cities/{city.id}/votes",
+        ]
+        etags = {}
+        for url in urls:
+            etags[url] = (await client.get(url, headers=headers)).headers["etag"]
+
+        await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(city.id), "vote_type": "like"},
+            headers=headers,
+        )
+
+        for url in urls:
+            response = await client.get(
+                url, headers={**headers, "If-None-Match": etags[url]}
+            )
+            assert response.status_code == 200, url
+            assert response.headers["etag"] != etags[url]
+            etags[url] = response.headers["etag"]
+
+        # Withdrawing the vote soft-deletes it, which changes the tags again
+        await client.delete(urls[-1], headers=headers)
+        response = await client.get(
+            urls[-1], headers={**headers, "If-None-Match": etags[urls[-1]]}
+        )
+        assert response.status_code == 200
+        assert response.json()["vote_summary"]["like"] == 0
+
+    async def test_member_profile_change_changes_trip_etag(
+        self, client, db, make_user, make_trip, auth_headers
+    ):
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        headers = auth_headers(owner)
+        response = await client.get(f"/api/v1/trips/{trip.id}", headers=headers)
+        etag = response.headers["etag"]
+
+        user = (await db.execute(select(User).where(User.id == member.id))).scalar_one()
+        user.name = "Renamed Member"
+        await db.commit()
+
+        response = await client.get(
+            f"/api/v1/trips/{trip.id}", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        names = {m["user"]["name"] for m in response.json()["members"]}
+        assert "Renamed Member" in names
+
+    async def test_matching_etag_still_requires_membership(
+        self, client, make_user, make_trip, auth_headers
+    ):
+        owner = await make_user("Owner")
+        outsider = await make_user("Outsider")
+        trip = await make_trip(owner)
+        response = await client.get(
+            f"/api/v1/trips/{trip.id}", headers=auth_headers(owner)
+        )
+        etag = response.headers["etag"]
+
+        response = await client.get(
+            f"/api/v1/trips/{trip.id}",
+            headers={**auth_headers(outsider), "If-None-Match": etag},
+        )
+
+        assert response.status_code == 404
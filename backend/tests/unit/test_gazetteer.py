@@ -0,0 +1,165 @@
+"""
+Unit tests for the city gazetteer and autocomplete from it.
+"""
+
+import os
+
+import pytest
+
+from app.api.v1 import cities as cities_api
+from app.commands.build_gazetteer import read_dataset
+from app.services.gazetteer import (
+    BUSY_RANGE,
+    Gazetteer,
+    build_gazetteer,
+    open_gazetteer,
+)
+
+CITIES = [
+    ("place-paris-fr", "Paris", "Paris, France"),
+    ("place-parma", "Parma", "Parma, Italy"),
+    ("place-paris-tx", "Paris", "Paris, TX, USA"),
+    ("place-sao-paulo", "São Paulo", "São Paulo, Brazil"),
+    ("place-porto", "Porto", None),
+    ("place-zurich", "Zürich", "Zürich, Switzerland"),
+]
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    path = str(tmp_path / "gazetteer.bin")
+    build_gazetteer(CITIES, path)
+    gazetteer = Gazetteer(path)
+    yield gazetteer
+    gazetteer.close()
+
+
+def names(results):
+    return [result["name"] for result in results]
+
+
+class TestGazetteer:
+    """Test building and searching a gazetteer file."""
+
+    def test_prefix_matches_in_popularity_order(self, gazetteer):
+        results = gazetteer.search("par")
+
+        assert [r["place_id"] for r in results] == [
+            "place-paris-fr",
+            "place-parma",
+            "place-paris-tx",
+        ]
+
+    def test_busy_prefixes_return_most_popular_first(self, tmp_path):
+        # Least popular first in name order, so the best matches sort last
+        count = BUSY_RANGE * 3
+        rows = [(f"place-{i}", f"Sa{i:04d}", None) for i in reversed(range(count))]
+        path = str(tmp_path / "busy.bin")
+        build_gazetteer(rows, path)
+        gazetteer = Gazetteer(path)
+
+        for prefix in ("s", "sa", "sa0", "sa07"):
+            results = gazetteer.search(prefix, limit=3)
+            expected = [row for row in rows if row[1].lower().startswith(prefix)][:3]
+            assert [r["place_id"] for r in results] == [row[0] for row in expected]
+        gazetteer.close()
+
+    def test_case_accents_and_spacing_are_ignored(self, gazetteer):
+        assert names(gazetteer.search("SAO  pau")) == ["São Paulo"]
+        assert names(gazetteer.search("zur")) == ["Zürich"]
+        assert names(gazetteer.search("Zü")) == ["Zürich"]
+
+    def test_records_match_places_search_results(self, gazetteer):
+        assert gazetteer.search("porto") == [
+            {"place_id": "place-porto", "name": "Porto", "formatted_address": None}
+        ]
+
+    def test_limit_and_misses(self, gazetteer):
+        assert len(gazetteer.search("pa", limit=2)) == 2
+        assert gazetteer.search("atlantis") == []
+        assert gazetteer.search("  ") == []
+        assert gazetteer.search("zz") == []
+
+    def test_rebuild_replaces_file(self, gazetteer):
+        build_gazetteer(CITIES[:1], gazetteer.path)
+
+        assert len(gazetteer) == len(CITIES)
+        assert len(Gazetteer(gazetteer.path)) == 1
+
+    def test_search_reopens_rebuilt_file(self, gazetteer):
+        assert names(gazetteer.search("zur")) == ["Zürich"]
+
+        build_gazetteer(CITIES[:2], gazetteer.path)
+
+        assert gazetteer.search("zur") == []
+        assert names(gazetteer.search("par")) == ["Paris", "Parma"]
+        assert len(gazetteer) == 2
+
+    def test_unreadable_replacement_keeps_mapped_file(self, gazetteer, tmp_path):
+        other = tmp_path / "not-a-gazetteer.bin"
+        other.write_bytes(b"\0" * 64)
+        os.replace(other, gazetteer.path)
+
+        assert names(gazetteer.search("zur")) == ["Zürich"]
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "not-a-gazetteer.bin"
+        path.write_bytes(b"\0" * 64)
+
+        with pytest.raises(ValueError):
+            Gazetteer(str(path))
+
+    def test_open_without_built_file(self, tmp_path):
+        assert open_gazetteer("") is None
+        assert open_gazetteer(str(tmp_path / "missing.bin")) is None
+
+    def test_dataset_rows(self, tmp_path):
+        path = tmp_path / "cities.tsv"
+        path.write_text("place_id\tname\tcountry\nplace-lyon\tLyon\tFrance\n")
+
+        assert list(read_dataset(str(path))) == [("place-lyon", "Lyon", "Lyon, France")]
+
+
+class TestSearchEndpoint:
+    """Test city search answered from the gazetteer."""
+
+    async def test_prefix_is_answered_locally(
+        self, client, gazetteer, make_user, auth_headers, monkeypatch
+    ):
+        monkeypatch.setattr(cities_api, "gazetteer", gazetteer)
+
+        async def no_places(query):
+            raise AssertionError("Places should not be called")
+
+        monkeypatch.setattr(cities_api.places, "search", no_places)
+        response = await client.get(
+            "/api/v1/cities/search",
+            params={"q": "Par", "limit": 1},
+            headers=auth_headers(await make_user()),
+        )
+
+        assert response.status_code == 200
+        assert response.json()["results"] == [
+            {
+                "place_id": "place-paris-fr",
+                "name": "Paris",
+                "formatted_address": "Paris, France",
+            }
+        ]
+
+    async def test_unknown_prefix_falls_back_to_places(
+        self, client, gazetteer, make_user, auth_headers, monkeypatch
+    ):
+        monkeypatch.setattr(cities_api, "gazetteer", gazetteer)
+
+        async def places_search(query):
+            return [{"place_id": "place-lisbon", "name": "Lisbon"}]
+
+        monkeypatch.setattr(cities_api.places, "search", places_search)
+        response = await client.get(
+            "/api/v1/cities/search",
+            params={"q": "Lisbon"},
+            headers=auth_headers(await make_user()),
+        )
+
+        assert names(response.json()["results"]) == ["Lisbon"]
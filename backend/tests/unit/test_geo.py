@@ -0,0 +1,89 @@
+"""
+Unit tests for geohash cells and haversine distances.
+"""
+
+import math
+import random
+
+import pytest
+
+from app.core.geo import (
+    EARTH_RADIUS_KM,
+    cell_range,
+    covering_cells,
+    encode_geohash,
+    haversine_km,
+    nearest,
+)
+
+PARIS = (48.856614, 2.3522219)
+LONDON = (51.5072178, -0.1275862)
+
+
+def destination(latitude, longitude, bearing, distance_km):
+    """Point reached going ``distance_km`` from a point along a bearing."""
+    lat1, lng1 = math.radians(latitude), math.radians(longitude)
+    angle = distance_km / EARTH_RADIUS_KM
+    lat2 = math.asin(
+        math.sin(lat1) * math.cos(angle)
+        + math.cos(lat1) * math.sin(angle) * math.cos(bearing)
+    )
+    lng2 = lng1 + math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(lat1),
+        math.cos(angle) - math.sin(lat1) * math.sin(lat2),
+    )
+    return math.degrees(lat2), (math.degrees(lng2) + 540) % 360 - 180
+
+
+class TestGeohash:
+    """Test geohash encoding and cell ranges."""
+
+    def test_known_hash(self):
+        assert encode_geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+    def test_cell_range(self):
+        assert cell_range("u09") == ("u09", "u0b")
+        assert cell_range("u0z") == ("u0z", "u1")
+        assert cell_range("zz") == ("zz", None)
+        low, high = cell_range("u09")
+        assert low <= encode_geohash(*PARIS) < high
+
+    @pytest.mark.parametrize(
+        "center, radius_km",
+        [
+            (PARIS, 1),
+            (PARIS, 50),
+            ((64.1466, -21.9426), 200),
+            ((-33.8688, 151.2093), 5),
+            ((0.0, 179.99), 30),
+        ],
+    )
+    def test_covering_cells_contain_the_circle(self, center, radius_km):
+        rng = random.Random(1)
+        cells = covering_cells(*center, radius_km)
+
+        assert 1 <= len(cells) <= 9
+        for _ in range(500):
+            bearing = rng.uniform(0, 2 * math.pi)
+            point = destination(*center, bearing, radius_km * rng.random())
+            assert encode_geohash(*point).startswith(tuple(cells))
+
+    def test_large_radius_has_no_cells(self):
+        assert covering_cells(*PARIS, 5000) == []
+        assert covering_cells(89.9, 0, 50) == []
+
+
+class TestDistances:
+    """Test haversine distances and ranking."""
+
+    def test_haversine(self):
+        assert haversine_km(*PARIS, [LONDON, PARIS]) == [
+            pytest.approx(343.5, abs=0.5),
+            0.0,
+        ]
+
+    def test_nearest_filters_and_orders(self):
+        points = [LONDON, PARIS, destination(*PARIS, 0, 10), destination(*PARIS, 1, 20)]
+
+        assert [index for index, _ in nearest(*PARIS, points, 50, 10)] == [1, 2, 3]
+        assert [index for index, _ in nearest(*PARIS, points, 50, 2)] == [1, 2]
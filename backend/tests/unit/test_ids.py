@@ -0,0 +1,63 @@
+"""
+Unit tests for UUIDv7 primary key generation.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import select
+
+from app.core import ids
+from app.core.ids import uuid7, uuid7_datetime
+from app.models import User
+
+
+@pytest.fixture
+def fresh_generator(monkeypatch):
+    """Start from a clean generator state and restore it afterwards."""
+    monkeypatch.setattr(ids, "_last_ms", 0)
+    monkeypatch.setattr(ids, "_counter", 0)
+
+
+class TestUuid7:
+    """Test the layout and ordering of generated ids."""
+
+    def test_version_and_variant(self):
+        value = uuid7()
+
+        assert value.version == 7
+        assert value.variant == "specified in RFC 4122"
+
+    def test_embeds_creation_time(self):
+        before = datetime.now(timezone.utc) - timedelta(milliseconds=1)
+        created = uuid7_datetime(uuid7())
+
+        assert before <= created <= datetime.now(timezone.utc)
+
+    def test_ids_strictly_increase_within_a_millisecond(self, fresh_generator):
+        with patch.object(ids.time, "time_ns", return_value=1_700_000_000_000_000_000):
+            values = [uuid7() for _ in range(10_000)]
+
+        assert values == sorted(values)
+        assert len(set(values)) == len(values)
+
+    def test_ids_keep_increasing_when_clock_steps_back(self, fresh_generator):
+        with patch.object(ids.time, "time_ns", return_value=1_800_000_000_000_000_000):
+            first = uuid7()
+        with patch.object(ids.time, "time_ns", return_value=1_799_999_999_000_000_000):
+            second = uuid7()
+
+        assert second > first
+
+    def test_rejects_other_versions(self):
+        with pytest.raises(ValueError):
+            uuid7_datetime(uuid.uuid4())
+
+    async def test_models_default_to_uuid7(self, db, make_user):
+        user = await make_user("Owner")
+
+        assert user.id.version == 7
+        result = await db.execute(select(User).where(User.id == user.id))
+        assert result.scalar_one() is user
@@ -0,0 +1,129 @@
+"""
+Unit tests for the bulk city import command.
+
+SQLite takes the batched upsert path; the PostgreSQL COPY path needs a
+PostgreSQL server.
+"""
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from app.commands import import_cities
+from app.models import City
+from app.services.cities import read_city_dataset
+
+HEADER = "google_place_id\tname\tcountry\tlatitude\tlongitude\n"
+ROWS = [
+    "place-paris\tParis\tFrance\t48.856614\t2.3522219\n",
+    "place-lyon\tLyon\tFrance\t45.764043\t4.835659\n",
+    "place-rome\tRome\tItaly\t41.9027835\t12.4963655\n",
+    "place-milan\tMilan\tItaly\t\t\n",
+    "place-porto\tPorto\tPortugal\t41.1579438\t-8.6291053\n",
+]
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "cities.tsv"
+    path.write_text(HEADER + "".join(ROWS))
+    return path
+
+
+async def stored(db):
+    result = await db.execute(
+        select(City).order_by(City.name).execution_options(populate_existing=True)
+    )
+    return {city.google_place_id: city for city in result.scalars()}
+
+
+class TestReadCityDataset:
+    """Test parsing dataset files."""
+
+    def test_columns(self, tmp_path):
+        path = tmp_path / "cities.csv"
+        path.write_text(
+            "place_id,name,country,latitude\nplace-oslo,Oslo,Norway,59.91\n"
+        )
+
+        (row,) = read_city_dataset(str(path))
+
+        assert row[1:] == (
+            "place-oslo",
+            "Oslo",
+            "Norway",
+            "Oslo, Norway",
+            Decimal("59.91"),
+            None,
+            None,
+        )
+
+
+class TestImportCities:
+    """Test chunked, resumable imports."""
+
+    async def test_imports_in_chunks(self, db, dataset, session_factory):
+        imported = await import_cities.run(
+            str(dataset), chunk_size=2, sessions=session_factory
+        )
+
+        cities = await stored(db)
+        assert imported == 5
+        assert len(cities) == 5
+        assert float(cities["place-paris"].latitude) == pytest.approx(48.856614)
+        assert cities["place-paris"].geohash == "u09tvw0f6"
+        assert cities["place-milan"].latitude is None
+        assert cities["place-milan"].geohash is None
+        assert not dataset.with_name("cities.tsv.progress").exists()
+
+    async def test_reimport_merges_on_place_id(self, db, dataset, session_factory):
+        await import_cities.run(str(dataset), sessions=session_factory)
+        paris = (await stored(db))["place-paris"]
+        paris.soft_delete()
+        await db.commit()
+
+        renamed = ROWS[0].replace("Paris", "Paris City")
+        dataset.write_text(HEADER + renamed + "".join(ROWS[1:]))
+        await import_cities.run(str(dataset), sessions=session_factory)
+
+        cities = await stored(db)
+        assert len(cities) == 5
+        assert cities["place-paris"].id == paris.id
+        assert cities["place-paris"].name == "Paris City"
+        assert cities["place-paris"].deleted_at is None
+        assert cities["place-paris"].version == 2
+
+    async def test_resumes_after_last_committed_chunk(
+        self, db, dataset, session_factory, monkeypatch
+    ):
+        load = import_cities.upsert_cities
+        calls = []
+
+        async def fail_second_chunk(session, rows):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            return await load(session, rows)
+
+        monkeypatch.setattr(import_cities, "upsert_cities", fail_second_chunk)
+        with pytest.raises(RuntimeError):
+            await import_cities.run(
+                str(dataset), chunk_size=2, sessions=session_factory
+            )
+        assert len(await stored(db)) == 2
+
+        imported = await import_cities.run(
+            str(dataset), chunk_size=2, sessions=session_factory
+        )
+
+        assert imported == 3
+        assert len(await stored(db)) == 5
+
+    async def test_changed_dataset_starts_over(self, dataset, session_factory):
+        import_cities.ImportProgress(str(dataset)).save(4)
+        dataset.write_text(HEADER + "".join(ROWS[:3]))
+
+        imported = await import_cities.run(str(dataset), sessions=session_factory)
+
+        assert imported == 3
@@ -0,0 +1,173 @@
+"""
+Query plan tests for the live-row (``WHERE deleted_at IS NULL``) indexes
+and the delta sync indexes.
+
+Each test records the SQL an endpoint issues and checks SQLite's
+EXPLAIN QUERY PLAN output for the index the hot query should use.
+"""
+
+from typing import List
+
+from sqlalchemy import select
+
+from app.models import TripMember
+
+
+async def explain(engine, captured, table: str) -> List[str]:
+    """Query plans of the recorded statements that read from ``table``."""
+    plans = []
+    async with engine.connect() as conn:
+        for statement, parameters in captured:
+            if f"FROM {table}" not in statement:
+                continue
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+            plans.append("\n".join(row[-1] for row in result))
+    return plans
+
+
+class TestLiveRowIndexes:
+    """Test that hot live-row queries use the partial indexes."""
+
+    async def test_user_memberships_use_user_index(
+        self, db, make_user, make_trip, engine, record_queries
+    ):
+        owner = await make_user("Owner")
+        await make_trip(owner)
+
+        with record_queries() as captured:
+            await db.execute(
+                select(TripMember.trip_id).where(
+                    TripMember.user_id == owner.id,
+                    TripMember.deleted_at.is_(None),
+                )
+            )
+
+        [plan] = await explain(engine, captured, "trip_members")
+        assert "ix_trip_members_user_id_trip_created_at_live" in plan
+
+    async def test_trip_listing_counts_live_cities_by_index(
+        self, client, make_user, make_trip, auth_headers, engine, record_queries
+    ):
+        owner = await make_user("Owner")
+        await make_trip(owner)
+
+        with record_queries() as captured:
+            response = await client.get("/api/v1/trips/", headers=auth_headers(owner))
+        assert response.status_code == 200
+
+        [plan] = await explain(engine, captured, "trip_members")
+        assert "ix_trip_cities_trip_id_live" in plan
+
+    async def test_trip_listing_pages_by_membership_index(
+        self, client, make_user, make_trip, auth_headers, engine, record_queries
+    ):
+        owner = await make_user("Owner")
+        for i in range(3):
+            await make_trip(owner, name=f"Trip {i}")
+        response = await client.get(
+            "/api/v1/trips/", params={"per_page": 1}, headers=auth_headers(owner)
+        )
+        cursor = response.json()["next_cursor"]
+
+        with record_queries() as captured:
+            response = await client.get(
+                "/api/v1/trips/",
+                params={"per_page": 1, "cursor": cursor},
+                headers=auth_headers(owner),
+            )
+        assert response.status_code == 200
+
+        # The user's memberships come off the index in page order, unsorted
+        [plan] = await explain(engine, captured, "trip_members")
+        assert "ix_trip_members_user_id_trip_created_at_live" in plan
+        assert "TEMP B-TREE" not in plan
+
+    async def test_trip_detail_loads_live_cities_by_index(
+        self,
+        client,
+        make_user,
+        make_trip,
+        add_city,
+        auth_headers,
+        engine,
+        record_queries,
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        await add_city(trip)
+
+        with record_queries() as captured:
+            response = await client.get(
+                f"/api/v1/trips/{trip.id}", headers=auth_headers(owner)
+            )
+        assert response.status_code == 200
+
+        plans = await explain(engine, captured, "trip_cities")
+        assert any("ix_trip_cities_trip_id_live" in plan for plan in plans)
+
+    async def test_trip_votes_read_in_index_order(
+        self,
+        client,
+        make_user,
+        make_trip,
+        add_city,
+        auth_headers,
+        engine,
+        record_queries,
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        city = await add_city(trip)
+        await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(city.id), "vote_type": "like"},
+            headers=auth_headers(owner),
+        )
+
+        with record_queries() as captured:
+            response = await client.get(
+                f"/api/v1/voting/trips/{trip.id}/votes", headers=auth_headers(owner)
+            )
+        assert response.status_code == 200
+
+        # The content version aggregate and the ordered read of the votes
+        version_plan, votes_plan = await explain(engine, captured, "city_votes")
+        assert "ix_city_votes_trip_id_created_at_live" in version_plan
+        assert "ix_city_votes_trip_id_created_at_live" in votes_plan
+        assert "TEMP B-TREE" not in votes_plan
+
+
+class TestTripChangesIndexes:
+    """Test that delta sync finds deleted rows by index."""
+
+    async def test_tombstones_use_updated_at_indexes(
+        self,
+        client,
+        make_user,
+        make_trip,
+        add_city,
+        auth_headers,
+        engine,
+        record_queries,
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        await add_city(trip)
+        url = f"/api/v1/trips/{trip.id}/changes"
+        cursor = (await client.get(url, headers=auth_headers(owner))).json()["cursor"]
+
+        with record_queries() as captured:
+            response = await client.get(
+                url, params={"since": cursor}, headers=auth_headers(owner)
+            )
+        assert response.status_code == 200
+
+        [plan] = [
+            plan
+            for plan in await explain(engine, captured, "user_preferences")
+            if "UNION ALL" in plan
+        ]
+        for table in ("trip_members", "trip_cities", "city_votes", "user_preferences"):
+            assert f"ix_{table}_trip_id_updated_at" in plan
@@ -0,0 +1,193 @@
+"""
+Unit tests for the Google Places client, its cache, and city lookups.
+
+Places requests go to the in-process fake Places server.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import select, update
+
+from app.api.v1 import cities as cities_api
+from app.core.exceptions import ExternalServiceError
+from app.models import City
+from app.services.fake_places import create_fake_places, place_id_for
+from app.services.places import PlacesCache, PlacesClient, save_city
+
+PARIS = place_id_for("Paris", "France")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+async def fake_places():
+    """The fake Places server and a client talking to it."""
+    server = create_fake_places()
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=server))
+    yield server, PlacesClient("http://places.test", "test-key", http=http)
+    await http.aclose()
+
+
+@pytest.fixture
+def places(fake_places, monkeypatch):
+    """A fresh Places cache on a fake clock, also used by the API."""
+    server, client = fake_places
+    cache = PlacesCache(
+        client,
+        search_ttl_seconds=3600,
+        details_ttl_seconds=86400,
+        negative_ttl_seconds=60,
+        max_entries=100,
+    )
+    clock = FakeClock()
+    cache.searches.clock = cache.places.clock = clock
+    monkeypatch.setattr(cities_api, "places", cache)
+    return cache, server.state, clock
+
+
+class TestPlacesCache:
+    """Test caching of searches and place details."""
+
+    async def test_search_is_cached_by_normalized_query(self, places):
+        cache, server, _ = places
+
+        first = await cache.search("Paris")
+        second = await cache.search("  paris ")
+
+        assert [result["place_id"] for result in first] == [PARIS]
+        assert second == first
+        assert server.requests["textsearch"] == 1
+
+    async def test_empty_search_is_cached_briefly(self, places):
+        cache, server, clock = places
+
+        assert await cache.search("Atlantis") == []
+        assert await cache.search("atlantis") == []
+        assert server.requests["textsearch"] == 1
+
+        clock.now += 60
+        await cache.search("atlantis")
+        assert server.requests["textsearch"] == 2
+
+    async def test_unknown_place_is_cached_briefly(self, places):
+        cache, server, clock = places
+
+        assert await cache.details("no-such-place") is None
+        assert await cache.details("no-such-place") is None
+        assert server.requests["details"] == 1
+
+        clock.now += 60
+        await cache.details("no-such-place")
+        assert server.requests["details"] == 2
+
+    async def test_details_map_to_city_columns(self, places):
+        cache, _, _ = places
+
+        details = await cache.details(PARIS)
+
+        assert details["google_place_id"] == PARIS
+        assert (details["name"], details["country"]) == ("Paris", "France")
+        assert details["latitude"] == pytest.approx(48.856614)
+
+    async def test_concurrent_lookups_share_one_request(self, places):
+        cache, server, _ = places
+        server.latency_seconds = 0.01
+
+        results = await asyncio.gather(*(cache.search("Rome") for _ in range(20)))
+        details = await asyncio.gather(*(cache.details(PARIS) for _ in range(20)))
+
+        assert all(result == results[0] for result in results)
+        assert all(detail == details[0] for detail in details)
+        assert server.requests == {"textsearch": 1, "details": 1}
+
+    async def test_errors_are_not_cached(self, places):
+        cache, server, _ = places
+        server.error_status = "OVER_QUERY_LIMIT"
+
+        with pytest.raises(ExternalServiceError):
+            await cache.search("Lisbon")
+
+        server.error_status = None
+        assert len(await cache.search("Lisbon")) == 1
+
+
+class TestCityLookups:
+    """Test the city search and place endpoints."""
+
+    async def test_search_endpoint(self, client, places, make_user, auth_headers):
+        user = await make_user()
+
+        response = await client.get(
+            "/api/v1/cities/search", params={"q": "Porto"}, headers=auth_headers(user)
+        )
+
+        assert response.status_code == 200
+        assert response.json()["results"][0]["name"] == "Porto"
+
+    async def test_place_is_saved_and_served_from_cities(
+        self, client, db, places, make_user, auth_headers
+    ):
+        cache, server, _ = places
+        headers = auth_headers(await make_user())
+
+        response = await client.get(f"/api/v1/cities/places/{PARIS}", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["country"] == "France"
+
+        cache.places.clear()
+        response = await client.get(f"/api/v1/cities/places/{PARIS}", headers=headers)
+        assert response.status_code == 200
+        assert server.requests["details"] == 1
+
+        city = (await db.execute(select(City))).scalar_one()
+        assert str(city.id) == response.json()["id"]
+
+    async def test_stale_city_is_refreshed(
+        self, client, db, places, make_user, auth_headers
+    ):
+        cache, server, _ = places
+        headers = auth_headers(await make_user())
+        await client.get(f"/api/v1/cities/places/{PARIS}", headers=headers)
+        await db.execute(
+            update(City).values(updated_at=datetime.utcnow() - timedelta(days=2))
+        )
+        await db.commit()
+        cache.places.clear()
+
+        response = await client.get(f"/api/v1/cities/places/{PARIS}", headers=headers)
+
+        assert response.status_code == 200
+        assert server.requests["details"] == 2
+        city = (
+            await db.execute(select(City).execution_options(populate_existing=True))
+        ).scalar_one()
+        assert city.version == 2
+
+    async def test_unknown_place_is_404(self, client, places, make_user, auth_headers):
+        headers = auth_headers(await make_user())
+
+        response = await client.get("/api/v1/cities/places/nowhere", headers=headers)
+
+        assert response.status_code == 404
+
+    async def test_save_city_revives_deleted_row(self, db, places):
+        cache, _, _ = places
+        values = await cache.details(PARIS)
+        city = await save_city(db, values)
+        city.soft_delete()
+        await db.commit()
+
+        revived = await save_city(db, values)
+        await db.commit()
+
+        assert revived.id == city.id
+        assert revived.deleted_at is None
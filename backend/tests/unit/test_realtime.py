@@ -0,0 +1,546 @@
+"""
+Unit tests for real-time trip rooms, the WebSocket channel and the SSE stream.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models import Trip
+from app.services import realtime
+from app.services.broker import (
+    MAX_PAYLOAD_BYTES,
+    PostgresBroker,
+    TripEventBroker,
+    TripEventMessage,
+)
+from app.services.realtime import RoomConnection, publish_trip_event, trip_rooms
+
+
+def _events_url(trip, user=None, token=None):
+    if token is None:
+        token = create_access_token(data={"sub": str(user.id), "email": user.email})
+    return f"/ws/trips/{trip.id}?token={token}"
+
+
+def _stream_url(trip, user):
+    token = create_access_token(data={"sub": str(user.id), "email": user.email})
+    return f"/sse/trips/{trip.id}?token={token}"
+
+
+class TestRoomConnection:
+    """Test the bounded send queue and slow-client policies."""
+
+    def test_drop_oldest_keeps_newest_frames(self):
+        connection = RoomConnection(None, queue_size=2, policy="drop_oldest")
+
+        assert connection.offer("1")
+        assert connection.offer("2")
+        assert not connection.offer("3")
+
+        assert connection.dropped == 1
+        assert not connection.overflowed.is_set()
+        assert [connection._queue.get_nowait() for _ in range(2)] == ["2", "3"]
+
+    def test_disconnect_policy_flags_overflow(self):
+        connection = RoomConnection(None, queue_size=1, policy="disconnect")
+
+        assert connection.offer("1")
+        assert not connection.offer("2")
+        assert connection.overflowed.is_set()
+        assert not connection.offer("3")
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            RoomConnection(None, queue_size=1, policy="block")
+
+
+class TestTripEvents:
+    """Test the /ws/trips/{trip_id} channel."""
+
+    async def test_member_receives_vote_events(
+        self, client, ws_connect, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        city = await add_city(trip)
+        socket = await ws_connect(_events_url(trip, member))
+
+        await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(city.id), "vote_type": "like"},
+            headers=auth_headers(owner),
+        )
+        event = await socket.receive_json()
+
+        assert event["type"] == "vote_cast"
+        assert event["timestamp"].endswith("Z")
+        assert event["data"] == {
+            "city_id": str(city.id),
+            "user_id": str(owner.id),
+            "vote_type": "like",
+            "vote_summary": {"like": 1, "dont_mind": 0, "dislike": 0},
+        }
+
+        await client.delete(
+            f"/api/v1/voting/trips/{trip.id}/cities/{city.id}/votes",
+            headers=auth_headers(owner),
+        )
+        event = await socket.receive_json()
+
+        # Inside the first vote's coalescing window
+        assert event["type"] == "vote_summary_changed"
+        assert event["data"] == {
+            "summaries": [
+                {
+                    "city_id": str(city.id),
+                    "vote_summary": {"like": 0, "dont_mind": 0, "dislike": 0},
+                }
+            ]
+        }
+
+    async def test_bulk_votes_are_coalesced(
+        self, client, ws_connect, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        paris = await add_city(trip, "Paris")
+        rome = await add_city(trip, "Rome", "Italy")
+        socket = await ws_connect(_events_url(trip, owner))
+
+        await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes/bulk",
+            json={
+                "votes": [
+                    {"city_id": str(paris.id), "vote_type": "like"},
+                    {"city_id": str(rome.id), "vote_type": "dislike"},
+                ]
+            },
+            headers=auth_headers(owner),
+        )
+        first, merged = [await socket.receive_json() for _ in range(2)]
+
+        assert (first["type"], first["data"]["city_id"]) == ("vote_cast", str(paris.id))
+        assert merged["type"] == "vote_summary_changed"
+        assert merged["data"]["summaries"] == [
+            {
+                "city_id": str(rome.id),
+                "vote_summary": {"like": 0, "dont_mind": 0, "dislike": 1},
+            }
+        ]
+
+    async def test_events_stay_in_their_trip(
+        self, client, ws_connect, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        other_trip = await make_trip(owner, name="Asia")
+        city = await add_city(trip)
+        socket = await ws_connect(_events_url(other_trip, owner))
+
+        await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(city.id), "vote_type": "like"},
+            headers=auth_headers(owner),
+        )
+
+        with pytest.raises(asyncio.TimeoutError):
+            await socket.receive_json(timeout=0.05)
+
+    @pytest.mark.parametrize("token", ["", "not-a-jwt"])
+    async def test_rejects_bad_tokens(self, ws_connect, make_user, make_trip, token):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+
+        socket = await ws_connect(_events_url(trip, token=token))
+
+        assert socket.close_code == 1008
+        assert trip_rooms.room_size(trip.id) == 0
+
+    async def test_rejects_non_members(self, ws_connect, make_user, make_trip):
+        owner = await make_user("Owner")
+        outsider = await make_user("Outsider")
+        trip = await make_trip(owner)
+
+        socket = await ws_connect(_events_url(trip, outsider))
+
+        assert socket.close_code == 1008
+
+    async def test_rejects_deleted_accounts(self, db, ws_connect, make_user, make_trip):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        url = _events_url(trip, owner)
+        owner.soft_delete()
+        await db.commit()
+
+        socket = await ws_connect(url)
+
+        assert socket.close_code == 1008
+        assert trip_rooms.room_size(trip.id) == 0
+
+    async def test_leaving_empties_the_room(self, ws_connect, make_user, make_trip):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        socket = await ws_connect(_events_url(trip, owner))
+        assert trip_rooms.room_size(trip.id) == 1
+
+        await socket.close()
+
+        assert trip_rooms.room_size(trip.id) == 0
+
+    async def test_slow_client_is_disconnected_without_stalling_the_room(
+        self, ws_connect, make_user, make_trip, monkeypatch
+    ):
+        monkeypatch.setattr(trip_rooms, "queue_size", 4)
+        monkeypatch.setattr(realtime, "CLOSE_TIMEOUT_SECONDS", 0.01)
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        healthy = await ws_connect(_events_url(trip, owner))
+        stalled = await ws_connect(_events_url(trip, member))
+        stalled.reading.clear()
+
+        for i in range(10):
+            trip_rooms.broadcast(trip.id, "trip_updated", {"n": i})
+            # Let the healthy client keep up, as a live one would
+            assert (await healthy.receive_json())["data"] == {"n": i}
+
+        await stalled.wait_closed()
+        assert trip_rooms.room_size(trip.id) == 1
+        assert trip_rooms.frames_lost >= 1
+
+
+class RecordingRooms:
+    """Rooms that remember what a broker delivered."""
+
+    def __init__(self):
+        self.delivered = []
+
+    def trip_ids(self):
+        return []
+
+    def deliver(self, message):
+        self.delivered.append(message)
+
+    def catch_up(self, trip_id, version):
+        pass
+
+
+class TestTripEventBroker:
+    """Test event versions, delivery on commit and gap detection."""
+
+    def test_message_round_trip(self):
+        message = TripEventMessage(uuid.uuid4(), 7, "vote_cast", {"city_id": "c"})
+
+        assert TripEventMessage.decode(message.encode()) == message
+
+    def test_oversized_message_drops_its_data(self):
+        message = TripEventMessage(
+            uuid.uuid4(), 7, "trip_updated", {"blob": "x" * 9000}
+        )
+
+        payload = message.encode()
+
+        assert len(payload.encode()) <= MAX_PAYLOAD_BYTES
+        assert TripEventMessage.decode(payload).data is None
+
+    def test_broker_without_publish_cannot_be_created(self):
+        class SilentBroker(TripEventBroker):
+            pass
+
+        with pytest.raises(TypeError):
+            SilentBroker(RecordingRooms())
+
+    def test_postgres_listener_delivers_notifications(self):
+        rooms = RecordingRooms()
+        broker = PostgresBroker(rooms, "postgresql+asyncpg://localhost/test")
+        message = TripEventMessage(uuid.uuid4(), 3, "vote_cast", {"city_id": "c"})
+
+        broker._on_notify(None, 1, "trip_events", message.encode())
+        broker._on_notify(None, 1, "trip_events", "not json")
+
+        assert broker.dsn == "postgresql://localhost/test"
+        assert rooms.delivered == [message]
+
+    async def test_events_are_versioned_without_touching_the_trip(
+        self, client, db, ws_connect, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        city = await add_city(trip)
+        updated_at = trip.updated_at
+        socket = await ws_connect(_events_url(trip, owner))
+
+        for vote_type in ("like", "dislike"):
+            await client.post(
+                f"/api/v1/voting/trips/{trip.id}/votes",
+                json={"city_id": str(city.id), "vote_type": vote_type},
+                headers=auth_headers(owner),
+            )
+
+        assert [(await socket.receive_json())["version"] for _ in range(2)] == [1, 2]
+        stored = (
+            await db.execute(
+                select(Trip.event_version, Trip.updated_at).where(Trip.id == trip.id)
+            )
+        ).one()
+        assert stored == (2, updated_at)
+
+    async def test_events_wait_for_commit(self, db, ws_connect, make_user, make_trip):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        trip_id = trip.id
+        socket = await ws_connect(_events_url(trip, owner))
+
+        await publish_trip_event(db, trip_id, "trip_updated", {"name": "Asia"})
+        with pytest.raises(asyncio.TimeoutError):
+            await socket.receive_json(timeout=0.05)
+        await db.rollback()
+
+        await publish_trip_event(db, trip_id, "trip_updated", {"name": "Europe"})
+        await db.commit()
+        event = await socket.receive_json()
+
+        assert (event["version"], event["data"]) == (1, {"name": "Europe"})
+        with pytest.raises(asyncio.TimeoutError):
+            await socket.receive_json(timeout=0.05)
+
+    async def test_version_gap_resyncs_the_room(self, ws_connect, make_user, make_trip):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        socket = await ws_connect(_events_url(trip, owner))
+
+        trip_rooms.deliver(TripEventMessage(trip.id, 1, "trip_updated", {"n": 1}))
+        trip_rooms.deliver(TripEventMessage(trip.id, 1, "trip_updated", {"n": 1}))
+        trip_rooms.deliver(TripEventMessage(trip.id, 4, "trip_updated", {"n": 4}))
+        trip_rooms.catch_up(trip.id, 4)
+        trip_rooms.catch_up(trip.id, 6)
+
+        events = [await socket.receive_json() for _ in range(3)]
+        assert [(event["type"], event["version"]) for event in events] == [
+            ("trip_updated", 1),
+            ("resync", 4),
+            ("resync", 6),
+        ]
+        with pytest.raises(asyncio.TimeoutError):
+            await socket.receive_json(timeout=0.05)
+
+
+def _vote(trip, version, city, like):
+    return TripEventMessage(
+        trip.id,
+        version,
+        "vote_cast",
+        {"city_id": city, "vote_summary": {"like": like, "dont_mind": 0, "dislike": 0}},
+    )
+
+
+class TestVoteCoalescing:
+    """Test merging vote bursts into vote_summary_changed frames."""
+
+    async def test_burst_becomes_one_frame_per_window(
+        self, ws_connect, make_user, make_trip, monkeypatch
+    ):
+        monkeypatch.setattr(trip_rooms, "coalesce_window_seconds", 0.05)
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        socket = await ws_connect(_events_url(trip, owner))
+        before = trip_rooms.stats()
+
+        for version, (city, like) in enumerate(
+            [("a", 1), ("a", 2), ("b", 1), ("a", 3), ("c", 1)], 1
+        ):
+            trip_rooms.deliver(_vote(trip, version, city, like))
+
+        first = await socket.receive_json()
+        merged = await socket.receive_json()
+        assert (first["type"], first["version"]) == ("vote_cast", 1)
+        assert merged["type"] == "vote_summary_changed"
+        assert merged["version"] == 5
+        assert [
+            (summary["city_id"], summary["vote_summary"]["like"])
+            for summary in merged["data"]["summaries"]
+        ] == [("b", 1), ("a", 3), ("c", 1)]
+
+        after = trip_rooms.stats()
+        assert after["events_received"] - before["events_received"] == 5
+        assert after["frames_sent"] - before["frames_sent"] == 2
+
+    async def test_other_events_flush_merged_votes_first(
+        self, ws_connect, make_user, make_trip, monkeypatch
+    ):
+        monkeypatch.setattr(trip_rooms, "coalesce_window_seconds", 10)
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        socket = await ws_connect(_events_url(trip, owner))
+
+        trip_rooms.deliver(_vote(trip, 1, "a", 1))
+        trip_rooms.deliver(_vote(trip, 2, "a", 2))
+        trip_rooms.deliver(TripEventMessage(trip.id, 3, "city_added", {"city_id": "b"}))
+
+        events = [await socket.receive_json() for _ in range(3)]
+        assert [(event["type"], event["version"]) for event in events] == [
+            ("vote_cast", 1),
+            ("vote_summary_changed", 2),
+            ("city_added", 3),
+        ]
+
+    async def test_zero_window_sends_every_vote(
+        self, ws_connect, make_user, make_trip, monkeypatch
+    ):
+        monkeypatch.setattr(trip_rooms, "coalesce_window_seconds", 0)
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        socket = await ws_connect(_events_url(trip, owner))
+
+        for version in (1, 2, 3):
+            trip_rooms.deliver(_vote(trip, version, "a", version))
+
+        events = [await socket.receive_json() for _ in range(3)]
+        assert [event["type"] for event in events] == ["vote_cast"] * 3
+
+
+class TestEventStream:
+    """Test the Server-Sent Events stream and Last-Event-ID resume."""
+
+    async def test_streams_events_with_their_versions_as_ids(
+        self, sse_connect, make_user, make_trip
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        stream = await sse_connect(_stream_url(trip, owner))
+
+        trip_rooms.deliver(TripEventMessage(trip.id, 1, "trip_updated", {"n": 1}))
+
+        assert stream.status_code == 200
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        # Streams bypass the per-request middleware
+        assert "x-correlation-id" not in stream.headers
+        assert await stream.receive_frame() == "retry: 2000"
+        event_id, event = await stream.receive_event()
+        assert (event_id, event["type"], event["version"]) == ("1", "trip_updated", 1)
+
+    async def test_accepts_a_bearer_header(
+        self, sse_connect, make_user, make_trip, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+
+        stream = await sse_connect(f"/sse/trips/{trip.id}", auth_headers(owner))
+
+        assert stream.status_code == 200
+        assert trip_rooms.room_size(trip.id) == 1
+
+    async def test_rejects_bad_tokens_and_non_members(
+        self, sse_connect, make_user, make_trip
+    ):
+        owner = await make_user("Owner")
+        outsider = await make_user("Outsider")
+        trip = await make_trip(owner)
+
+        bad_token = await sse_connect(f"/sse/trips/{trip.id}?token=not-a-jwt")
+        outsider_stream = await sse_connect(_stream_url(trip, outsider))
+
+        assert bad_token.status_code == 401
+        assert outsider_stream.status_code == 404
+        assert trip_rooms.room_size(trip.id) == 0
+
+    async def test_rejects_deleted_accounts(
+        self, db, sse_connect, make_user, make_trip
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        url = _stream_url(trip, owner)
+        owner.soft_delete()
+        await db.commit()
+
+        stream = await sse_connect(url)
+
+        assert stream.status_code == 401
+        assert trip_rooms.room_size(trip.id) == 0
+
+    async def test_sends_heartbeats_when_idle(
+        self, sse_connect, make_user, make_trip, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "sse_heartbeat_seconds", 0.02)
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        stream = await sse_connect(_stream_url(trip, owner))
+
+        await stream.receive_frame()
+
+        assert await stream.receive_frame() == ": heartbeat"
+
+    async def test_reconnect_resumes_after_last_event_id(
+        self, sse_connect, make_user, make_trip
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        stream = await sse_connect(_stream_url(trip, owner))
+        trip_rooms.deliver(TripEventMessage(trip.id, 1, "trip_updated", {"n": 1}))
+        last_event_id, _ = await stream.receive_event()
+        await stream.close()
+
+        # The room outlives its last client for a while and keeps buffering
+        assert trip_rooms.room_size(trip.id) == 0
+        for version in (2, 3):
+            trip_rooms.deliver(
+                TripEventMessage(trip.id, version, "trip_updated", {"n": version})
+            )
+        stream = await sse_connect(
+            _stream_url(trip, owner), {"Last-Event-ID": last_event_id}
+        )
+
+        events = [await stream.receive_event() for _ in range(2)]
+        assert [(event_id, event["data"]) for event_id, event in events] == [
+            ("2", {"n": 2}),
+            ("3", {"n": 3}),
+        ]
+        with pytest.raises(asyncio.TimeoutError):
+            await stream.receive_event(timeout=0.05)
+
+    async def test_resume_past_the_buffer_resyncs(
+        self, sse_connect, make_user, make_trip, monkeypatch
+    ):
+        monkeypatch.setattr(trip_rooms, "replay_size", 2)
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        await sse_connect(_stream_url(trip, owner))
+        for version in range(1, 5):
+            trip_rooms.deliver(
+                TripEventMessage(trip.id, version, "trip_updated", {"n": version})
+            )
+
+        behind = await sse_connect(_stream_url(trip, member), {"Last-Event-ID": "1"})
+        caught_up = await sse_connect(_stream_url(trip, member), {"Last-Event-ID": "2"})
+
+        event_id, event = await behind.receive_event()
+        assert (event_id, event["type"], event["data"]) == (
+            "4",
+            "resync",
+            {"version": 4},
+        )
+        assert [(await caught_up.receive_event())[0] for _ in range(2)] == ["3", "4"]
+
+    async def test_slow_client_stream_is_ended(
+        self, sse_connect, make_user, make_trip, monkeypatch
+    ):
+        monkeypatch.setattr(trip_rooms, "queue_size", 4)
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        stream = await sse_connect(_stream_url(trip, owner))
+        await stream.receive_frame()
+        stream.reading.clear()
+
+        for i in range(10):
+            trip_rooms.broadcast(trip.id, "trip_updated", {"n": i})
+        stream.reading.set()
+
+        await stream.wait_closed()
+        assert trip_rooms.room_size(trip.id) == 0
@@ -0,0 +1,90 @@
+"""
+Unit tests for token verification and its caches.
+"""
+
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.security import create_access_token, verify_token
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    """Fresh token caches on a fake clock, counting real verifications."""
+    clock = FakeClock()
+    for cache in (security.verified_tokens, security.rejected_tokens):
+        monkeypatch.setattr(cache, "clock", clock)
+        cache.clear()
+
+    calls = []
+    decode = security.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+    yield calls, clock
+    security.verified_tokens.clear()
+    security.rejected_tokens.clear()
+
+
+class TestVerifyToken:
+    """Test verification and caching of access tokens."""
+
+    def test_verified_token_is_cached(self, decode_calls):
+        calls, _ = decode_calls
+        token = create_access_token({"sub": "user-1"})
+
+        assert verify_token(token)["sub"] == "user-1"
+        assert verify_token(token)["sub"] == "user-1"
+        assert len(calls) == 1
+
+    def test_cached_payload_cannot_be_mutated(self, decode_calls):
+        token = create_access_token({"sub": "user-1"})
+
+        verify_token(token)["sub"] = "someone-else"
+
+        assert verify_token(token)["sub"] == "user-1"
+
+    def test_entry_expires_with_token(self, decode_calls):
+        calls, clock = decode_calls
+        token = create_access_token({"sub": "user-1"}, timedelta(seconds=60))
+
+        verify_token(token)
+        clock.now += 61
+        verify_token(token)
+
+        assert len(calls) == 2
+
+    def test_rejected_token_is_cached(self, decode_calls):
+        calls, clock = decode_calls
+
+        for _ in range(3):
+            with pytest.raises(HTTPException) as exc_info:
+                verify_token("not-a-jwt")
+            assert exc_info.value.status_code == 401
+        assert len(calls) == 1
+
+        clock.now += security.settings.token_reject_cache_seconds
+        with pytest.raises(HTTPException):
+            verify_token("not-a-jwt")
+        assert len(calls) == 2
+
+    def test_expired_token_is_rejected(self, decode_calls):
+        token = create_access_token({"sub": "user-1"}, timedelta(seconds=-1))
+
+        with pytest.raises(HTTPException):
+            verify_token(token)
+        assert len(security.verified_tokens) == 0
@@ -0,0 +1,340 @@
+"""
+Unit tests for the trips API.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.models import Trip, TripMember, TripRole, TripStatus
+
+
+class TestListTrips:
+    """Test cursor-paginated trip listing."""
+
+    async def _make_trips(self, db, owner, count, start=None):
+        start = start or datetime(2025, 1, 1)
+        trips = []
+        for i in range(count):
+            # Pairs of trips share a timestamp so the id tie-breaker matters
+            trip = Trip(
+                name=f"Trip {i}",
+                owner_id=owner.id,
+                status=TripStatus.DECIDED if i % 3 == 0 else TripStatus.PLANNING,
+                created_at=start + timedelta(minutes=i // 2),
+            )
+            db.add(trip)
+            await db.flush()
+            db.add(
+                TripMember(
+                    trip_id=trip.id,
+                    trip_created_at=trip.created_at,
+                    user_id=owner.id,
+                    role=TripRole.OWNER,
+                )
+            )
+            trips.append(trip)
+        await db.commit()
+        return trips
+
+    async def _collect(self, client, headers, **params):
+        pages, cursor = [], None
+        while True:
+            query = dict(params, **({"cursor": cursor} if cursor else {}))
+            response = await client.get("/api/v1/trips/", params=query, headers=headers)
+            assert response.status_code == 200
+            data = response.json()
+            pages.append(data["items"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return pages
+
+    async def test_pages_cover_all_trips_newest_first(
+        self, client, db, make_user, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trips = await self._make_trips(db, owner, 11)
+
+        pages = await self._collect(client, auth_headers(owner), per_page=4)
+
+        assert [len(page) for page in pages] == [4, 4, 3]
+        listed = [item["id"] for page in pages for item in page]
+        expected = sorted(trips, key=lambda t: (t.created_at, t.id), reverse=True)
+        assert listed == [str(trip.id) for trip in expected]
+        assert pages[0][0]["member_count"] == 1
+        assert pages[0][0]["city_count"] == 0
+
+    async def test_status_filter(self, client, db, make_user, auth_headers):
+        owner = await make_user("Owner")
+        await self._make_trips(db, owner, 9)
+
+        pages = await self._collect(
+            client, auth_headers(owner), per_page=2, status="decided"
+        )
+
+        statuses = [item["status"] for page in pages for item in page]
+        assert statuses == ["decided"] * 3
+
+    async def test_only_member_trips_are_listed(
+        self, client, db, make_user, make_trip, auth_headers
+    ):
+        owner = await make_user("Owner")
+        outsider = await make_user("Outsider")
+        await make_trip(owner)
+
+        response = await client.get("/api/v1/trips/", headers=auth_headers(outsider))
+
+        assert response.json()["items"] == []
+
+    async def test_listing_query_budget(
+        self, client, db, make_user, auth_headers, assert_max_queries
+    ):
+        owner = await make_user("Owner")
+        await self._make_trips(db, owner, 5)
+
+        # user, page with member and city counts
+        with assert_max_queries(2):
+            response = await client.get("/api/v1/trips/", headers=auth_headers(owner))
+
+        assert len(response.json()["items"]) == 5
+
+    async def test_invalid_cursor(self, client, make_user, auth_headers):
+        owner = await make_user("Owner")
+
+        response = await client.get(
+            "/api/v1/trips/",
+            params={"cursor": "not-a-cursor"},
+            headers=auth_headers(owner),
+        )
+
+        assert response.status_code == 400
+
+
+class TestGetTrip:
+    """Test the trip detail endpoint."""
+
+    async def test_trip_detail(
+        self, client, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        paris = await add_city(trip)
+        await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(paris.id), "vote_type": "like"},
+            headers=auth_headers(member),
+        )
+
+        response = await client.get(
+            f"/api/v1/trips/{trip.id}", headers=auth_headers(owner)
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["name"] == trip.name
+        assert {m["user"]["name"]: m["role"] for m in data["members"]} == {
+            "Owner": "owner",
+            "Member": "member",
+        }
+        assert data["cities"][0]["city"]["name"] == "Paris"
+        assert data["cities"][0]["vote_summary"] == {
+            "like": 1,
+            "dont_mind": 0,
+            "dislike": 0,
+        }
+
+    async def test_trip_detail_query_count_is_constant(
+        self, client, make_user, make_trip, add_city, auth_headers, assert_max_queries
+    ):
+        owner = await make_user("Owner")
+        members = [await make_user(f"Member {i}") for i in range(6)]
+        trip = await make_trip(owner, *members)
+        for name in ("Paris", "Rome", "Lisbon", "Porto", "Vienna"):
+            await add_city(trip, name, "Europe")
+
+        # user, membership, content version, trip, members + users, cities + city
+        with assert_max_queries(6):
+            response = await client.get(
+                f"/api/v1/trips/{trip.id}", headers=auth_headers(owner)
+            )
+
+        assert response.status_code == 200
+        assert len(response.json()["members"]) == 7
+        assert len(response.json()["cities"]) == 5
+
+    async def test_trip_detail_requires_membership(
+        self, client, make_user, make_trip, auth_headers
+    ):
+        owner = await make_user("Owner")
+        outsider = await make_user("Outsider")
+        trip = await make_trip(owner)
+
+        response = await client.get(
+            f"/api/v1/trips/{trip.id}", headers=auth_headers(outsider)
+        )
+
+        assert response.status_code == 404
+
+
+class TestTripChanges:
+    """Test the trip delta sync endpoint."""
+
+    @pytest.fixture(autouse=True)
+    def no_overlap(self, monkeypatch):
+        monkeypatch.setattr(settings, "trip_changes_overlap_seconds", 0.0)
+
+    async def _changes(self, client, trip, user, auth_headers, since=None):
+        params = {} if since is None else {"since": since}
+        response = await client.get(
+            f"/api/v1/trips/{trip.id}/changes",
+            params=params,
+            headers=auth_headers(user),
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    async def test_first_sync_is_a_snapshot(
+        self, client, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        await add_city(trip)
+
+        data = await self._changes(client, trip, owner, auth_headers)
+
+        assert data["snapshot"] is True
+        assert data["trip"]["name"] == "Europe"
+        assert len(data["members"]) == 2
+        assert data["cities"][0]["city"]["name"] == "Paris"
+        assert data["deleted"] == {
+            "members": [],
+            "cities": [],
+            "votes": [],
+            "preferences": [],
+        }
+
+    async def test_only_changed_rows_are_sent(
+        self, client, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        paris = await add_city(trip)
+        await add_city(trip, "Rome", "Italy")
+        cursor = (await self._changes(client, trip, owner, auth_headers))["cursor"]
+
+        await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(paris.id), "vote_type": "like"},
+            headers=auth_headers(member),
+        )
+        data = await self._changes(client, trip, owner, auth_headers, cursor)
+
+        assert data["snapshot"] is False
+        assert data["trip"] is None
+        assert data["members"] == []
+        # The tally update touched Paris only
+        assert [c["city"]["name"] for c in data["cities"]] == ["Paris"]
+        assert data["cities"][0]["vote_summary"]["like"] == 1
+        assert [v["vote_type"] for v in data["votes"]] == ["like"]
+        assert data["event_version"] == 1
+        assert data["cursor"] > cursor
+
+        data = await self._changes(client, trip, owner, auth_headers, data["cursor"])
+
+        assert (data["cities"], data["votes"]) == ([], [])
+
+    async def test_deleted_rows_are_sent_as_tombstones(
+        self, client, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        paris = await add_city(trip)
+        vote = (
+            await client.post(
+                f"/api/v1/voting/trips/{trip.id}/votes",
+                json={"city_id": str(paris.id), "vote_type": "like"},
+                headers=auth_headers(owner),
+            )
+        ).json()["vote"]
+        cursor = (await self._changes(client, trip, owner, auth_headers))["cursor"]
+
+        await client.delete(
+            f"/api/v1/voting/trips/{trip.id}/cities/{paris.id}/votes",
+            headers=auth_headers(owner),
+        )
+        data = await self._changes(client, trip, owner, auth_headers, cursor)
+
+        assert data["votes"] == []
+        assert data["deleted"]["votes"] == [vote["id"]]
+        assert data["cities"][0]["vote_summary"]["like"] == 0
+
+    async def test_changes_to_users_resend_their_memberships(
+        self, client, db, make_user, make_trip, auth_headers
+    ):
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        cursor = (await self._changes(client, trip, owner, auth_headers))["cursor"]
+
+        member.name = "Renamed"
+        await db.commit()
+        data = await self._changes(client, trip, owner, auth_headers, cursor)
+
+        assert [m["user"]["name"] for m in data["members"]] == ["Renamed"]
+
+    async def test_old_cursor_falls_back_to_snapshot(
+        self, client, make_user, make_trip, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+
+        data = await self._changes(client, trip, owner, auth_headers, since=1)
+
+        assert data["snapshot"] is True
+        assert data["trip"]["id"] == str(trip.id)
+
+    async def test_cursor_overlaps_the_sync(
+        self, client, make_user, make_trip, add_city, auth_headers, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "trip_changes_overlap_seconds", 60.0)
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        await add_city(trip)
+        cursor = (await self._changes(client, trip, owner, auth_headers))["cursor"]
+
+        data = await self._changes(client, trip, owner, auth_headers, cursor)
+
+        # Rows from the last minute are sent again, in case some were in flight
+        assert data["snapshot"] is False
+        assert len(data["cities"]) == 1
+
+    async def test_changes_query_count_is_constant(
+        self, client, make_user, make_trip, add_city, auth_headers, assert_max_queries
+    ):
+        owner = await make_user("Owner")
+        members = [await make_user(f"Member {i}") for i in range(6)]
+        trip = await make_trip(owner, *members)
+        for name in ("Paris", "Rome", "Lisbon"):
+            await add_city(trip, name, "Europe")
+        cursor = (await self._changes(client, trip, owner, auth_headers))["cursor"]
+
+        # user, membership, trip, members, cities, votes, preferences, tombstones
+        with assert_max_queries(8):
+            await self._changes(client, trip, owner, auth_headers, cursor)
+
+    async def test_changes_require_membership(
+        self, client, make_user, make_trip, auth_headers
+    ):
+        owner = await make_user("Owner")
+        outsider = await make_user("Outsider")
+        trip = await make_trip(owner)
+
+        response = await client.get(
+            f"/api/v1/trips/{trip.id}/changes", headers=auth_headers(outsider)
+        )
+
+        assert response.status_code == 404
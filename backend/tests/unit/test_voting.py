@@ -0,0 +1,428 @@
+"""
+Unit tests for the voting API and the maintained vote tallies.
+"""
+
+from sqlalchemy import select, update
+
+from app.api.v1 import voting as voting_api
+from app.models import TripCity
+from app.services import voting as voting_service
+from app.services.voting import reconcile_vote_tallies
+
+
+async def _tally(db, trip, city):
+    result = await db.execute(
+        select(TripCity).where(TripCity.trip_id == trip.id, TripCity.city_id == city.id)
+    )
+    trip_city = result.scalar_one()
+    await db.refresh(trip_city)
+    return trip_city.vote_summary
+
+
+class TestCastVote:
+    """Test casting, changing and withdrawing votes."""
+
+    async def test_cast_vote_updates_tally(
+        self, client, db, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        city = await add_city(trip)
+
+        response = await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(city.id), "vote_type": "like", "comment": "Yes!"},
+            headers=auth_headers(owner),
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["vote"]["vote_type"] == "like"
+        assert data["vote"]["comment"] == "Yes!"
+        assert data["vote_summary"] == {"like": 1, "dont_mind": 0, "dislike": 0}
+        assert await _tally(db, trip, city) == data["vote_summary"]
+
+    async def test_changing_vote_moves_tally(
+        self, client, db, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        city = await add_city(trip)
+        url = f"/api/v1/voting/trips/{trip.id}/votes"
+
+        await client.post(
+            url,
+            json={"city_id": str(city.id), "vote_type": "like"},
+            headers=auth_headers(owner),
+        )
+        await client.post(
+            url,
+            json={"city_id": str(city.id), "vote_type": "like"},
+            headers=auth_headers(member),
+        )
+        response = await client.post(
+            url,
+            json={"city_id": str(city.id), "vote_type": "dislike"},
+            headers=auth_headers(member),
+        )
+
+        assert response.json()["vote_summary"] == {
+            "like": 1,
+            "dont_mind": 0,
+            "dislike": 1,
+        }
+        assert await _tally(db, trip, city) == {"like": 1, "dont_mind": 0, "dislike": 1}
+
+    async def test_repeating_vote_keeps_tally(
+        self, client, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        city = await add_city(trip)
+        url = f"/api/v1/voting/trips/{trip.id}/votes"
+        body = {"city_id": str(city.id), "vote_type": "dont_mind"}
+
+        await client.post(url, json=body, headers=auth_headers(owner))
+        response = await client.post(
+            url, json={**body, "comment": "Fine"}, headers=auth_headers(owner)
+        )
+
+        assert response.json()["vote_summary"] == {
+            "like": 0,
+            "dont_mind": 1,
+            "dislike": 0,
+        }
+
+    async def test_withdraw_and_recast_vote(
+        self, client, db, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        city = await add_city(trip)
+        votes_url = f"/api/v1/voting/trips/{trip.id}/votes"
+        city_url = f"/api/v1/voting/trips/{trip.id}/cities/{city.id}/votes"
+
+        await client.post(
+            votes_url,
+            json={"city_id": str(city.id), "vote_type": "like"},
+            headers=auth_headers(owner),
+        )
+        response = await client.delete(city_url, headers=auth_headers(owner))
+        assert response.status_code == 200
+        assert response.json()["vote_summary"] == {
+            "like": 0,
+            "dont_mind": 0,
+            "dislike": 0,
+        }
+
+        response = await client.delete(city_url, headers=auth_headers(owner))
+        assert response.status_code == 404
+
+        await client.post(
+            votes_url,
+            json={"city_id": str(city.id), "vote_type": "dislike"},
+            headers=auth_headers(owner),
+        )
+        response = await client.get(city_url, headers=auth_headers(owner))
+        data = response.json()
+        assert data["vote_summary"] == {"like": 0, "dont_mind": 0, "dislike": 1}
+        assert [vote["vote_type"] for vote in data["votes"]] == ["dislike"]
+
+    async def test_vote_writes_take_the_member_lock(
+        self, client, make_user, make_trip, add_city, auth_headers, monkeypatch
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        city = await add_city(trip)
+        locks = []
+        original = voting_api.require_trip_member
+
+        async def require_trip_member(db, trip_id, user_id, lock=False):
+            locks.append(lock)
+            return await original(db, trip_id, user_id, lock=lock)
+
+        monkeypatch.setattr(voting_api, "require_trip_member", require_trip_member)
+        votes_url = f"/api/v1/voting/trips/{trip.id}/votes"
+        vote = {"city_id": str(city.id), "vote_type": "like"}
+
+        await client.post(votes_url, json=vote, headers=auth_headers(owner))
+        await client.post(
+            f"{votes_url}/bulk", json={"votes": [vote]}, headers=auth_headers(owner)
+        )
+        await client.delete(
+            f"/api/v1/voting/trips/{trip.id}/cities/{city.id}/votes",
+            headers=auth_headers(owner),
+        )
+
+        assert locks == [True, True, True]
+
+    async def test_non_member_cannot_vote(
+        self, client, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        outsider = await make_user("Outsider")
+        trip = await make_trip(owner)
+        city = await add_city(trip)
+
+        response = await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(city.id), "vote_type": "like"},
+            headers=auth_headers(outsider),
+        )
+
+        assert response.status_code == 404
+
+    async def test_trip_votes_include_city_and_user(
+        self, client, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        city = await add_city(trip)
+        url = f"/api/v1/voting/trips/{trip.id}/votes"
+
+        await client.post(
+            url,
+            json={"city_id": str(city.id), "vote_type": "like"},
+            headers=auth_headers(owner),
+        )
+        response = await client.get(url, headers=auth_headers(owner))
+
+        votes = response.json()
+        assert len(votes) == 1
+        assert votes[0]["city"]["name"] == "Paris"
+        assert votes[0]["user"]["name"] == "Owner"
+
+
+class TestReconcileVoteTallies:
+    """Test rebuilding tallies from raw votes."""
+
+    async def test_reconcile_fixes_drift(
+        self, client, db, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        paris = await add_city(trip)
+        rome = await add_city(trip, "Rome", "Italy")
+
+        await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(paris.id), "vote_type": "like"},
+            headers=auth_headers(owner),
+        )
+        await db.execute(
+            update(TripCity).where(TripCity.city_id == rome.id).values(dislike_count=5)
+        )
+        await db.commit()
+
+        assert await reconcile_vote_tallies(db) == 1
+        await db.commit()
+
+        assert await _tally(db, trip, paris) == {
+            "like": 1,
+            "dont_mind": 0,
+            "dislike": 0,
+        }
+        assert await _tally(db, trip, rome) == {"like": 0, "dont_mind": 0, "dislike": 0}
+        assert await reconcile_vote_tallies(db, trip.id) == 0
+
+    async def test_vote_between_read_and_write_is_kept(
+        self, client, db, make_user, make_trip, add_city, auth_headers, monkeypatch
+    ):
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        paris = await add_city(trip)
+
+        await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(paris.id), "vote_type": "like"},
+            headers=auth_headers(owner),
+        )
+        await db.execute(
+            update(TripCity).where(TripCity.city_id == paris.id).values(like_count=5)
+        )
+        await db.commit()
+
+        tally_drift = voting_service._tally_drift
+
+        async def drift_then_vote(*args):
+            drift = await tally_drift(*args)
+            # Another request votes after the drift was read
+            response = await client.post(
+                f"/api/v1/voting/trips/{trip.id}/votes",
+                json={"city_id": str(paris.id), "vote_type": "like"},
+                headers=auth_headers(member),
+            )
+            assert response.status_code == 200
+            return drift
+
+        monkeypatch.setattr(voting_service, "_tally_drift", drift_then_vote)
+        assert await reconcile_vote_tallies(db, trip.id) == 1
+        await db.commit()
+
+        assert await _tally(db, trip, paris) == {
+            "like": 2,
+            "dont_mind": 0,
+            "dislike": 0,
+        }
+
+
+class TestBulkCastVotes:
+    """Test casting several votes in one request."""
+
+    async def test_bulk_votes_write_all_and_return_summaries(
+        self, client, db, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        paris = await add_city(trip)
+        rome = await add_city(trip, "Rome", "Italy")
+        lisbon = await add_city(trip, "Lisbon", "Portugal")
+
+        # The member already voted on Paris and withdrew a vote on Lisbon
+        await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(paris.id), "vote_type": "like"},
+            headers=auth_headers(member),
+        )
+        await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes",
+            json={"city_id": str(lisbon.id), "vote_type": "like"},
+            headers=auth_headers(member),
+        )
+        await client.delete(
+            f"/api/v1/voting/trips/{trip.id}/cities/{lisbon.id}/votes",
+            headers=auth_headers(member),
+        )
+
+        response = await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes/bulk",
+            json={
+                "votes": [
+                    {"city_id": str(paris.id), "vote_type": "dislike"},
+                    {"city_id": str(rome.id), "vote_type": "like", "comment": "Pasta"},
+                    {"city_id": str(lisbon.id), "vote_type": "dont_mind"},
+                ]
+            },
+            headers=auth_headers(member),
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["votes"]) == 3
+        summaries = {
+            item["city_id"]: item["vote_summary"] for item in data["summaries"]
+        }
+        assert summaries[str(paris.id)] == {"like": 0, "dont_mind": 0, "dislike": 1}
+        assert summaries[str(rome.id)] == {"like": 1, "dont_mind": 0, "dislike": 0}
+        assert summaries[str(lisbon.id)] == {"like": 0, "dont_mind": 1, "dislike": 0}
+
+        assert await reconcile_vote_tallies(db, trip.id) == 0
+
+    async def test_bulk_votes_reject_unknown_city(
+        self, client, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        other_trip = await make_trip(owner, name="Asia")
+        paris = await add_city(trip)
+        tokyo = await add_city(other_trip, "Tokyo", "Japan")
+
+        response = await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes/bulk",
+            json={
+                "votes": [
+                    {"city_id": str(paris.id), "vote_type": "like"},
+                    {"city_id": str(tokyo.id), "vote_type": "like"},
+                ]
+            },
+            headers=auth_headers(owner),
+        )
+
+        assert response.status_code == 404
+
+    async def test_bulk_votes_reject_duplicate_city(
+        self, client, make_user, make_trip, add_city, auth_headers
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        paris = await add_city(trip)
+
+        response = await client.post(
+            f"/api/v1/voting/trips/{trip.id}/votes/bulk",
+            json={
+                "votes": [
+                    {"city_id": str(paris.id), "vote_type": "like"},
+                    {"city_id": str(paris.id), "vote_type": "dislike"},
+                ]
+            },
+            headers=auth_headers(owner),
+        )
+
+        assert response.status_code == 422
+
+    async def test_overlapping_bulk_votes_in_reverse_order(
+        self, client, db, make_user, make_trip, add_city, auth_headers, record_queries
+    ):
+        owner = await make_user("Owner")
+        member = await make_user("Member")
+        trip = await make_trip(owner, member)
+        cities = [await add_city(trip, f"City {i}", "Europe") for i in range(4)]
+        url = f"/api/v1/voting/trips/{trip.id}/votes/bulk"
+
+        with record_queries() as captured:
+            responses = [
+                await client.post(
+                    url,
+                    json={
+                        "votes": [
+                            {"city_id": str(city.id), "vote_type": "like"}
+                            for city in ordered
+                        ]
+                    },
+                    headers=auth_headers(user),
+                )
+                for user, ordered in ((owner, cities), (member, cities[::-1]))
+            ]
+
+        assert [response.status_code for response in responses] == [200, 200]
+        for city in cities:
+            assert await _tally(db, trip, city) == {
+                "like": 2,
+                "dont_mind": 0,
+                "dislike": 0,
+            }
+
+        # Both ballots update the tallies in the same (city id) order
+        locked = [
+            [row[-1] for row in parameters]
+            for statement, parameters in captured
+            if statement.lstrip().startswith("UPDATE trip_cities")
+        ]
+        in_order = [city.id.hex for city in sorted(cities, key=lambda city: city.id)]
+        assert locked == [in_order, in_order]
+
+    async def test_bulk_votes_query_budget(
+        self, client, make_user, make_trip, add_city, auth_headers, assert_max_queries
+    ):
+        owner = await make_user("Owner")
+        trip = await make_trip(owner)
+        cities = [await add_city(trip, f"City {i}", "Europe") for i in range(20)]
+
+        # user, member lock, previous votes, upsert, tallies, summaries,
+        # event versions
+        with assert_max_queries(7):
+            response = await client.post(
+                f"/api/v1/voting/trips/{trip.id}/votes/bulk",
+                json={
+                    "votes": [
+                        {"city_id": str(city.id), "vote_type": "like"}
+                        for city in cities
+                    ]
+                },
+                headers=auth_headers(owner),
+            )
+
+        assert response.status_code == 200